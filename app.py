@@ -10,147 +10,136 @@ Autores: Luis Alejandro Jiménez (G2) y Cristhian Camilo Buitrago (G1)
 # ============================================================
 # 0️⃣ Librerías
 # ============================================================
-import geopandas as gpd
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+# En modo liviano (MORTALIDAD_MODO=liviano) no se importan pandas,
+# geopandas ni plotly.express: todo sale de los artefactos precalculados
+# (ver tablero/artefactos.py).
+import time
+
+inicio_proceso = time.perf_counter()  # base de los tiempos de /readyz
+
 import numpy as np
+import plotly.graph_objects as go
 from dash import Dash, dcc, html, dash_table, Input, Output
 import dash_bootstrap_components as dbc
 import os
+from flask import jsonify
+
+from tablero import descargas, filtros
+from tablero.api import ApiConteos
+from tablero.cache import CacheCallbacks
+from tablero.causas import COLUMNAS_TABLA, IndiceCausas
+from tablero.conjuntos import registrar as registrar_conjuntos, selector
+from tablero.geometria import Geometrias
+from tablero.salud import Calentamiento
+
+MODO_LIVIANO = os.environ.get("MORTALIDAD_MODO") == "liviano"
 
 # ============================================================
-# 1️⃣ Lectura y preparación de datos
+# 1️⃣ Lectura y preparación de datos / 2️⃣ Visualizaciones
 # ============================================================
-mortalidad = pd.read_excel("datos/Anexo1.NoFetal2019_CE_15-03-23.xlsx")
-codigos = pd.read_excel("datos/Anexo2.CodigosDeMuerte_CE_15-03-23.xlsx")
-municipios = pd.read_excel("datos/Divipola_CE_.xlsx")
-
-# Ajuste de códigos
-mortalidad["COD_DEPARTAMENTO"] = mortalidad["COD_DEPARTAMENTO"].astype(str).str.zfill(2)
-mortalidad["COD_MUNICIPIO"] = mortalidad["COD_MUNICIPIO"].astype(str).str.zfill(3)
-municipios["COD_DEPARTAMENTO"] = municipios["COD_DEPARTAMENTO"].astype(str).str.zfill(2)
-municipios["COD_MUNICIPIO"] = municipios["COD_MUNICIPIO"].astype(str).str.zfill(3)
-
-# Unión de bases
-base = mortalidad.merge(municipios, on=["COD_DEPARTAMENTO", "COD_MUNICIPIO"], how="left")
-base = pd.merge(base, codigos,
-                left_on="COD_MUERTE",
-                right_on="Código de la CIE-10 cuatro caracteres",
-                how="left")
-
-# Asignación de sexo
-base["SEXO"] = base["SEXO"].map({
-    1: "Masculino",
-    2: "Femenino",
-    3: "Indeterminado"
-})
-
-# Clasificación por grupo etario (según DANE)
-condiciones = [
-    base["GRUPO_EDAD1"].between(0, 4),
-    base["GRUPO_EDAD1"].between(5, 6),
-    base["GRUPO_EDAD1"].between(7, 8),
-    base["GRUPO_EDAD1"].between(9, 10),
-    base["GRUPO_EDAD1"] == 11,
-    base["GRUPO_EDAD1"].between(12, 13),
-    base["GRUPO_EDAD1"].between(14, 16),
-    base["GRUPO_EDAD1"].between(17, 19),
-    base["GRUPO_EDAD1"].between(20, 24),
-    base["GRUPO_EDAD1"].between(25, 28),
-    base["GRUPO_EDAD1"] == 29
-]
-valores = [
-    "Menor de 1 mes", "1 a 11 meses", "1 a 4 años", "5 a 14 años", "15 a 19 años",
-    "20 a 29 años", "30 a 44 años", "45 a 59 años", "60 a 84 años", "85 a 100+ años",
-    "Sin información"
-]
-base["RANGO_EDAD"] = np.select(condiciones, valores, default="Sin información")
-
-# Totales por departamento
-dep_totales = base.groupby("COD_DEPARTAMENTO").size().reset_index(name="Total_muer_dep")
-total_muertes = len(base)
-dep_muertes = dep_totales.assign(
-    Total_muertes=total_muertes,
-    Proporcion_muertes=lambda x: np.round(x["Total_muer_dep"] / x["Total_muertes"], 3) * 100
-)
+if MODO_LIVIANO:
+    from tablero.artefactos import cargar
 
-# Lectura del shapefile de departamentos
-dep_col = gpd.read_file("datos/shapes/departamento/MGN_DPTO_POLITICO.shp")
-dep_col["DPTO_CCDGO"] = dep_col["DPTO_CCDGO"].astype(str).str.zfill(2)
+    artefactos = cargar()
+    version = artefactos.version
+    series, cubo, almacen = artefactos.series, artefactos.cubo, None
+    indice_causas, espacial = artefactos.indice_causas, artefactos.espacial
+    geojson_dep, nombres_dpto = artefactos.geojson_dep, artefactos.nombres_dpto
+    mapa_fig, linea_fig, barras_top5, pie_top10, stack_fig, hist_fig = (
+        artefactos.figuras[n] for n in
+        ("mapa_fig", "linea_fig", "barras_top5", "pie_top10", "stack_fig", "hist_fig"))
+    causas_columna = artefactos.causas10["columna"]
+    causas_registros = artefactos.causas10["registros"]
+    # Sin almacén de registros no hay cubo por causa: el selector se oculta
+    indice_busqueda = cubo_para = None
+    # Un solo conjunto (no fetal): sin selector de conjunto
+    conjuntos = {}
+else:
+    from tablero import pipeline
+    from tablero.almacen import Almacen
+    from tablero.busqueda import IndiceBusqueda
+    from tablero.conjuntos import CONJUNTOS, PRINCIPAL, Conjunto, adicionales
+    from tablero.espacial import CapasEspaciales
+    from tablero.series import SeriesTemporales
+    from tablero.version import version_datos
 
-# Unión de información geográfica
-resultado_mapa = pd.merge(dep_col, dep_muertes,
-                          left_on="DPTO_CCDGO",
-                          right_on="COD_DEPARTAMENTO",
-                          how="left")
+    # Dimensiones (Anexo2, Divipola, shapefile y GeoJSON) una sola vez,
+    # compartidas por todos los conjuntos de datos (tablero/conjuntos.py)
+    dimensiones = pipeline.cargar_dimensiones()
+    datos = pipeline.cargar_datos(dimensiones=dimensiones)
+    base, resultado_mapa, geojson_dep = datos["base"], datos["resultado_mapa"], datos["geojson_dep"]
+    causas10 = pipeline.causas_principales(base)
+    causas_columna = causas10.columns[0]
+    causas_registros = causas10.to_dict("records")
 
-base = pd.merge(base,
-                resultado_mapa[["DPTO_CCDGO", "DPTO_CNMBR"]],
-                left_on="COD_DEPARTAMENTO",
-                right_on="DPTO_CCDGO",
-                how="left")
+    # Versión de los datos y series temporales precalculadas (por versión)
+    version = version_datos()
+    series = SeriesTemporales.obtener(base, version)
+    nombres_dpto = dict(zip(resultado_mapa["DPTO_CCDGO"], resultado_mapa["DPTO_CNMBR"]))
 
-# Conversión a geojson
-dep_col_4326 = dep_col.to_crs(epsg=4326)
-geojson_dep = dep_col_4326.__geo_interface__
+    # Almacén columnar y cubo preagregado para los filtros (en caché por versión;
+    # tablero/incremental.py los actualiza con deltas ante una corrección de Anexo1)
+    almacen = Almacen.obtener(base, version, ordenes={"edad": pipeline.VALORES_EDAD})
 
-# ============================================================
-# 2️⃣ Visualizaciones
-# ============================================================
+    # Figuras fijas: esqueletos de plotly.express una vez, datos del almacén
+    # como arreglos binarios (tablero/fabrica.py); los esqueletos se
+    # comparten con los demás conjuntos (fetal), que sólo agregan sus hechos
+    fabricas = {}
+    principal = Conjunto.desde_almacen(PRINCIPAL, CONJUNTOS[PRINCIPAL][0], almacen, dimensiones,
+                                       fabricas, causas10=(causas_columna, causas_registros))
+    conjuntos = {PRINCIPAL: principal, **adicionales(dimensiones, fabricas)}
+    cubo, figuras = principal.cubo, principal.figuras
+    mapa_fig, linea_fig = figuras["mapa_fig"], figuras["linea_fig"]
+    barras_top5, pie_top10 = figuras["barras_top5"], figuras["pie_top10"]
+    stack_fig, hist_fig = figuras["stack_fig"], figuras["hist_fig"]
 
-# --- Mapa coroplético ---
-mapa_fig = px.choropleth(
-    resultado_mapa,
-    geojson=geojson_dep,
-    locations="DPTO_CCDGO",
-    color="Total_muer_dep",
-    featureidkey="properties.DPTO_CCDGO",
-    projection="mercator",
-    hover_name="DPTO_CNMBR",
-    color_continuous_scale="Reds",
-    title="Mapa de Mortalidad por Departamento – 2019"
-)
-mapa_fig.update_geos(fitbounds="locations", visible=False)
-mapa_fig.update_layout(margin=dict(l=0, r=0, t=30, b=0))
+    # Índice de causas CIE-10 (catálogo Anexo2 × conteos) para el explorador
+    indice_causas = IndiceCausas.obtener(almacen, datos["codigos"], version)
 
-# --- Línea mensual ---
-if "MES" in base.columns:
-    muertes_mes = base.groupby("MES").size().reset_index(name="Total")
-    linea_fig = px.line(muertes_mes, x="MES", y="Total", markers=True, title="Muertes por mes")
-else:
-    linea_fig = go.Figure()
-    linea_fig.add_annotation(text="Columna MES no encontrada", showarrow=False)
-
-# --- Top 5 municipios ---
-top5 = base.groupby("MUNICIPIO").size().reset_index(name="Total").sort_values("Total", ascending=False).head(5)
-barras_top5 = px.bar(top5, x="MUNICIPIO", y="Total", color="Total",
-                     title="Top 5 Municipios con Mayor Mortalidad")
-
-# --- Top 10 municipios (pie) ---
-top10 = base.groupby("MUNICIPIO").size().reset_index(name="Total").sort_values("Total", ascending=False).head(10)
-pie_top10 = px.pie(top10, values="Total", names="MUNICIPIO", title="Top 10 Municipios (participación)")
-
-# --- Principales causas ---
-causa_col = [c for c in base.columns if "nombre" in c.lower() or "descr" in c.lower()]
-if causa_col:
-    causas10 = base.groupby(causa_col[0]).size().reset_index(name="Total").sort_values("Total", ascending=False).head(10)
-else:
-    causas10 = pd.DataFrame({"Causa": [], "Total": []})
+    # Índice de búsqueda por prefijo y cubos restringidos a un conjunto de causas
+    indice_busqueda = IndiceBusqueda.obtener(indice_causas, version)
+
+    cubo_para = principal.cubo_para
 
-# --- Barras apiladas por sexo ---
-stack_df = base.groupby(["DPTO_CNMBR", "SEXO"]).size().reset_index(name="Total")
-stack_fig = px.bar(stack_df, x="DPTO_CNMBR", y="Total", color="SEXO",
-                   title="Muertes por Sexo y Departamento", barmode="stack")
+    # Vecindad, tasas suavizadas y Gi* por departamento y municipio
+    espacial = CapasEspaciales.obtener(almacen, resultado_mapa, pipeline.RUTA_MUNICIPIOS, version)
 
-# --- Histograma de edad ---
-hist_fig = px.histogram(base, x="RANGO_EDAD", title="Distribución de Muertes por Grupo Etario")
+# Registro de geometrías compartidas: los mapas referencian /geo/<hash>.json
+geometrias = Geometrias()
+url_departamentos = geometrias.registrar(geojson_dep)
+geometrias.referenciar(mapa_fig, url_departamentos)
 
 # ============================================================
 # 3️⃣ Layout de la aplicación Dash
 # ============================================================
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+           suppress_callback_exceptions=True)
 server = app.server
+geometrias.montar(server)
+
+# Caché de callbacks compartida entre workers (LRU local + SQLite/Redis);
+# con varios conjuntos la llave incluye la versión de cada uno
+cache = CacheCallbacks.desde_entorno(
+    "-".join(c.version for c in conjuntos.values()) if len(conjuntos) > 1 else version)
+
+
+@server.route("/cache/estadisticas")
+def estadisticas_cache():
+    return jsonify(cache.estadisticas())
+
+
+# API de conteos /api/v1 (agregación por consulta sobre el almacén o el cubo)
+api = ApiConteos.desde_almacen(almacen) if almacen is not None else ApiConteos.desde_cubo(cubo)
+api.montar(server, cache, conjuntos={
+    c: api if c == PRINCIPAL else ApiConteos.desde_almacen(j.almacen)
+    for c, j in conjuntos.items()} if len(conjuntos) > 1 else None)
+
+# Descarga en streaming de los registros filtrados (requiere el almacén);
+# con varios conjuntos, ``?conjunto=`` elige el almacén
+if almacen is not None:
+    descargas.montar(server, almacen, conjuntos={c: j.almacen for c, j in conjuntos.items()}
+                     if len(conjuntos) > 1 else None)
+
 
 nav = dbc.NavbarSimple(
     brand="Mortalidad Colombia 2019",
@@ -179,6 +168,59 @@ page_1 = dbc.Container([
     dcc.Link("Ir a Causas y Demografía", href="/causas")
 ], fluid=True)
 
+# --- Serie temporal (rebanadas de `series`) ---
+nombres_frecuencia = {"D": "Diaria", "W": "Semanal", "M": "Mensual"}
+opciones_medida = [{"label": "Conteo", "value": "conteo"}]
+opciones_medida += [{"label": f"Media móvil {v}", "value": f"media-{v}"}
+                    for v in sorted(series.medias)]
+# Los excesos sólo se ofrecen si los datos cubren más de un año
+if series.con_anio_anterior:
+    opciones_medida += [
+        {"label": "Exceso vs. año anterior", "value": "exceso"},
+        {"label": "Exceso (%)", "value": "exceso_pct"}
+    ]
+
+
+@cache.memoizar("/exploracion#serie")
+def datos_serie(frecuencia, medida, dptos, grupos):
+    """``(x, y, título)`` de la serie, como listas JSON."""
+    if medida.startswith("media-") and frecuencia != series.resolucion:
+        frecuencia = series.resolucion
+    fechas, valores = series.serie(dptos, grupos, medida, frecuencia)
+    x = np.datetime_as_string(fechas, unit="D").tolist()
+    y = [None if np.isnan(v) else v for v in np.asarray(valores, dtype=float).tolist()]
+    return x, y, f"Muertes – serie {nombres_frecuencia[frecuencia].lower()}"
+
+
+def figura_serie(frecuencia, medida, dptos, grupos):
+    x, y, titulo = datos_serie(frecuencia, medida, dptos, grupos)
+    fig = go.Figure(go.Scatter(x=x, y=y, mode="lines+markers"))
+    fig.update_layout(title=titulo, margin=dict(l=0, r=0, t=40, b=0))
+    return fig
+
+
+serie_panel = dbc.Row([
+    dbc.Col([
+        html.H5("Serie temporal"),
+        dcc.RadioItems(id="serie-frecuencia",
+                       options=[{"label": nombres_frecuencia[f], "value": f}
+                                for f in series.frecuencias],
+                       value=series.resolucion, inline=True),
+        dcc.RadioItems(id="serie-medida", options=opciones_medida,
+                       value="conteo", inline=True),
+        *([] if series.con_anio_anterior else
+          [html.Small("Exceso vs. año anterior: no hay año anterior en los datos.")]),
+        dcc.Dropdown(id="serie-dpto",
+                     options=[{"label": nombres_dpto.get(c, c), "value": c}
+                              for c in series.departamentos],
+                     multi=True, placeholder="Todos los departamentos"),
+        dcc.Dropdown(id="serie-grupo",
+                     options=[{"label": g, "value": g} for g in series.grupos],
+                     multi=True, placeholder="Todos los capítulos CIE-10"),
+        dcc.Graph(id="serie-fig", figure=figura_serie(series.resolucion, "conteo", None, None))
+    ], width=12)
+])
+
 # --- Página 2: Exploración ---
 page_2 = dbc.Container([
     dbc.Row([
@@ -188,26 +230,81 @@ page_2 = dbc.Container([
     ]),
     html.Hr(),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=mapa_fig), width=6),
-        dbc.Col(dcc.Graph(figure=linea_fig), width=6)
+        dbc.Col(dcc.Graph(id="mapa-exploracion", figure=mapa_fig), width=6),
+        dbc.Col(dcc.Graph(id="linea-fig", figure=linea_fig), width=6)
     ]),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=barras_top5), width=6),
-        dbc.Col(dcc.Graph(figure=pie_top10), width=6)
-    ])
+        dbc.Col(dcc.Graph(id="barras-top5", figure=barras_top5), width=6),
+        dbc.Col(dcc.Graph(id="pie-top10", figure=pie_top10), width=6)
+    ]),
+    serie_panel
 ], fluid=True)
 
 # --- Página 3: Causas y Demografía ---
-if not causas10.empty:
+if causas_registros or len(conjuntos) > 1:
     table_causes = dash_table.DataTable(
-        columns=[{"name": causas10.columns[0], "id": causas10.columns[0]},
+        id="tabla-causas",
+        columns=[{"name": causas_columna, "id": causas_columna},
                  {"name": "Total", "id": "Total"}],
-        data=causas10.to_dict("records"),
+        data=causas_registros,
         style_table={"overflowX": "auto"}
     )
 else:
     table_causes = html.P("No se encontró información de causas.")
 
+# --- Explorador de causas CIE-10 (paginado en el servidor) ---
+explorador_causas = dbc.Row([
+    dbc.Col([
+        html.H5("Explorador de causas CIE-10"),
+        dcc.Dropdown(id="causas-capitulo",
+                     options=[{"label": c, "value": c} for c in indice_causas.capitulos],
+                     multi=True, placeholder="Todos los capítulos"),
+        dash_table.DataTable(
+            id="causas-explorador",
+            columns=COLUMNAS_TABLA,
+            page_current=0,
+            page_size=15,
+            page_action="custom",
+            sort_action="custom",
+            sort_mode="multi",
+            sort_by=[{"column_id": "total", "direction": "desc"}],
+            filter_action="custom",
+            filter_query="",
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "left", "whiteSpace": "normal", "height": "auto"}
+        )
+    ], width=12)
+], className="mt-3")
+
+# --- Riesgo suavizado y puntos calientes (tablero/espacial.py) ---
+nombres_medida_espacial = {
+    "cruda": "Tasa cruda",
+    "suavizada": "Tasa suavizada (Bayes empírico)",
+    "gi": "Puntos calientes (Gi*)"
+}
+grupo_espacial = espacial.grupos[int(
+    espacial.capas["departamento"].casos.sum(axis=0).argmax())] if len(espacial.grupos) else None
+
+panel_espacial = dbc.Row([
+    dbc.Col([
+        html.H5("Riesgo suavizado y puntos calientes"),
+        html.Small("Tasa = defunciones del capítulo por habitante." if espacial.por_poblacion else
+                   "Sin población: tasa = proporción de las defunciones de cada unidad."),
+        dcc.RadioItems(id="espacial-nivel",
+                       options=[{"label": "Departamento", "value": "departamento"},
+                                {"label": "Municipio", "value": "municipio"}],
+                       value="departamento", inline=True),
+        dcc.RadioItems(id="espacial-medida",
+                       options=[{"label": v, "value": k}
+                                for k, v in nombres_medida_espacial.items()],
+                       value="suavizada", inline=True),
+        dcc.Dropdown(id="espacial-grupo",
+                     options=[{"label": g, "value": g} for g in espacial.grupos.tolist()],
+                     value=grupo_espacial, clearable=False),
+        dcc.Graph(id="espacial-fig")
+    ], width=12)
+], className="mt-3")
+
 page_3 = dbc.Container([
     dbc.Row([
         dbc.Col(html.H3("Causas y Demografía"), width=8),
@@ -216,22 +313,38 @@ page_3 = dbc.Container([
     ]),
     html.Hr(),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=mapa_fig), width=6),
+        dbc.Col(dcc.Graph(id="mapa-causas", figure=mapa_fig), width=6),
         dbc.Col(table_causes, width=6)
     ]),
     dbc.Row([
-        dbc.Col(dcc.Graph(figure=stack_fig), width=6),
-        dbc.Col(dcc.Graph(figure=hist_fig), width=6)
-    ])
+        dbc.Col(dcc.Graph(id="stack-fig", figure=stack_fig), width=6),
+        dbc.Col(dcc.Graph(id="hist-fig", figure=hist_fig), width=6)
+    ]),
+    explorador_causas,
+    panel_espacial
 ], fluid=True)
 
 # --- Estructura general ---
 app.layout = html.Div([
     dcc.Location(id="url", refresh=False),
     nav,
+    *([selector(conjuntos)] if len(conjuntos) > 1 else []),
+    filtros.panel(cubo, nombres_dpto, buscador=indice_busqueda is not None,
+                  descarga=almacen is not None),
+    dcc.Store(id="cubo-carga",
+              data=filtros.carga(cubo, nombres_dpto) if filtros.MODO == "cliente" else None),
     html.Div(id="page-content")
 ])
 
+filtros.registrar(app, cubo, nombres_dpto,
+                  {"mapa": mapa_fig, "linea": linea_fig, "stack": stack_fig, "hist": hist_fig},
+                  cache, busqueda=indice_busqueda, cubo_para=cubo_para,
+                  descarga=almacen is not None,
+                  conjuntos=conjuntos if len(conjuntos) > 1 else None)
+if len(conjuntos) > 1:
+    registrar_conjuntos(app, conjuntos)
+
+
 @app.callback(Output("page-content", "children"), Input("url", "pathname"))
 def display_page(pathname):
     if pathname == "/exploracion":
@@ -241,6 +354,73 @@ def display_page(pathname):
     else:
         return page_1
 
+
+@app.callback(Output("serie-fig", "figure"),
+              Input("serie-frecuencia", "value"),
+              Input("serie-medida", "value"),
+              Input("serie-dpto", "value"),
+              Input("serie-grupo", "value"),
+              prevent_initial_call=True)
+def actualizar_serie(frecuencia, medida, dptos, grupos):
+    # La figura inicial va en el layout; cada cambio envía sólo x, y y título
+    x, y, titulo = datos_serie(frecuencia, medida, dptos, grupos)
+    return filtros.parche([(("data", 0, "x"), x), (("data", 0, "y"), y),
+                           (("layout", "title", "text"), titulo)])
+
+
+@app.callback(Output("causas-explorador", "data"),
+              Output("causas-explorador", "page_count"),
+              Input("causas-explorador", "page_current"),
+              Input("causas-explorador", "page_size"),
+              Input("causas-explorador", "sort_by"),
+              Input("causas-explorador", "filter_query"),
+              Input("causas-capitulo", "value"),
+              Input("filtro-sexo", "value"),
+              Input("filtro-dpto", "value"))
+@cache.memoizar("/causas#explorador")
+def explorar_causas(pagina, tamano, orden, consulta, capitulos, sexos, dptos):
+    return indice_causas.pagina(pagina or 0, tamano, orden, consulta, sexos, dptos, capitulos)
+
+
+@app.callback(Output("espacial-fig", "figure"),
+              Input("espacial-nivel", "value"),
+              Input("espacial-medida", "value"),
+              Input("espacial-grupo", "value"))
+@cache.memoizar("/causas#espacial")
+def actualizar_espacial(nivel, medida, grupo):
+    capa, valores = espacial.valores(nivel, grupo, medida)
+    if medida == "gi":
+        escala = dict(colorscale="RdBu", reversescale=True, cmid=0)
+    else:
+        escala = dict(colorscale="Reds")
+    hover = "%{text}<br>" + nombres_medida_espacial[medida] + ": %{customdata:.4g}<extra></extra>"
+    if nivel == "departamento":
+        traza = go.Choropleth(geojson=url_departamentos,
+                              featureidkey="properties.DPTO_CCDGO",
+                              locations=capa.codigos.tolist(), z=valores.tolist(),
+                              customdata=valores.tolist(), text=capa.nombres.tolist(),
+                              hovertemplate=hover, zmid=escala.pop("cmid", None), **escala)
+    else:
+        ubicadas = np.isfinite(capa.lon) & np.isfinite(capa.lat)
+        traza = go.Scattergeo(lon=capa.lon[ubicadas].tolist(), lat=capa.lat[ubicadas].tolist(),
+                              text=capa.nombres[ubicadas].tolist(),
+                              customdata=valores[ubicadas].tolist(), mode="markers",
+                              hovertemplate=hover,
+                              marker=dict(color=valores[ubicadas].tolist(), size=6,
+                                          showscale=True, **escala))
+    fig = go.Figure(traza)
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(title=f"{nombres_medida_espacial[medida]} – {grupo}",
+                      margin=dict(l=0, r=0, t=30, b=0))
+    return fig
+
+
+# Sondas /healthz y /readyz; el calentamiento corre en segundo plano
+calentamiento = Calentamiento(app, ["/", "/exploracion", "/causas"],
+                              paginas=[page_1, page_2, page_3], inicio=inicio_proceso)
+calentamiento.montar(server)
+calentamiento.iniciar()
+
 # ============================================================
 # 4️⃣ Ejecución local / despliegue
 # ============================================================
@@ -0,0 +1,192 @@
+// Filtros en el navegador sobre el cubo preagregado (ver tablero/cubo.py).
+// Reagrega los conteos y reestiliza las figuras sin pasar por el servidor.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    mortalidad: (function () {
+        var decodificado = {};
+
+        function decodificar(carga) {
+            // El cubo cambia con la versión de los datos y con el filtro de causas
+            if (decodificado.fuente !== carga.conteos) {
+                var bin = atob(carga.conteos);
+                var bytes = new Uint8Array(bin.length);
+                for (var i = 0; i < bin.length; i++) {
+                    bytes[i] = bin.charCodeAt(i);
+                }
+                decodificado = {fuente: carga.conteos, conteos: new Uint32Array(bytes.buffer)};
+            }
+            return decodificado.conteos;
+        }
+
+        function posiciones(etiquetas) {
+            var pos = {};
+            etiquetas.forEach(function (e, i) { pos[e] = i; });
+            return pos;
+        }
+
+        // Misma semántica que Cubo.permitidas: sin selección o rango completo no filtra
+        function permitidas(carga, dim, filtro) {
+            var etq = carga.etiquetas[dim], n = etq.length + 1;
+            var m = new Array(n).fill(true);
+            if (!filtro || !filtro.length) {
+                return m;
+            }
+            var i;
+            if (dim === "edad") {
+                if (filtro[0] <= 0 && filtro[1] >= etq.length - 1) {
+                    return m;
+                }
+                for (i = 0; i < n; i++) {
+                    m[i] = i >= filtro[0] && i <= filtro[1];
+                }
+                return m;
+            }
+            if (dim === "mes") {
+                var min = Math.min.apply(null, etq), max = Math.max.apply(null, etq);
+                if (filtro[0] <= min && filtro[1] >= max) {
+                    return m;
+                }
+                for (i = 0; i < etq.length; i++) {
+                    m[i] = etq[i] >= filtro[0] && etq[i] <= filtro[1];
+                }
+                m[n - 1] = false;
+                return m;
+            }
+            var sel = new Set(filtro);
+            for (i = 0; i < n; i++) {
+                m[i] = i < etq.length && sel.has(etq[i]);
+            }
+            return m;
+        }
+
+        // Conteos filtrados por `dims` (sin casillas de nulos), plano en orden fila-mayor
+        function marginal(carga, filtros, dims) {
+            var conteos = decodificar(carga), forma = carga.forma, nd = forma.length;
+            var mascaras = carga.dims.map(function (d) { return permitidas(carga, d, filtros[d]); });
+            var ejes = dims.map(function (d) { return carga.dims.indexOf(d); });
+            var tam = ejes.map(function (e) { return forma[e] - 1; });
+            var salida = new Float64Array(tam.reduce(function (a, b) { return a * b; }, 1));
+            var idx = new Array(nd).fill(0);
+            for (var p = 0; p < conteos.length; p++) {
+                var v = conteos[p], ok = v > 0, a;
+                for (a = 0; ok && a < nd; a++) {
+                    ok = mascaras[a][idx[a]];
+                }
+                if (ok) {
+                    var off = 0;
+                    for (a = 0; ok && a < ejes.length; a++) {
+                        var k = idx[ejes[a]];
+                        ok = k < tam[a];
+                        off = off * tam[a] + k;
+                    }
+                    if (ok) {
+                        salida[off] += v;
+                    }
+                }
+                for (a = nd - 1; a >= 0; a--) {
+                    if (++idx[a] < forma[a]) {
+                        break;
+                    }
+                    idx[a] = 0;
+                }
+            }
+            return salida;
+        }
+
+        function copiar(fig) {
+            return Object.assign({}, fig, {data: fig.data.slice()});
+        }
+
+        function mapa(carga, filtros, fig) {
+            var z = marginal(carga, filtros, ["departamento"]);
+            var pos = posiciones(carga.etiquetas.departamento);
+            var nueva = copiar(fig);
+            nueva.data[0] = Object.assign({}, fig.data[0], {
+                z: fig.data[0].locations.map(function (c) { return c in pos ? z[pos[c]] : null; })
+            });
+            return nueva;
+        }
+
+        function linea(carga, filtros, fig) {
+            if (!fig.data.length) {
+                return fig;
+            }
+            var y = marginal(carga, filtros, ["mes"]);
+            var m = permitidas(carga, "mes", filtros.mes);
+            var xs = [], ys = [];
+            carga.etiquetas.mes.forEach(function (mes, i) {
+                if (m[i]) {
+                    xs.push(mes);
+                    ys.push(y[i]);
+                }
+            });
+            var nueva = copiar(fig);
+            nueva.data[0] = Object.assign({}, fig.data[0], {x: xs, y: ys});
+            return nueva;
+        }
+
+        function apiladas(carga, filtros, fig) {
+            var tabla = marginal(carga, filtros, ["departamento", "sexo"]);
+            var nSexo = carga.etiquetas.sexo.length;
+            var posDpto = posiciones(carga.nombres_departamento);
+            var posSexo = posiciones(carga.etiquetas.sexo);
+            var nueva = copiar(fig);
+            nueva.data = fig.data.map(function (traza) {
+                var j = posSexo[traza.name];
+                return Object.assign({}, traza, {
+                    y: traza.x.map(function (n) {
+                        return n in posDpto && j !== undefined ? tabla[posDpto[n] * nSexo + j] : 0;
+                    })
+                });
+            });
+            return nueva;
+        }
+
+        // Histograma con histfunc "sum" (tablero/fabrica.py): sólo cambia y
+        function histograma(carga, filtros, fig) {
+            var conteo = marginal(carga, filtros, ["edad"]);
+            var pos = posiciones(carga.etiquetas.edad);
+            var nueva = copiar(fig);
+            nueva.data[0] = Object.assign({}, fig.data[0], {
+                y: fig.data[0].x.map(function (e) { return e in pos ? conteo[pos[e]] : 0; })
+            });
+            return nueva;
+        }
+
+        function estado(dptos, sexos, edades, meses) {
+            return {departamento: dptos || [], sexo: sexos || [], edad: edades, mes: meses};
+        }
+
+        return {
+            filtrar_exploracion: function (dptos, sexos, edades, meses, carga, figMapa, figLinea) {
+                if (!carga || !figMapa || !figLinea) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                var f = estado(dptos, sexos, edades, meses);
+                return [mapa(carga, f, figMapa), linea(carga, f, figLinea)];
+            },
+            filtrar_causas: function (dptos, sexos, edades, meses, carga, figMapa, figStack, figHist) {
+                if (!carga || !figMapa || !figStack || !figHist) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                // Con varios conjuntos la carga trae las barras y el histograma del elegido
+                var f = estado(dptos, sexos, edades, meses), propias = carga.figuras || {};
+                return [mapa(carga, f, figMapa), apiladas(carga, f, propias.stack || figStack),
+                        histograma(carga, f, propias.hist || figHist)];
+            },
+            // Enlace de tablero/descargas.py con el estado actual de los filtros
+            enlace_descarga: function (dptos, sexos, edades, meses, causas, conjunto) {
+                var partes = [];
+                [["departamento", dptos], ["sexo", sexos], ["edad", edades], ["mes", meses],
+                 ["causa", causas]].forEach(function (par) {
+                    if (par[1] && par[1].length) {
+                        partes.push(par[0] + "=" + encodeURIComponent(par[1].join(",")));
+                    }
+                });
+                if (conjunto) {
+                    partes.push("conjunto=" + encodeURIComponent(conjunto));
+                }
+                return "/descargas/registros.csv" + (partes.length ? "?" + partes.join("&") : "");
+            }
+        };
+    })()
+});
@@ -0,0 +1,362 @@
+"""
+Prueba de carga del servidor Dash con percentiles de latencia por ruta.
+
+Levanta ``app:server`` bajo gunicorn con ``gunicorn.conf.py`` (workers
+``gthread``, como en producción; ``--workers`` cambia sólo cuántos) o usa
+``--url`` de un servidor ya en marcha, y reproduce cargas de página completas: el HTML de la ruta,
+``/_dash-layout``, ``/_dash-dependencies`` y los POST a
+``/_dash-update-component`` de ``display_page`` y de los callbacks que el
+navegador dispara al cargar esa página. La lista de callbacks sale de
+``/_dash-dependencies`` y del contenido de cada página (los del servidor,
+sin ``prevent_initial_call``, con entradas presentes), así que incluye
+cualquier callback nuevo sin tocar este script. Los valores de los filtros
+se sortean con semilla fija a partir de las opciones del layout; el resto de
+las entradas lleva su valor por defecto.
+
+Para cada nivel de concurrencia reporta rendimiento, p50/p95/p99, tamaño de
+respuesta y RSS de los workers, y guarda todo en un JSON con el mismo
+esquema entre corridas; ``--comparar`` imprime las diferencias contra una
+corrida anterior.
+
+Uso (desde la raíz del repositorio)::
+
+    python benchmarks/carga.py --concurrencias 1,4,16 --duracion 20 --workers 2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tablero.salud import props_por_id, salidas_de  # noqa: E402
+
+RUTAS = ("/", "/exploracion", "/causas")
+
+
+class Escenario:
+    """Genera valores de entrada realistas para los callbacks."""
+
+    def __init__(self, props, semilla):
+        """``props``: ``{id: props}`` del layout global y de las páginas."""
+        self.azar = random.Random(semilla)
+        self.props = props
+        self.dptos = [o["value"] for o in props.get("filtro-dpto", {}).get("options", [])]
+        self.sexos = [o["value"] for o in props.get("filtro-sexo", {}).get("options", [])]
+        edad = props.get("filtro-edad", {})
+        self.edad = (edad.get("min", 0), edad.get("max", 10))
+
+    def valor(self, ident, propiedad, ruta):
+        a = self.azar
+        if (ident, propiedad) == ("url", "pathname"):
+            return ruta
+        if ident == "filtro-dpto":
+            return a.sample(self.dptos, k=a.randint(0, min(3, len(self.dptos))))
+        if ident == "filtro-sexo":
+            return a.sample(self.sexos, k=a.randint(0, len(self.sexos)))
+        if ident == "filtro-edad":
+            i0 = a.randint(*self.edad)
+            return [i0, a.randint(i0, self.edad[1])]
+        if ident == "filtro-mes":
+            m0 = a.randint(1, 12)
+            return [m0, a.randint(m0, 12)]
+        return self.props.get(ident, {}).get(propiedad)
+
+
+def _nombre(dep):
+    salidas = salidas_de(dep["output"])
+    return salidas[0]["id"] if isinstance(salidas, list) else salidas["id"]
+
+
+def _cuerpo(dep, escenario, ruta):
+    entradas = [dict(p, value=escenario.valor(p["id"], p["property"], ruta)) for p in dep["inputs"]]
+    estado = [dict(p, value=escenario.valor(p["id"], p["property"], ruta)) for p in dep["state"]]
+    return {
+        "output": dep["output"],
+        "outputs": salidas_de(dep["output"]),
+        "inputs": entradas,
+        "state": estado,
+        "changedPropIds": [f"{p['id']}.{p['property']}" for p in dep["inputs"]],
+    }
+
+
+def _pagina(url, dependencias, globales, ruta):
+    """
+    ``(callbacks, props)`` de ``ruta``: ``display_page`` seguido de los
+    callbacks del servidor que el navegador dispara al montar la página, y
+    los props de sus componentes.
+    """
+    servidor = [d for d in dependencias if not d.get("clientside_function")]
+    pagina_dep = next(d for d in servidor if "page-content.children" in d["output"])
+    cuerpo = _cuerpo(pagina_dep, Escenario(globales, 0), ruta)
+    respuesta = requests.post(url + "/_dash-update-component", json=cuerpo, timeout=120)
+    respuesta.raise_for_status()
+    locales = props_por_id(respuesta.json()["response"]["page-content"]["children"])
+    conocidos = set(globales) | set(locales)
+    elegidos = [pagina_dep]
+    for dep in servidor:
+        if dep is pagina_dep or dep.get("prevent_initial_call"):
+            continue
+        ids = {p["id"] for p in dep["inputs"] + dep["state"]}
+        salidas = salidas_de(dep["output"])
+        salidas = {s["id"] for s in (salidas if isinstance(salidas, list) else [salidas])}
+        if ids <= conocidos and (ids | salidas) & set(locales):
+            elegidos.append(dep)
+    return elegidos, locales
+
+
+class Medicion:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.tamanos = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.candado = threading.Lock()
+
+    def registrar(self, etiqueta, segundos, tamano, ok):
+        with self.candado:
+            self.latencias[etiqueta].append(segundos)
+            self.tamanos[etiqueta].append(tamano)
+            if not ok:
+                self.errores[etiqueta] += 1
+
+
+def _pedir(sesion, medicion, etiqueta, metodo, url, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        r = sesion.request(metodo, url, timeout=120, **kwargs)
+        medicion.registrar(etiqueta, time.perf_counter() - inicio, len(r.content), r.ok)
+        return r
+    except requests.RequestException:
+        medicion.registrar(etiqueta, time.perf_counter() - inicio, 0, False)
+        return None
+
+
+def _cargar_pagina(sesion, url, ruta, callbacks, escenario, medicion):
+    _pedir(sesion, medicion, f"GET {ruta}", "GET", url + ruta)
+    _pedir(sesion, medicion, "GET /_dash-layout", "GET", url + "/_dash-layout")
+    _pedir(sesion, medicion, "GET /_dash-dependencies", "GET", url + "/_dash-dependencies")
+    for dep in callbacks[ruta]:
+        _pedir(sesion, medicion, f"POST {ruta} -> {_nombre(dep)}", "POST",
+               url + "/_dash-update-component", json=_cuerpo(dep, escenario, ruta))
+
+
+def _hijos(pid):
+    hijos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    hijos.append(int(entrada))
+        except (OSError, IndexError, ValueError):
+            continue
+    return hijos
+
+
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MuestreoRSS(threading.Thread):
+    """Máximo de RSS por worker mientras dura un nivel de concurrencia."""
+
+    def __init__(self, pid_maestro, intervalo=0.5):
+        super().__init__(daemon=True)
+        self.pid_maestro = pid_maestro
+        self.intervalo = intervalo
+        self.maximos = {}
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.is_set():
+            for pid in _hijos(self.pid_maestro):
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    self.maximos[pid] = max(self.maximos.get(pid, 0), rss)
+            self.detener.wait(self.intervalo)
+
+
+def _resumen(medicion, duracion):
+    rutas = {}
+    total = 0
+    for etiqueta, lat in sorted(medicion.latencias.items()):
+        lat = np.array(lat) * 1000
+        tam = np.array(medicion.tamanos[etiqueta])
+        total += len(lat)
+        rutas[etiqueta] = {
+            "n": int(len(lat)),
+            "errores": medicion.errores[etiqueta],
+            "rps": round(len(lat) / duracion, 2),
+            "p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "p99_ms": round(float(np.percentile(lat, 99)), 1),
+            "bytes_medio": int(tam.mean()),
+        }
+    return rutas, round(total / duracion, 2)
+
+
+def nivel(url, callbacks, props, concurrencia, duracion, semilla, pid_maestro):
+    medicion = Medicion()
+    fin = time.perf_counter() + duracion
+    cargas = [0] * concurrencia
+
+    def usuario(i):
+        escenario = Escenario(props, semilla + i)
+        sesion = requests.Session()
+        rutas = list(callbacks)
+        while time.perf_counter() < fin:
+            _cargar_pagina(sesion, url, escenario.azar.choice(rutas), callbacks,
+                           escenario, medicion)
+            cargas[i] += 1
+
+    muestreo = MuestreoRSS(pid_maestro) if pid_maestro else None
+    if muestreo:
+        muestreo.start()
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=usuario, args=(i,)) for i in range(concurrencia)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    transcurrido = time.perf_counter() - inicio
+    if muestreo:
+        muestreo.detener.set()
+        muestreo.join()
+
+    rutas, rps = _resumen(medicion, transcurrido)
+    return {
+        "concurrencia": concurrencia,
+        "segundos": round(transcurrido, 2),
+        "cargas_pagina": sum(cargas),
+        "cargas_por_s": round(sum(cargas) / transcurrido, 2),
+        "peticiones_por_s": rps,
+        "rss_workers_mb": sorted(round(v, 1) for v in muestreo.maximos.values()) if muestreo else None,
+        "rutas": rutas,
+    }
+
+
+def _esperar(url, workers, limite=600):
+    """
+    Espera a que ``workers`` procesos distintos respondan 200 en /readyz
+    (cada respuesta trae el pid del worker que la atendió). Cada sondeo abre
+    una conexión nueva para que el balanceo de gunicorn reparta entre ellos.
+    """
+    fin = time.time() + limite
+    listos = set()
+    while time.time() < fin:
+        try:
+            r = requests.get(url + "/readyz", timeout=5, headers={"Connection": "close"})
+            if r.ok:
+                listos.add(r.json().get("pid"))
+                if len(listos) >= workers:
+                    return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.2 if listos else 1)
+    raise RuntimeError(f"{len(listos)} de {workers} workers listos en {limite} s: {url}")
+
+
+def _imprimir(resultado):
+    for n in resultado["niveles"]:
+        print(f"\n== concurrencia {n['concurrencia']}: {n['cargas_por_s']} cargas/s, "
+              f"{n['peticiones_por_s']} req/s, RSS workers {n['rss_workers_mb']} MB")
+        print(f"{'ruta':55s} {'n':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'KB':>9s} {'err':>4s}")
+        for etiqueta, r in n["rutas"].items():
+            print(f"{etiqueta[:55]:55s} {r['n']:6d} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+                  f"{r['p99_ms']:8.1f} {r['bytes_medio'] / 1024:9.1f} {r['errores']:4d}")
+
+
+def _comparar(actual, anterior):
+    previos = {n["concurrencia"]: n for n in anterior["niveles"]}
+    print("\n== comparación contra", anterior.get("fecha"))
+    for n in actual["niveles"]:
+        p = previos.get(n["concurrencia"])
+        if not p:
+            continue
+        print(f"concurrencia {n['concurrencia']}: cargas/s {p['cargas_por_s']} -> {n['cargas_por_s']}")
+        for etiqueta, r in n["rutas"].items():
+            q = p["rutas"].get(etiqueta)
+            if q:
+                print(f"  {etiqueta[:50]:50s} p95 {q['p95_ms']:8.1f} -> {r['p95_ms']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del dashboard.")
+    parser.add_argument("--concurrencias", default="1,4,16")
+    parser.add_argument("--duracion", type=float, default=20, help="Segundos por nivel")
+    parser.add_argument("--workers", type=int,
+                        help="Workers de gunicorn (2); con --url, workers a esperar (1)")
+    parser.add_argument("--bind", default="127.0.0.1:8061")
+    parser.add_argument("--url", help="Usa un servidor ya en marcha en lugar de gunicorn")
+    parser.add_argument("--semilla", type=int, default=2019)
+    parser.add_argument("--salida", default="benchmarks/resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    proceso = None
+    url = args.url
+    if url is None:
+        args.workers = args.workers or 2
+        url = f"http://{args.bind}"
+        proceso = subprocess.Popen([sys.executable, "-m", "gunicorn", "-w", str(args.workers),
+                                    "-b", args.bind, "--timeout", "300", "app:server"])
+    try:
+        arranque = time.perf_counter()
+        _esperar(url, args.workers or 1)
+        arranque = time.perf_counter() - arranque
+        props = props_por_id(requests.get(url + "/_dash-layout", timeout=120).json())
+        dependencias = requests.get(url + "/_dash-dependencies", timeout=120).json()
+        callbacks = {}
+        for ruta in RUTAS:
+            callbacks[ruta], locales = _pagina(url, dependencias, props, ruta)
+            props = dict(locales, **props)
+        niveles = [nivel(url, callbacks, props, int(c), args.duracion, args.semilla,
+                         proceso.pid if proceso else None)
+                   for c in args.concurrencias.split(",")]
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
+
+    resultado = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                 capture_output=True, text=True).stdout.strip(),
+        "maquina": {"cpus": os.cpu_count(), "python": platform.python_version()},
+        "callbacks": {r: [_nombre(d) for d in deps] for r, deps in callbacks.items()},
+        "parametros": {"workers": args.workers, "duracion": args.duracion,
+                       "semilla": args.semilla, "url_externa": args.url is not None},
+        "arranque_s": round(arranque, 1),
+        "niveles": niveles,
+    }
+    _imprimir(resultado)
+    os.makedirs(args.salida, exist_ok=True)
+    ruta = os.path.join(args.salida, f"carga-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {ruta}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            _comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Equivalencia de las rutas optimizadas con el pipeline de referencia.
+
+``tablero.pipeline`` (el código original de ``app.py``) es la referencia:
+``cargar_datos`` da ``dep_muertes`` y ``construir_figuras`` las tablas de
+las figuras. Sobre la misma ``base`` se recalculan esas cifras por cada ruta
+optimizada y se exige igualdad exacta (mismo orden, mismos valores, también
+los empates de los rankings):
+
+- ``almacen``: conteos de ``tablero.almacen`` (``np.bincount``).
+- ``cubo``: marginales de ``tablero.cubo`` (sin municipios ni causas).
+- ``fabrica``: los datos que llevan las figuras de ``tablero.fabrica``.
+
+Tablas comparadas: ``dep_muertes``, ``mapa`` (``Total_muer_dep`` por
+departamento del shapefile), ``mes``, ``top5``, ``top10``, ``causas10``,
+``stack_df`` y ``edad`` (histograma, en orden de aparición). Para cada
+ruta se informa el tiempo frente a ``construir_figuras`` y, para la
+fábrica, el tamaño de las figuras serializadas.
+
+Entradas: el Anexo1 real si está en ``datos/`` y registros sintéticos con
+los códigos reales de Divipola, Anexo2 y el shapefile (más casos borde:
+municipios y causas que no cruzan, sexo y mes nulos, edad sin información).
+
+Uso (desde la raíz del repositorio)::
+
+    python benchmarks/equivalencia.py [--sinteticos 20000,200000] [--semilla 0]
+                                      [--sin-reales]
+
+Termina con código 1 si alguna comparación falla.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tablero import pipeline  # noqa: E402
+from tablero.almacen import COLUMNAS, Almacen  # noqa: E402
+from tablero.cubo import Cubo  # noqa: E402
+from tablero.fabrica import FabricaFiguras, desde_binario, top_k, trazas_dashboard  # noqa: E402
+
+TABLAS = ("dep_muertes", "mapa", "mes", "top5", "top10", "causas10", "stack_df", "edad")
+
+
+def _plano(valor):
+    """Escalar de Python comparable (NaN -> None)."""
+    valor = valor.item() if hasattr(valor, "item") else valor
+    return None if isinstance(valor, float) and np.isnan(valor) else valor
+
+
+def _registros(df):
+    return [tuple(_plano(v) for v in fila) for fila in df.itertuples(index=False)]
+
+
+def _cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def _columna_causa(base):
+    # Misma elección de columna que pipeline.causas_principales
+    columnas = [c for c in base.columns if "nombre" in c.lower() or "descr" in c.lower()]
+    return columnas[0] if columnas else None
+
+
+def referencia(datos):
+    """Tablas de referencia y segundos de ``construir_figuras``."""
+    base, resultado_mapa = datos["base"], datos["resultado_mapa"]
+    figuras, segundos = _cronometrar(pipeline.construir_figuras, base, resultado_mapa,
+                                     datos["geojson_dep"])
+    tablas = {
+        "dep_muertes": _registros(datos["dep_muertes"]),
+        "mapa": _registros(resultado_mapa[["DPTO_CCDGO", "Total_muer_dep"]]),
+        "top5": _registros(figuras["top5"]),
+        "top10": _registros(figuras["top10"]),
+        "stack_df": _registros(figuras["stack_df"]),
+        "edad": _registros(base.groupby("RANGO_EDAD", sort=False).size().reset_index()),
+    }
+    if figuras["muertes_mes"] is not None:
+        tablas["mes"] = _registros(figuras["muertes_mes"])
+    if _columna_causa(base) is not None:
+        tablas["causas10"] = _registros(figuras["causas10"])
+    return tablas, segundos, figuras
+
+
+def _dep_muertes(codigos, conteo, total):
+    con_datos = conteo > 0
+    proporcion = np.round(conteo[con_datos] / total, 3) * 100
+    return [(c, int(t), total, _plano(p)) for c, t, p in
+            zip(codigos[con_datos].tolist(), conteo[con_datos].tolist(), proporcion)]
+
+
+def _stack(codigos, tabla, sexos, nombres_dpto):
+    # groupby(["DPTO_CNMBR", "SEXO"]): suma por nombre, ordenado por nombre y sexo
+    por_nombre = {}
+    for i, c in enumerate(codigos.tolist()):
+        nombre = nombres_dpto.get(c)
+        if nombre is not None:
+            por_nombre[nombre] = por_nombre.get(nombre, 0) + tabla[i]
+    return [(n, s, int(por_nombre[n][j])) for n in sorted(por_nombre)
+            for j, s in enumerate(sexos.tolist()) if por_nombre[n][j] > 0]
+
+
+def desde_almacen(almacen, nombres_dpto, causa):
+    etq = almacen.etiquetas
+    tablas = {"dep_muertes": _dep_muertes(etq["departamento"],
+                                          almacen.contar(("departamento",))[:-1], almacen.n)}
+    por_dpto = dict(zip(etq["departamento"].tolist(),
+                        almacen.contar(("departamento",))[:-1].tolist()))
+    tablas["mapa"] = [(c, float(por_dpto[c]) if por_dpto.get(c) else None) for c in nombres_dpto]
+    mes = almacen.contar(("mes",))[:-1]
+    tablas["mes"] = [(m, int(t)) for m, t in zip(etq["mes"].tolist(), mes.tolist()) if t > 0]
+    municipios = almacen.contar(("municipio",))[:-1]
+    for k in (5, 10):
+        top = top_k(municipios, k)
+        tablas[f"top{k}"] = list(zip(etq["municipio"][top].tolist(), municipios[top].tolist()))
+    dim = next((d for d, c in COLUMNAS.items() if c == causa), None)
+    if dim is not None:
+        conteo = almacen.contar((dim,))[:-1]
+        top = top_k(conteo, 10)
+        tablas["causas10"] = list(zip(etq[dim][top].tolist(), conteo[top].tolist()))
+    tablas["stack_df"] = _stack(etq["departamento"],
+                                almacen.contar(("departamento", "sexo"))[:-1, :-1],
+                                etq["sexo"], nombres_dpto)
+    codigos = almacen.columnas["edad"]
+    presentes, primero = np.unique(codigos, return_index=True)
+    presentes = presentes[np.argsort(primero)]
+    conteo = np.bincount(codigos, minlength=len(etq["edad"]) + 1)
+    tablas["edad"] = [(etq["edad"][i].item(), int(conteo[i]))
+                      for i in presentes if i < len(etq["edad"])]
+    return tablas
+
+
+def desde_cubo(cubo, nombres_dpto, total):
+    etq = cubo.etiquetas
+    por_dpto = cubo.marginal(("departamento",), {})
+    mes = cubo.marginal(("mes",), {})
+    edad = cubo.marginal(("edad",), {})
+    conteo_dpto = dict(zip(etq["departamento"].tolist(), por_dpto.tolist()))
+    return {
+        "dep_muertes": _dep_muertes(etq["departamento"], por_dpto, total),
+        "mapa": [(c, float(conteo_dpto[c]) if conteo_dpto.get(c) else None)
+                 for c in nombres_dpto],
+        "mes": [(m, int(t)) for m, t in zip(etq["mes"].tolist(), mes.tolist()) if t > 0],
+        "stack_df": _stack(etq["departamento"], cubo.marginal(("departamento", "sexo"), {}),
+                           etq["sexo"], nombres_dpto),
+        # El cubo no guarda el orden de aparición: se compara como conjunto
+        "edad": {e: int(t) for e, t in zip(etq["edad"].tolist(), edad.tolist()) if t > 0},
+    }
+
+
+def desde_figuras(figuras):
+    """Las tablas tal como quedaron dentro de las figuras de la fábrica."""
+    def datos(nombre, i=0):
+        return figuras[nombre]["data"][i]
+
+    mapa = datos("mapa_fig")
+    tablas = {
+        "mapa": [(c, _plano(z)) for c, z in zip(mapa["locations"], desde_binario(mapa["z"]))],
+        "mes": list(zip(desde_binario(datos("linea_fig")["x"]).tolist(),
+                        desde_binario(datos("linea_fig")["y"]).tolist())),
+        "top5": list(zip(datos("barras_top5")["x"],
+                         desde_binario(datos("barras_top5")["y"]).tolist())),
+        "top10": list(zip(datos("pie_top10")["labels"],
+                          desde_binario(datos("pie_top10")["values"]).tolist())),
+        "edad": list(zip(datos("hist_fig")["x"], desde_binario(datos("hist_fig")["y"]).tolist())),
+    }
+    # Una traza por sexo; stack_df viene ordenado por departamento y sexo
+    tablas["stack_df"] = sorted((n, traza["name"], t) for traza in figuras["stack_fig"]["data"]
+                                for n, t in zip(traza["x"], desde_binario(traza["y"]).tolist()))
+    return tablas
+
+
+def comparar(referencia_, optimizada):
+    """``{tabla: None | descripción de la primera diferencia}`` de las tablas comunes."""
+    resultado = {}
+    for tabla in TABLAS:
+        if tabla not in referencia_ or tabla not in optimizada:
+            continue
+        esperado, obtenido = referencia_[tabla], optimizada[tabla]
+        if isinstance(obtenido, dict):
+            esperado = dict(esperado)
+        if esperado == obtenido:
+            resultado[tabla] = None
+        elif isinstance(esperado, dict):
+            claves = sorted(set(esperado) | set(obtenido), key=str)
+            k = next(k for k in claves if esperado.get(k) != obtenido.get(k))
+            resultado[tabla] = f"{k}: referencia {esperado.get(k)} != {obtenido.get(k)}"
+        else:
+            i = next((i for i, (a, b) in enumerate(zip(esperado, obtenido)) if a != b),
+                     min(len(esperado), len(obtenido)))
+            resultado[tabla] = (f"fila {i}: referencia {esperado[i:i + 1]} != {obtenido[i:i + 1]} "
+                                f"({len(esperado)} vs {len(obtenido)} filas)")
+    return resultado
+
+
+def _tamano(figuras):
+    import plotly.io as pio
+
+    return sum(len(pio.to_json(f, validate=False)) for f in figuras)
+
+
+def evaluar(nombre, datos):
+    base, resultado_mapa = datos["base"], datos["resultado_mapa"]
+    nombres_dpto = dict(zip(resultado_mapa["DPTO_CCDGO"], resultado_mapa["DPTO_CNMBR"]))
+    ubicaciones = resultado_mapa["DPTO_CCDGO"].tolist()
+    ref, t_ref, figuras_ref = referencia(datos)
+
+    almacen, t_almacen_base = _cronometrar(
+        Almacen.desde_base, base, None, {"edad": pipeline.VALORES_EDAD})
+    cubo, t_cubo_base = _cronometrar(Cubo.desde_almacen, almacen)
+
+    rutas = {}
+    tablas, t = _cronometrar(desde_almacen, almacen, nombres_dpto, _columna_causa(base))
+    rutas["almacen"] = {"segundos": t, "preparacion_s": t_almacen_base,
+                        "diferencias": comparar(ref, tablas)}
+    tablas, t = _cronometrar(desde_cubo, cubo, nombres_dpto, almacen.n)
+    rutas["cubo"] = {"segundos": t, "preparacion_s": t_cubo_base,
+                     "diferencias": comparar(ref, tablas)}
+
+    trazas = trazas_dashboard(almacen, ubicaciones, nombres_dpto)
+    fabrica, t_esqueletos = _cronometrar(
+        FabricaFiguras.plantillas, datos["geojson_dep"], [t["name"] for t in trazas["stack_fig"]])
+    figuras, t = _cronometrar(
+        lambda: fabrica.figuras(trazas_dashboard(almacen, ubicaciones, nombres_dpto)))
+    rutas["fabrica"] = {"segundos": t, "preparacion_s": t_esqueletos,
+                        "diferencias": comparar(ref, desde_figuras(figuras)),
+                        "bytes": _tamano(figuras.values()),
+                        "bytes_referencia": _tamano(figuras_ref[n] for n in figuras)}
+
+    print(f"\n== {nombre}: {len(base):,} registros; construir_figuras {t_ref:.3f} s")
+    fallas = 0
+    for ruta, r in rutas.items():
+        malas = {k: v for k, v in r["diferencias"].items() if v}
+        fallas += len(malas)
+        r["aceleracion"] = t_ref / r["segundos"] if r["segundos"] else None
+        extra = (f"  figuras {r['bytes'] / 1024:.0f} KB vs {r['bytes_referencia'] / 1024:.0f} KB"
+                 if "bytes" in r else "")
+        print(f"{ruta:8s} {r['segundos']:8.4f} s (x{r['aceleracion']:.0f}; preparación "
+              f"{r['preparacion_s']:.3f} s) {'OK' if not malas else 'FALLA'} "
+              f"[{', '.join(r['diferencias'])}]{extra}")
+        for tabla, detalle in malas.items():
+            print(f"    {tabla}: {detalle}")
+    return {"registros": len(base), "referencia_s": t_ref, "rutas": rutas}, fallas
+
+
+def sinteticos(n, semilla=0):
+    """Registros con la forma de Anexo1 sobre los códigos reales de Divipola y Anexo2."""
+    rng = np.random.default_rng(semilla)
+    municipios = pd.read_excel(pipeline.RUTA_MUNICIPIOS)
+    codigos = pd.read_excel(pipeline.RUTA_CODIGOS)
+    claves = municipios[["COD_DEPARTAMENTO", "COD_MUNICIPIO"]].drop_duplicates().to_numpy()
+    causas = codigos["Código de la CIE-10 cuatro caracteres"].dropna().unique()
+
+    # Pesos tipo Zipf: pocos municipios y causas concentran los registros
+    def zipf(k):
+        p = 1.0 / np.arange(1, k + 1)
+        return rng.permutation(p / p.sum())
+
+    fila = rng.choice(len(claves), n, p=zipf(len(claves)))
+    mortalidad = pd.DataFrame({
+        "COD_DEPARTAMENTO": claves[fila, 0],
+        "COD_MUNICIPIO": claves[fila, 1],
+        "SEXO": rng.choice([1, 2, 3, 9], n, p=[0.54, 0.45, 0.005, 0.005]),
+        "GRUPO_EDAD1": rng.integers(0, 30, n),
+        "MES": rng.integers(1, 13, n).astype(float),
+        "COD_MUERTE": rng.choice(causas, n, p=zipf(len(causas))),
+    })
+    borde = rng.random(n)
+    mortalidad.loc[borde < 0.002, "COD_MUNICIPIO"] = 999
+    mortalidad.loc[(borde >= 0.002) & (borde < 0.003), "COD_DEPARTAMENTO"] = 99
+    mortalidad.loc[(borde >= 0.003) & (borde < 0.004), "COD_MUERTE"] = "X000"
+    mortalidad.loc[(borde >= 0.004) & (borde < 0.005), "MES"] = np.nan
+    mortalidad.loc[(borde >= 0.005) & (borde < 0.006), "GRUPO_EDAD1"] = 99
+    return mortalidad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Equivalencia con el pipeline de referencia.")
+    parser.add_argument("--sinteticos", default="20000,200000",
+                        help="tamaños de las entradas sintéticas, separados por comas")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sin-reales", action="store_true")
+    parser.add_argument("--salida", default="benchmarks/resultados")
+    args = parser.parse_args()
+
+    entradas = []
+    if not args.sin_reales:
+        if os.path.exists(pipeline.RUTA_MORTALIDAD):
+            entradas.append(("real", lambda: pipeline.cargar_datos()))
+        else:
+            print(f"{pipeline.RUTA_MORTALIDAD} no existe: sólo entradas sintéticas")
+    for n in (int(v) for v in args.sinteticos.split(",") if v):
+        entradas.append((f"sintetico-{n}", lambda n=n: pipeline.cargar_datos(
+            mortalidad=sinteticos(n, args.semilla))))
+
+    resultados, fallas = {}, 0
+    for nombre, cargar in entradas:
+        resultados[nombre], f = evaluar(nombre, cargar())
+        fallas += f
+
+    os.makedirs(args.salida, exist_ok=True)
+    ruta = os.path.join(args.salida, f"equivalencia-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "semilla": args.semilla,
+                   "entradas": resultados}, f, indent=2, ensure_ascii=False, default=str)
+    print(f"\n{'Sin diferencias' if not fallas else f'{fallas} tablas con diferencias'}; "
+          f"resultados en {ruta}")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
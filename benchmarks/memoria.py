@@ -0,0 +1,77 @@
+"""
+Tiempo de importación y RSS base de ``app`` por modo de ejecución.
+
+Cada modo se mide en un proceso nuevo: segundos hasta terminar
+``import app`` (lectura de datos y figuras incluidas), RSS al final y
+máximo, y qué librerías pesadas quedaron cargadas. Sirve para dimensionar
+los contenedores de cada worker.
+
+Uso (desde la raíz del repositorio; el modo liviano requiere haber corrido
+``python -m tablero.artefactos``)::
+
+    python benchmarks/memoria.py [--modos completo,liviano] [--repeticiones 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PESADAS = ("pandas", "geopandas", "shapely", "pyproj", "plotly.express")
+
+SONDA = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+segundos = time.perf_counter() - inicio
+with open("/proc/self/status") as f:
+    rss = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+print(json.dumps({
+    "import_s": segundos,
+    "rss_mb": rss / 1024,
+    "rss_max_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modulos": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (PESADAS,)
+
+
+def medir(modo):
+    entorno = dict(os.environ, MORTALIDAD_MODO=modo, MORTALIDAD_CALENTAR="0")
+    salida = subprocess.run([sys.executable, "-c", SONDA], env=entorno, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación y memoria por modo.")
+    parser.add_argument("--modos", default="completo,liviano")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", default="benchmarks/resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    for modo in args.modos.split(","):
+        corridas = [medir(modo) for _ in range(args.repeticiones)]
+        resultados[modo] = {
+            "import_s": round(statistics.median(c["import_s"] for c in corridas), 2),
+            "rss_mb": round(statistics.median(c["rss_mb"] for c in corridas), 1),
+            "rss_max_mb": round(max(c["rss_max_mb"] for c in corridas), 1),
+            "modulos_pesados": corridas[0]["modulos"],
+        }
+        r = resultados[modo]
+        print(f"{modo:10s} import {r['import_s']:7.2f} s  RSS {r['rss_mb']:8.1f} MB  "
+              f"(máx {r['rss_max_mb']:.1f})  pesados: {', '.join(r['modulos_pesados']) or '-'}")
+
+    os.makedirs(args.salida, exist_ok=True)
+    ruta = os.path.join(args.salida, f"memoria-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "repeticiones": args.repeticiones, "modos": resultados}, f, indent=2)
+    print(f"Resultados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Configuración de gunicorn; se lee sola al correr ``gunicorn app:server``
+desde la raíz del repositorio.
+
+Workers ``gthread``: una descarga de ``tablero.descargas`` sale en bloques
+desde un generador y ocupa uno de los hilos del worker, no el worker
+entero, mientras los demás hilos siguen atendiendo el tablero y la API.
+
+Variables de entorno:
+
+- ``PORT``: puerto (8050).
+- ``WEB_CONCURRENCY``: workers (2).
+- ``GUNICORN_THREADS``: hilos por worker (4).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 300
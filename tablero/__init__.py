@@ -0,0 +1,6 @@
+"""
+Componentes de apoyo del dashboard de mortalidad en Colombia 2019.
+
+Cada módulo trabaja sobre arreglos NumPy construidos una vez a partir de
+``base`` (ver ``app.py``) y se guardan en disco por versión de los datos.
+"""
@@ -0,0 +1,109 @@
+"""
+Almacén columnar de los registros de defunción.
+
+Cada dimensión de ``base`` se guarda como un arreglo ``int32`` de códigos
+(ver ``tablero.dimensiones``) con sus etiquetas. Los conteos por cualquier
+combinación de dimensiones salen de un único ``np.bincount`` sobre el índice
+plano, sin pasar por ``groupby``.
+"""
+
+import os
+
+import numpy as np
+
+from tablero.dimensiones import codificar, indices
+from tablero.version import ruta_cache
+
+# Dimensión -> columna de ``base``
+COLUMNAS = {
+    "departamento": "COD_DEPARTAMENTO",
+    "municipio": "MUNICIPIO",
+    "cod_municipio": "COD_DANE_MUNICIPIO",
+    "sexo": "SEXO",
+    "edad": "RANGO_EDAD",
+    "mes": "MES",
+    "causa3": "Código de la CIE-10 tres caracteres",
+    "causa4": "COD_MUERTE",
+    "capitulo": "Nombre capítulo",
+}
+
+
+class Almacen:
+    """Columnas codificadas ``{dimension: codigos}`` y sus ``etiquetas``."""
+
+    def __init__(self, columnas, etiquetas, version=None):
+        self.columnas = columnas
+        self.etiquetas = etiquetas
+        self.version = version
+        self.n = len(next(iter(columnas.values())))
+
+    @classmethod
+    def desde_base(cls, base, version=None, ordenes=None):
+        """``ordenes`` fija el orden de etiquetas de algunas dimensiones (p. ej. edad)."""
+        import pandas as pd
+
+        ordenes = ordenes or {}
+        derivadas = {}
+        if {"COD_DEPARTAMENTO", "COD_MUNICIPIO"} <= set(base.columns):
+            derivadas["COD_DANE_MUNICIPIO"] = (base["COD_DEPARTAMENTO"].astype(str)
+                                               + base["COD_MUNICIPIO"].astype(str))
+        columnas, etiquetas = {}, {}
+        for dim, col in COLUMNAS.items():
+            if col in derivadas:
+                valores = derivadas[col]
+            elif col in base.columns:
+                valores = base[col]
+            else:
+                valores = pd.Series([None] * len(base), dtype=object)
+            columnas[dim], etiquetas[dim] = codificar(valores, ordenes.get(dim))
+        return cls(columnas, etiquetas, version)
+
+    @classmethod
+    def obtener(cls, base, version, ordenes=None):
+        """Carga el almacén de la caché de ``version`` o lo construye y guarda."""
+        ruta = ruta_cache("almacen", version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        almacen = cls.desde_base(base, version, ordenes)
+        almacen.guardar(ruta)
+        return almacen
+
+    def guardar(self, ruta):
+        arreglos = {f"col_{d}": c for d, c in self.columnas.items()}
+        arreglos.update({f"etq_{d}": e for d, e in self.etiquetas.items()})
+        np.savez(ruta, version=str(self.version), **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            dims = [k[4:] for k in z.files if k.startswith("col_")]
+            return cls({d: z[f"col_{d}"] for d in dims},
+                       {d: z[f"etq_{d}"] for d in dims},
+                       version=str(z["version"]))
+
+    def forma(self, dims):
+        return tuple(len(self.etiquetas[d]) + 1 for d in dims)
+
+    def mascara(self, filtros):
+        """
+        Máscara booleana de filas para ``{dimension: [etiquetas]}``; las
+        dimensiones sin selección no filtran. ``None`` si no hay filtros.
+        """
+        mascara = None
+        for dim, seleccion in filtros.items():
+            if not seleccion:
+                continue
+            permitidas = np.zeros(len(self.etiquetas[dim]) + 1, dtype=bool)
+            permitidas[indices(self.etiquetas[dim], seleccion)] = True
+            m = permitidas[self.columnas[dim]]
+            mascara = m if mascara is None else mascara & m
+        return mascara
+
+    def contar(self, dims, mascara=None):
+        """Conteos densos con forma ``forma(dims)`` (incluye la casilla de nulos)."""
+        forma = self.forma(dims)
+        codigos = [self.columnas[d] for d in dims]
+        if mascara is not None:
+            codigos = [c[mascara] for c in codigos]
+        plano = np.ravel_multi_index(codigos, forma)
+        return np.bincount(plano, minlength=int(np.prod(forma))).reshape(forma)
@@ -0,0 +1,232 @@
+"""
+API de solo lectura con conteos agregados (``/api/v1``).
+
+Rutas montadas en el ``server`` de Flask::
+
+    GET /api/v1/dimensions
+    GET /api/v1/counts?by=departamento,sexo&mes=3[&limit=100&offset=0][&format=csv]
+                      [&conjunto=fetal]
+
+Cada consulta se agrega en el momento sobre las columnas de códigos del
+almacén columnar, sin copiarlas: máscara de los filtros, ``np.unique`` del
+índice plano de las dimensiones de ``by`` y orden por total descendente y
+códigos (el mismo resultado que un ``GROUP BY ... ORDER BY total DESC``).
+Con municipio y causa a cuatro caracteres una tabla de hechos preagregada
+tendría casi una fila por registro, y cada worker guardaría su copia; así
+la API no ocupa memoria propia y el costo queda en la primera consulta de
+cada combinación, porque las respuestas van por la caché de callbacks
+(llave = versión de los datos + parámetros). Sólo se aceptan las
+dimensiones de ``DIMENSIONES``; cualquier otro parámetro es un error 400.
+
+Con varios conjuntos de datos (``tablero.conjuntos``) ``conjunto`` elige
+el almacén; sin él se consulta el principal.
+
+En modo liviano no hay almacén y las filas son las celdas no vacías del
+cubo, con su conteo como peso (sólo departamento, sexo, edad y mes).
+"""
+
+import csv
+import io
+from urllib.parse import urlencode
+
+import numpy as np
+from flask import Response, jsonify, request
+
+PREFIJO = "/api/v1"
+
+# Nombre público -> dimensión del almacén
+DIMENSIONES = {
+    "departamento": "departamento",
+    "municipio": "cod_municipio",
+    "sexo": "sexo",
+    "edad": "edad",
+    "mes": "mes",
+    "capitulo": "capitulo",
+    "causa3": "causa3",
+    "causa4": "causa4",
+}
+
+LIMITE_DEFECTO = 1000
+LIMITE_MAXIMO = 10000
+
+_RESERVADOS = {"by", "limit", "offset", "format", "conjunto"}
+
+
+class ErrorConsulta(ValueError):
+    pass
+
+
+class ApiConteos:
+    def __init__(self, etiquetas, codigos, n=None, version=None):
+        """
+        ``codigos[dim]`` son columnas alineadas (se guardan por referencia) y
+        ``n`` el peso de cada fila; ``None`` es una defunción por fila.
+        """
+        self.etiquetas = etiquetas
+        self.codigos = codigos
+        self.n = n
+        self.version = version
+        self.dimensiones = [d for d in DIMENSIONES if d in etiquetas]
+        self.filas = len(next(iter(codigos.values())))
+
+    @classmethod
+    def desde_almacen(cls, almacen):
+        codigos = {p: almacen.columnas[d] for p, d in DIMENSIONES.items()}
+        etiquetas = {p: almacen.etiquetas[d] for p, d in DIMENSIONES.items()}
+        return cls(etiquetas, codigos, None, almacen.version)
+
+    @classmethod
+    def desde_cubo(cls, cubo):
+        from tablero.cubo import DIMENSIONES as DIMENSIONES_CUBO
+
+        celdas = np.nonzero(cubo.conteos)
+        codigos = dict(zip(DIMENSIONES_CUBO, celdas))
+        return cls(dict(cubo.etiquetas), codigos, cubo.conteos[celdas], cubo.version)
+
+    def _codigos(self, dim, valores):
+        posicion = {_texto(e): i for i, e in enumerate(self.etiquetas[dim].tolist())}
+        desconocidos = [v for v in valores if v not in posicion]
+        if desconocidos:
+            raise ErrorConsulta(f"valores desconocidos para {dim}: {', '.join(desconocidos)}")
+        return [posicion[v] for v in valores]
+
+    def _etiqueta(self, dim, codigo):
+        etiquetas = self.etiquetas[dim]
+        return etiquetas[codigo].item() if codigo < len(etiquetas) else None
+
+    def consultar(self, por, filtros, limite=LIMITE_DEFECTO, desplazamiento=0):
+        """
+        Conteos agrupados por ``por`` con ``filtros`` ``{dim: [etiquetas]}``.
+        Devuelve ``(registros, total_grupos)``.
+        """
+        for dim in list(por) + list(filtros):
+            if dim not in self.dimensiones:
+                raise ErrorConsulta(f"dimensión no permitida: {dim} "
+                                    f"(use {', '.join(self.dimensiones)})")
+        if len(set(por)) != len(por):
+            raise ErrorConsulta("dimensiones repetidas en by")
+        mascara = None
+        for dim, valores in filtros.items():
+            dentro = np.isin(self.codigos[dim], self._codigos(dim, valores))
+            mascara = dentro if mascara is None else mascara & dentro
+        pesos = self.n
+
+        def columna(dim):
+            return self.codigos[dim] if mascara is None else self.codigos[dim][mascara]
+
+        if pesos is not None and mascara is not None:
+            pesos = pesos[mascara]
+        if not por:
+            # Sin by: una sola fila con el total
+            if pesos is not None:
+                total = int(pesos.sum())
+            else:
+                total = int(mascara.sum()) if mascara is not None else self.filas
+            filas = [{"total": total}] if desplazamiento == 0 and limite > 0 else []
+            return filas, 1
+        forma = tuple(len(self.etiquetas[d]) + 1 for d in por)
+        plano = np.ravel_multi_index([columna(d) for d in por], forma)
+        if pesos is None:
+            unicos, totales = np.unique(plano, return_counts=True)
+        else:
+            unicos, inverso = np.unique(plano, return_inverse=True)
+            totales = np.bincount(inverso, weights=pesos, minlength=len(unicos)).astype(np.int64)
+        grupos = np.unravel_index(unicos, forma)
+        # ORDER BY total DESC, luego los códigos de by (la última llave manda)
+        orden = np.lexsort([*reversed(grupos), -totales])[desplazamiento:desplazamiento + limite]
+        registros = [dict({d: self._etiqueta(d, int(grupos[i][k])) for i, d in enumerate(por)},
+                          total=int(totales[k])) for k in orden.tolist()]
+        return registros, len(unicos)
+
+    def dimensiones_publicas(self):
+        return {d: self.etiquetas[d].tolist() for d in self.dimensiones}
+
+    def montar(self, server, cache, conjuntos=None):
+        """
+        Registra las rutas en ``server``; las consultas pasan por ``cache``.
+        ``conjuntos`` (``{clave: ApiConteos}``) habilita ``?conjunto=clave``.
+        """
+        consultar = cache.memoizar(PREFIJO + "/counts")(self.consultar)
+        conjuntos = conjuntos or {}
+        consultas = {c: consultar if a is self else
+                     cache.memoizar(f"{PREFIJO}/counts#{c}")(a.consultar)
+                     for c, a in conjuntos.items()}
+
+        def elegir(args):
+            clave = args.get("conjunto")
+            if clave is None:
+                return self, consultar
+            if clave not in conjuntos:
+                raise ErrorConsulta(f"conjunto desconocido: {clave} "
+                                    f"(use {', '.join(conjuntos) or 'ninguno'})")
+            return conjuntos[clave], consultas[clave]
+
+        @server.route(PREFIJO + "/dimensions")
+        def api_dimensiones():
+            try:
+                api, _ = elegir(request.args)
+            except ErrorConsulta as e:
+                return jsonify(error=str(e)), 400
+            return jsonify(version=api.version, dimensiones=api.dimensiones_publicas(),
+                           conjuntos=list(conjuntos))
+
+        @server.route(PREFIJO + "/counts")
+        def api_conteos():
+            try:
+                api, consultar_en = elegir(request.args)
+                por, filtros, limite, desplazamiento, formato = _leer_parametros(request.args)
+                registros, total = consultar_en(por, filtros, limite, desplazamiento)
+            except ErrorConsulta as e:
+                return jsonify(error=str(e)), 400
+            if formato == "csv":
+                salida = io.StringIO()
+                escritor = csv.DictWriter(salida, fieldnames=por + ["total"])
+                escritor.writeheader()
+                escritor.writerows(registros)
+                respuesta = Response(salida.getvalue(), mimetype="text/csv")
+                respuesta.headers["X-Total-Count"] = str(total)
+                return respuesta
+            siguiente = None
+            if desplazamiento + limite < total:
+                args = request.args.to_dict(flat=False)
+                args["offset"] = [str(desplazamiento + limite)]
+                siguiente = PREFIJO + "/counts?" + urlencode(args, doseq=True)
+            return jsonify(version=api.version, by=por, filtros=filtros, total_grupos=total,
+                           limit=limite, offset=desplazamiento, siguiente=siguiente,
+                           datos=registros)
+
+
+def _texto(etiqueta):
+    """Etiqueta como aparece en la URL (``mes=3`` también si la columna es flotante)."""
+    if isinstance(etiqueta, float) and etiqueta.is_integer():
+        return str(int(etiqueta))
+    return str(etiqueta)
+
+
+def _entero(args, nombre, defecto, maximo=None):
+    try:
+        valor = int(args.get(nombre, defecto))
+    except ValueError:
+        raise ErrorConsulta(f"{nombre} debe ser un entero")
+    if valor < 0 or (maximo is not None and valor > maximo):
+        raise ErrorConsulta(f"{nombre} fuera de rango (0 a {maximo})" if maximo else
+                            f"{nombre} no puede ser negativo")
+    return valor
+
+
+def _leer_parametros(args):
+    """``(por, filtros, limite, desplazamiento, formato)`` desde la query string."""
+    por = [d.strip() for d in args.get("by", "").split(",") if d.strip()]
+    filtros = {}
+    for nombre in args:
+        if nombre in _RESERVADOS:
+            continue
+        if nombre not in DIMENSIONES:
+            raise ErrorConsulta(f"parámetro no permitido: {nombre}")
+        filtros[nombre] = [v.strip() for valor in args.getlist(nombre)
+                           for v in valor.split(",") if v.strip()]
+    formato = args.get("format", "json")
+    if formato not in ("json", "csv"):
+        raise ErrorConsulta("format debe ser json o csv")
+    return (por, filtros, _entero(args, "limit", LIMITE_DEFECTO, LIMITE_MAXIMO),
+            _entero(args, "offset", 0), formato)
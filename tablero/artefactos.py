@@ -0,0 +1,118 @@
+"""
+Artefactos del modo liviano.
+
+``construir`` corre el pipeline completo fuera de línea y guarda sólo lo que
+el dashboard necesita para servir: las series, el cubo, el índice de causas
+y las capas espaciales como arreglos NumPy, la GeoJSON de departamentos y las especificaciones de
+las figuras fijas (``tablero.fabrica``, con arreglos binarios).
+``cargar`` los lee sin importar pandas, geopandas ni plotly; las figuras
+quedan como dicts JSON.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m tablero.artefactos [--salida artefactos]
+    MORTALIDAD_MODO=liviano gunicorn app:server
+"""
+
+import argparse
+import json
+import os
+import time
+
+from tablero.causas import IndiceCausas
+from tablero.cubo import Cubo
+from tablero.espacial import CapasEspaciales
+from tablero.fabrica import NOMBRES as FIGURAS
+from tablero.series import SeriesTemporales
+
+DIR_ARTEFACTOS = os.environ.get("MORTALIDAD_ARTEFACTOS", "artefactos")
+
+
+class Artefactos:
+    def __init__(self, version, series, cubo, indice_causas, espacial, geojson_dep,
+                 nombres_dpto, figuras, causas10):
+        self.version = version
+        self.series = series
+        self.cubo = cubo
+        self.indice_causas = indice_causas
+        self.espacial = espacial
+        self.geojson_dep = geojson_dep
+        self.nombres_dpto = nombres_dpto
+        self.figuras = figuras
+        self.causas10 = causas10
+
+
+def construir(salida=DIR_ARTEFACTOS):
+    from tablero import pipeline
+    from tablero.almacen import Almacen
+    from tablero.fabrica import figuras_dashboard
+    from tablero.version import version_datos
+
+    inicio = time.perf_counter()
+    datos = pipeline.cargar_datos()
+    base, resultado_mapa = datos["base"], datos["resultado_mapa"]
+    nombres_dpto = dict(zip(resultado_mapa["DPTO_CCDGO"], resultado_mapa["DPTO_CNMBR"]))
+    version = version_datos()
+
+    os.makedirs(salida, exist_ok=True)
+    SeriesTemporales.obtener(base, version).guardar(os.path.join(salida, "series.npz"))
+    almacen = Almacen.obtener(base, version, ordenes={"edad": pipeline.VALORES_EDAD})
+    figuras = figuras_dashboard(almacen, resultado_mapa["DPTO_CCDGO"].tolist(), nombres_dpto,
+                                datos["geojson_dep"])
+    Cubo.desde_almacen(almacen).guardar(os.path.join(salida, "cubo.npz"))
+    IndiceCausas.obtener(almacen, datos["codigos"], version).guardar(
+        os.path.join(salida, "causas.npz"))
+    CapasEspaciales.obtener(almacen, resultado_mapa, pipeline.RUTA_MUNICIPIOS, version).guardar(
+        os.path.join(salida, "espacial.npz"))
+    with open(os.path.join(salida, "geojson_dep.json"), "w", encoding="utf-8") as f:
+        json.dump(datos["geojson_dep"], f, separators=(",", ":"))
+
+    # La geometría se referencia aparte (ver tablero.geometria)
+    especificaciones = {
+        n: dict(figuras[n], data=[{k: v for k, v in t.items() if k != "geojson"}
+                                  for t in figuras[n]["data"]])
+        for n in FIGURAS}
+
+    causas10 = pipeline.causas_principales(base)
+    manifiesto = {
+        "version": version,
+        "nombres_dpto": nombres_dpto,
+        "causas10": {"columna": str(causas10.columns[0]),
+                     "registros": causas10.to_dict("records")},
+        "figuras": especificaciones,
+    }
+    with open(os.path.join(salida, "manifiesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    for archivo in sorted(os.listdir(salida)):
+        print(f"{archivo:20s} {os.path.getsize(os.path.join(salida, archivo)) / 1024:10.1f} KB")
+    print(f"Artefactos {version} en {salida} ({time.perf_counter() - inicio:.1f} s)")
+
+
+def cargar(directorio=DIR_ARTEFACTOS):
+    """Lee los artefactos; sólo requiere NumPy."""
+    with open(os.path.join(directorio, "manifiesto.json"), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    with open(os.path.join(directorio, "geojson_dep.json"), encoding="utf-8") as f:
+        geojson_dep = json.load(f)
+    return Artefactos(
+        version=manifiesto["version"],
+        series=SeriesTemporales.cargar(os.path.join(directorio, "series.npz")),
+        cubo=Cubo.cargar(os.path.join(directorio, "cubo.npz")),
+        indice_causas=IndiceCausas.cargar(os.path.join(directorio, "causas.npz")),
+        espacial=CapasEspaciales.cargar(os.path.join(directorio, "espacial.npz")),
+        geojson_dep=geojson_dep,
+        nombres_dpto=manifiesto["nombres_dpto"],
+        figuras=manifiesto["figuras"],
+        causas10=manifiesto["causas10"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los artefactos del modo liviano.")
+    parser.add_argument("--salida", default=DIR_ARTEFACTOS)
+    construir(parser.parse_args().salida)
+
+
+if __name__ == "__main__":
+    main()
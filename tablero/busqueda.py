@@ -0,0 +1,125 @@
+"""
+Índice de búsqueda por prefijo sobre las causas CIE-10 de Anexo2.
+
+Índice invertido insensible a tildes y mayúsculas: los términos (palabras de
+las descripciones de 3 y 4 caracteres y los códigos) quedan en un arreglo
+ordenado y sus listas de documentos contiguas en formato CSR. Un prefijo es
+un rango de ``searchsorted`` y sus documentos un solo corte del arreglo, así
+que cada consulta del selector toma del orden de microsegundos a pocos
+milisegundos. Se construye una vez por versión de los datos.
+
+Prueba rápida desde la raíz del repositorio (usa el índice más reciente de
+la caché, creado al arrancar la app en modo completo)::
+
+    python -m tablero.busqueda "fiebre tif"
+"""
+
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from tablero.causas import normalizar
+from tablero.version import DIR_CACHE, ruta_cache
+
+
+def _tokens(texto):
+    return re.findall(r"[a-z0-9]+", normalizar(texto))
+
+
+class IndiceBusqueda:
+    def __init__(self, terminos, punteros, documentos, codigos, etiquetas, peso):
+        self.terminos = terminos
+        self.punteros = punteros
+        self.documentos = documentos
+        self.codigos = codigos
+        self.etiquetas = etiquetas
+        self.peso = peso
+
+    @classmethod
+    def desde_catalogo(cls, catalogo, peso=None):
+        """``catalogo`` es ``IndiceCausas.catalogo``; ``peso`` ordena los resultados."""
+        terminos, documentos = [], []
+        filas = zip(catalogo["codigo4"].tolist(), catalogo["descripcion4"].tolist(),
+                    catalogo["codigo3"].tolist(), catalogo["descripcion3"].tolist())
+        for i, (c4, d4, c3, d3) in enumerate(filas):
+            palabras = set(_tokens(d4)) | set(_tokens(d3)) | set(_tokens(c4)) | set(_tokens(c3))
+            terminos.extend(palabras)
+            documentos.extend([i] * len(palabras))
+        terminos = np.array(terminos)
+        documentos = np.array(documentos, dtype=np.int32)
+        orden = np.lexsort((documentos, terminos))
+        terminos, documentos = terminos[orden], documentos[orden]
+        unicos, inicio = np.unique(terminos, return_index=True)
+        etiquetas = np.array([f"{c} – {d}" if d else c for c, d in
+                              zip(catalogo["codigo4"].tolist(), catalogo["descripcion4"].tolist())])
+        n = len(catalogo["codigo4"])
+        peso = np.zeros(n, dtype=np.int64) if peso is None else np.asarray(peso, dtype=np.int64)
+        return cls(unicos, np.append(inicio, len(terminos)).astype(np.int64), documentos,
+                   catalogo["codigo4"], etiquetas, peso)
+
+    @classmethod
+    def obtener(cls, indice_causas, version):
+        ruta = ruta_cache("busqueda", version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        indice = cls.desde_catalogo(indice_causas.catalogo, indice_causas.totales())
+        indice.guardar(ruta)
+        return indice
+
+    def guardar(self, ruta):
+        np.savez(ruta, terminos=self.terminos, punteros=self.punteros,
+                 documentos=self.documentos, codigos=self.codigos,
+                 etiquetas=self.etiquetas, peso=self.peso)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            return cls(z["terminos"], z["punteros"], z["documentos"], z["codigos"],
+                       z["etiquetas"], z["peso"])
+
+    def _prefijo(self, palabra):
+        lo = np.searchsorted(self.terminos, palabra, side="left")
+        hi = np.searchsorted(self.terminos, palabra + "\uffff", side="left")
+        return np.unique(self.documentos[self.punteros[lo]:self.punteros[hi]])
+
+    def buscar(self, texto, limite=20):
+        """
+        Causas cuyo código o descripción contiene palabras que empiezan por
+        cada palabra de ``texto``. Lista de ``(codigo4, etiqueta)`` ordenada
+        por número de defunciones.
+        """
+        docs = None
+        for palabra in _tokens(texto):
+            encontrados = self._prefijo(palabra)
+            docs = encontrados if docs is None else np.intersect1d(docs, encontrados,
+                                                                   assume_unique=True)
+            if not len(docs):
+                return []
+        if docs is None:
+            return []
+        docs = docs[np.lexsort((self.codigos[docs], -self.peso[docs]))][:limite]
+        return list(zip(self.codigos[docs].tolist(), self.etiquetas[docs].tolist()))
+
+    def etiqueta(self, codigo):
+        i = np.flatnonzero(self.codigos == codigo)
+        return str(self.etiquetas[i[0]]) if len(i) else codigo
+
+
+def main():
+    candidatos = [os.path.join(DIR_CACHE, f) for f in os.listdir(DIR_CACHE)
+                  if f.startswith("busqueda-")]
+    indice = IndiceBusqueda.cargar(max(candidatos, key=os.path.getmtime))
+    texto = " ".join(sys.argv[1:])
+    inicio = time.perf_counter()
+    resultados = indice.buscar(texto)
+    ms = (time.perf_counter() - inicio) * 1000
+    for codigo, etiqueta in resultados:
+        print(etiqueta)
+    print(f"{len(resultados)} resultados en {ms:.2f} ms ({len(indice.terminos)} términos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Caché compartida de resultados de callbacks.
+
+Dos niveles: un LRU en memoria por proceso y un nivel compartido entre los
+workers de gunicorn, SQLite en disco por defecto o Redis si se define
+``MORTALIDAD_CACHE_REDIS`` (p. ej. ``redis://localhost:6379/0``). La llave
+combina el esquema de los valores (``ESQUEMA``), la versión de los datos, la
+ruta y el estado de los filtros, de modo que N workers comparten una caché
+caliente y un cambio de datos o de código la invalida.
+
+El nivel compartido guarda JSON, no ``pickle``: leer un valor de SQLite o de
+un Redis comprometido nunca ejecuta código. Los callbacks memoizados deben
+devolver datos planos (listas, dicts, números, texto; los arreglos de NumPy
+y las figuras se convierten). Los dos niveles, y también la primera
+llamada, devuelven el valor ya decodificado del JSON: las tuplas vuelven
+como listas y las figuras como dicts, y el objeto que creó el callback no
+queda compartido con la caché.
+
+Variables de entorno:
+
+- ``MORTALIDAD_CACHE_LRU``: entradas del LRU en memoria (256).
+- ``MORTALIDAD_CACHE_MAX``: entradas del nivel SQLite (10000).
+- ``MORTALIDAD_CACHE_TTL``: segundos de vida en Redis (86400).
+- ``MORTALIDAD_CACHE_REDIS``: URL de Redis; si no existe se usa SQLite.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tablero.version import DIR_CACHE
+
+_FALTA = object()
+
+# Forma de los valores memoizados: súbalo cuando un callback memoizado cambie
+# lo que devuelve (p. ej. de figura a ``(x, y, título)`` o a lista de cambios)
+ESQUEMA = 3
+
+# El nivel SQLite cuenta y desaloja cada tantas escrituras por proceso
+PERIODO_DESALOJO = 100
+
+# y escribe las horas de acceso en lote cada tantas lecturas por proceso
+PERIODO_ACCESOS = 100
+
+
+def _plano(valor):
+    if hasattr(valor, "to_plotly_json"):
+        return valor.to_plotly_json()
+    if hasattr(valor, "tolist"):  # arreglos y escalares de NumPy
+        return valor.tolist()
+    raise TypeError(f"valor no serializable en la caché: {type(valor).__name__}")
+
+
+def serializar(valor):
+    return json.dumps(valor, default=_plano, separators=(",", ":")).encode()
+
+
+def deserializar(datos):
+    return json.loads(datos)
+
+
+class CacheLRU:
+    """LRU en memoria, seguro entre hilos."""
+
+    def __init__(self, max_entradas=256):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._candado = threading.Lock()
+
+    def obtener(self, clave):
+        with self._candado:
+            valor = self._datos.get(clave, _FALTA)
+            if valor is not _FALTA:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._candado:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheSQLite:
+    """
+    Nivel compartido en un archivo SQLite (modo WAL) con desalojo LRU
+    aproximado; guarda y devuelve bytes (JSON). Si el archivo es de otro
+    ``ESQUEMA`` se vacía al abrirlo. El desalojo corre cada
+    ``PERIODO_DESALOJO`` escrituras, no en cada una: con W workers la tabla
+    puede pasar de ``max_entradas`` en a lo sumo W × periodo filas. Una
+    lectura no escribe: la hora de acceso se acumula en memoria y se vuelca
+    en una transacción cada ``PERIODO_ACCESOS`` lecturas o antes de
+    desalojar, así las lecturas de los workers no compiten por el candado de
+    escritura (los accesos sin volcar de un worker que termina se pierden).
+    """
+
+    def __init__(self, ruta=None, max_entradas=10000):
+        self.ruta = ruta or os.path.join(DIR_CACHE, "callbacks.sqlite")
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+        self._escrituras = 0
+        self._accesos = {}
+        self._candado = threading.Lock()
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        with self._conexion() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS cache ("
+                        "clave TEXT PRIMARY KEY, valor BLOB, acceso REAL)")
+            con.execute("CREATE INDEX IF NOT EXISTS cache_acceso ON cache(acceso)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (llave TEXT PRIMARY KEY, valor TEXT)")
+            fila = con.execute("SELECT valor FROM meta WHERE llave = 'esquema'").fetchone()
+            if fila is None or fila[0] != str(ESQUEMA):
+                con.execute("DELETE FROM cache")
+                con.execute("INSERT OR REPLACE INTO meta VALUES ('esquema', ?)", (str(ESQUEMA),))
+
+    def _conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def obtener(self, clave):
+        con = self._conexion()
+        fila = con.execute("SELECT valor FROM cache WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return _FALTA
+        with self._candado:
+            self._accesos[clave] = time.time()
+            volcar = len(self._accesos) >= PERIODO_ACCESOS
+        if volcar:
+            self.volcar_accesos()
+        return fila[0]
+
+    def guardar(self, clave, datos):
+        con = self._conexion()
+        with con:
+            con.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                        (clave, datos, time.time()))
+        with self._candado:
+            self._escrituras += 1
+            desalojar = self._escrituras % PERIODO_DESALOJO == 0
+        if desalojar:
+            self.desalojar()
+
+    def volcar_accesos(self):
+        """Escribe en una sola transacción las horas de acceso acumuladas."""
+        with self._candado:
+            accesos, self._accesos = self._accesos, {}
+        if not accesos:
+            return
+        con = self._conexion()
+        with con:
+            con.executemany("UPDATE cache SET acceso = ? WHERE clave = ?",
+                            [(hora, clave) for clave, hora in accesos.items()])
+
+    def desalojar(self):
+        """Borra las entradas de acceso más antiguo por encima de ``max_entradas``."""
+        self.volcar_accesos()
+        con = self._conexion()
+        with con:
+            exceso = con.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entradas
+            if exceso > 0:
+                con.execute("DELETE FROM cache WHERE clave IN "
+                            "(SELECT clave FROM cache ORDER BY acceso LIMIT ?)", (exceso,))
+
+
+class CacheRedis:
+    """
+    Nivel compartido en Redis (bytes JSON); el desalojo lo hace el servidor
+    (maxmemory-policy). El prefijo lleva el ``ESQUEMA``: las llaves de otro
+    esquema no se leen y vencen con su TTL.
+    """
+
+    def __init__(self, url, ttl=86400, prefijo="mortalidad:"):
+        import redis
+
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefijo = f"{prefijo}e{ESQUEMA}:"
+
+    def obtener(self, clave):
+        datos = self.cliente.get(self.prefijo + clave)
+        return _FALTA if datos is None else datos
+
+    def guardar(self, clave, datos):
+        self.cliente.set(self.prefijo + clave, datos, ex=self.ttl)
+
+
+class CacheCallbacks:
+    """LRU local + nivel compartido, con contadores de aciertos y fallos."""
+
+    def __init__(self, version, compartida=None, max_lru=256):
+        self.version = version
+        self.local = CacheLRU(max_lru)
+        self.compartida = compartida
+        self.contadores = {"aciertos_lru": 0, "aciertos_compartida": 0, "fallos": 0}
+        self._candado = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls, version):
+        url = os.environ.get("MORTALIDAD_CACHE_REDIS")
+        if url:
+            compartida = CacheRedis(url, ttl=int(os.environ.get("MORTALIDAD_CACHE_TTL", 86400)))
+        else:
+            compartida = CacheSQLite(max_entradas=int(os.environ.get("MORTALIDAD_CACHE_MAX", 10000)))
+        return cls(version, compartida, max_lru=int(os.environ.get("MORTALIDAD_CACHE_LRU", 256)))
+
+    def clave(self, ruta, estado):
+        texto = json.dumps([ESQUEMA, self.version, ruta, estado], sort_keys=True, default=str)
+        return hashlib.sha1(texto.encode()).hexdigest()
+
+    def _contar(self, nombre):
+        with self._candado:
+            self.contadores[nombre] += 1
+
+    def obtener(self, clave):
+        valor = self.local.obtener(clave)
+        if valor is not _FALTA:
+            self._contar("aciertos_lru")
+            return valor
+        if self.compartida is not None:
+            datos = self.compartida.obtener(clave)
+            if datos is not _FALTA:
+                self._contar("aciertos_compartida")
+                valor = deserializar(datos)
+                self.local.guardar(clave, valor)
+                return valor
+        self._contar("fallos")
+        return _FALTA
+
+    def guardar(self, clave, valor):
+        """
+        Guarda ``valor`` como JSON en ambos niveles; devuelve su forma
+        decodificada, la que guarda el LRU y devuelve ``obtener``.
+        """
+        datos = serializar(valor)
+        valor = deserializar(datos)
+        self.local.guardar(clave, valor)
+        if self.compartida is not None:
+            self.compartida.guardar(clave, datos)
+        return valor
+
+    def memoizar(self, ruta):
+        """Decorador para callbacks: la llave es ``(esquema, version, ruta, argumentos)``."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args):
+                clave = self.clave(ruta, args)
+                valor = self.obtener(clave)
+                if valor is _FALTA:
+                    valor = self.guardar(clave, funcion(*args))
+                return valor
+            return envoltura
+        return decorador
+
+    def estadisticas(self):
+        with self._candado:
+            datos = dict(self.contadores)
+        total = sum(datos.values())
+        datos.update(
+            tasa_aciertos=round((total - datos["fallos"]) / total, 4) if total else None,
+            entradas_lru=len(self.local),
+            nivel_compartido=type(self.compartida).__name__ if self.compartida else None,
+            version=self.version,
+            esquema=ESQUEMA,
+            pid=os.getpid(),
+        )
+        return datos
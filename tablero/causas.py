@@ -0,0 +1,193 @@
+"""
+Explorador de causas CIE-10 con paginación, orden y filtro en el servidor.
+
+El índice cruza el catálogo completo de Anexo2 (una fila por código de
+cuatro caracteres, con sus descripciones de tres y cuatro caracteres y el
+capítulo) con los conteos de defunciones por causa × sexo × departamento,
+guardados como tabla dispersa (sólo combinaciones con defunciones). Cada
+interacción de la tabla filtra y ordena arreglos NumPy y devuelve una sola
+página de filas.
+
+Las columnas de Anexo2 se fijan explícitamente en ``COLUMNAS_ANEXO2`` (los
+encabezados originales traen doble espacio y "Descripcion" sin tilde).
+"""
+
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from tablero.dimensiones import indices
+from tablero.version import ruta_cache
+
+COLUMNAS_ANEXO2 = {
+    "capitulo": "Nombre capítulo",
+    "codigo3": "Código de la CIE-10 tres caracteres",
+    "descripcion3": "Descripción  de códigos mortalidad a tres caracteres",
+    "codigo4": "Código de la CIE-10 cuatro caracteres",
+    "descripcion4": "Descripcion  de códigos mortalidad a cuatro caracteres",
+}
+
+COLUMNAS_TABLA = [
+    {"name": "Código", "id": "codigo4"},
+    {"name": "Causa (4 caracteres)", "id": "descripcion4"},
+    {"name": "Grupo (3 caracteres)", "id": "codigo3"},
+    {"name": "Descripción grupo", "id": "descripcion3"},
+    {"name": "Capítulo", "id": "capitulo"},
+    {"name": "Total", "id": "total", "type": "numeric"},
+]
+
+_TEXTO = ("codigo4", "descripcion4", "codigo3", "descripcion3", "capitulo")
+
+_OPERADORES = {"ge": ">=", "le": "<=", "lt": "<", "gt": ">", "ne": "!=", "eq": "=",
+               "icontains": "contains", "scontains": "contains"}
+
+_PARTE = re.compile(r"^\s*\{(?P<columna>[^}]+)\}\s+(?P<operador>\S+)\s+(?P<valor>.*?)\s*$")
+
+
+def normalizar(texto):
+    """Minúsculas sin tildes, para comparar texto libre."""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def _separar_filtro(parte):
+    """Parte de ``filter_query`` de la DataTable -> ``(columna, operador, valor)``."""
+    m = _PARTE.match(parte)
+    if m is None:
+        return None, None, None
+    valor = m["valor"]
+    if len(valor) > 1 and valor[0] == valor[-1] and valor[0] in ("'", '"', "`"):
+        valor = valor[1:-1]
+    return m["columna"], _OPERADORES.get(m["operador"], m["operador"]), valor
+
+
+class IndiceCausas:
+    def __init__(self, catalogo, causa, sexo, dpto, n, etiquetas):
+        self.catalogo = catalogo
+        self.causa, self.sexo, self.dpto, self.n = causa, sexo, dpto, n
+        self.etiquetas = etiquetas
+        self._normalizado = {c: np.array([normalizar(v) for v in catalogo[c].tolist()])
+                             for c in _TEXTO}
+
+    @classmethod
+    def desde_almacen(cls, almacen, codigos):
+        """``codigos`` es el DataFrame de Anexo2."""
+        tabla = codigos.drop_duplicates(COLUMNAS_ANEXO2["codigo4"])
+        catalogo = {c: tabla[col].fillna("").astype(str).str.strip().to_numpy()
+                    for c, col in COLUMNAS_ANEXO2.items()}
+
+        # Códigos de los registros que no están en el catálogo se agregan al final
+        fila = {c: i for i, c in enumerate(catalogo["codigo4"].tolist())}
+        faltantes = [c for c in almacen.etiquetas["causa4"].tolist() if c not in fila]
+        for c in faltantes:
+            fila[c] = len(fila)
+        if faltantes:
+            catalogo = {k: np.concatenate([v, np.array(faltantes if k == "codigo4" else
+                                                         [""] * len(faltantes))])
+                        for k, v in catalogo.items()}
+        catalogo = {k: v.astype(str) for k, v in catalogo.items()}
+
+        # Casilla de nulos de causa4 -> fuera de la tabla
+        mapa = np.array([fila[c] for c in almacen.etiquetas["causa4"].tolist()] + [-1])
+        causa = mapa[almacen.columnas["causa4"]]
+        validas = causa >= 0
+        forma = (len(catalogo["codigo4"]), *almacen.forma(("sexo", "departamento")))
+        plano = np.ravel_multi_index(
+            (causa[validas], almacen.columnas["sexo"][validas],
+             almacen.columnas["departamento"][validas]), forma)
+        unicos, n = np.unique(plano, return_counts=True)
+        c, s, d = np.unravel_index(unicos, forma)
+        return cls(catalogo, c.astype(np.int32), s.astype(np.int16), d.astype(np.int16),
+                   n.astype(np.int32),
+                   {"sexo": almacen.etiquetas["sexo"], "departamento": almacen.etiquetas["departamento"]})
+
+    @classmethod
+    def obtener(cls, almacen, codigos, version):
+        ruta = ruta_cache("causas", version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        indice = cls.desde_almacen(almacen, codigos)
+        indice.guardar(ruta)
+        return indice
+
+    def guardar(self, ruta):
+        np.savez(ruta, causa=self.causa, sexo=self.sexo, dpto=self.dpto, n=self.n,
+                 **{f"cat_{k}": v for k, v in self.catalogo.items()},
+                 **{f"etq_{k}": v for k, v in self.etiquetas.items()})
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            return cls({k: z[f"cat_{k}"] for k in COLUMNAS_ANEXO2},
+                       z["causa"], z["sexo"], z["dpto"], z["n"],
+                       {k: z[f"etq_{k}"] for k in ("sexo", "departamento")})
+
+    @property
+    def capitulos(self):
+        return sorted(c for c in set(self.catalogo["capitulo"].tolist()) if c)
+
+    def totales(self, sexos=None, dptos=None):
+        """Defunciones por fila del catálogo para la selección de sexo y departamento."""
+        m = np.ones(len(self.n), dtype=bool)
+        if sexos:
+            m &= np.isin(self.sexo, indices(self.etiquetas["sexo"], sexos))
+        if dptos:
+            m &= np.isin(self.dpto, indices(self.etiquetas["departamento"], dptos))
+        return np.bincount(self.causa[m], weights=self.n[m],
+                           minlength=len(self.catalogo["codigo4"])).astype(np.int64)
+
+    def _filtrar(self, filas, total, filter_query):
+        for parte in (filter_query or "").split(" && "):
+            columna, operador, valor = _separar_filtro(parte)
+            if columna is None:
+                continue
+            if columna == "total":
+                try:
+                    numero = float(valor)
+                except ValueError:
+                    continue
+                v = total[filas]
+                prueba = {">=": v >= numero, "<=": v <= numero, "<": v < numero,
+                          ">": v > numero, "!=": v != numero}.get(operador, v == numero)
+            elif columna in _TEXTO:
+                texto = self._normalizado[columna][filas]
+                valor = normalizar(valor)
+                if operador in ("contains", "scontains"):
+                    prueba = np.char.find(texto, valor) >= 0
+                elif operador == "!=":
+                    prueba = texto != valor
+                else:
+                    prueba = texto == valor
+            else:
+                continue
+            filas = filas[prueba]
+        return filas
+
+    def pagina(self, pagina, tamano, sort_by=None, filter_query=None,
+               sexos=None, dptos=None, capitulos=None):
+        """Filas de una página y número total de páginas."""
+        total = self.totales(sexos, dptos)
+        filas = np.arange(len(total))
+        if capitulos:
+            filas = filas[np.isin(self.catalogo["capitulo"][filas], capitulos)]
+        filas = self._filtrar(filas, total, filter_query)
+
+        orden = sort_by or [{"column_id": "total", "direction": "desc"}]
+        llaves = []
+        for criterio in reversed(orden):
+            col = criterio["column_id"]
+            if col == "total":
+                valores = total[filas]
+            else:
+                valores = np.unique(self.catalogo[col][filas], return_inverse=True)[1]
+            llaves.append(-valores if criterio["direction"] == "desc" else valores)
+        filas = filas[np.lexsort(llaves)] if llaves else filas
+
+        paginas = max(1, -(-len(filas) // tamano))
+        pagina = min(pagina, paginas - 1)
+        seleccion = filas[pagina * tamano:(pagina + 1) * tamano]
+        registros = [dict({c: self.catalogo[c][i] for c in _TEXTO}, total=int(total[i]))
+                     for i in seleccion.tolist()]
+        return registros, paginas
@@ -0,0 +1,165 @@
+"""
+Varios conjuntos de defunciones (no fetales, fetales) en un mismo proceso.
+
+Las dimensiones (Anexo2, Divipola, shapefile y su GeoJSON) se leen una sola
+vez con ``pipeline.cargar_dimensiones`` y las comparten todos los conjuntos;
+cada conjunto tiene sólo sus hechos: almacén columnar, cubo de agregados,
+figuras fijas y tabla de causas. Los esqueletos de las figuras también se
+comparten (uno por combinación de sexos de ``stack_fig``).
+
+Un conjunto adicional se arma desde la caché de su versión sin leer el
+Excel ni construir ``base``; si no hay caché se lee una vez, se guarda el
+almacén y el DataFrame se descarta. Así la memoria crece sólo con los
+arreglos de hechos del conjunto nuevo.
+
+El archivo fetal se configura con ``MORTALIDAD_FETAL``; si no existe, el
+tablero sirve sólo las defunciones no fetales y no muestra el selector. El
+selector sólo se ve en ``RUTAS`` y dice qué cambia: la descarga de
+registros lo sigue y la API lo acepta como ``?conjunto=``; las series, el
+explorador de causas y el panel espacial usan siempre el principal.
+"""
+
+import os
+from functools import lru_cache
+
+import dash_bootstrap_components as dbc
+from dash import Input, Output, dcc, html
+
+from tablero.almacen import Almacen
+from tablero.cubo import Cubo
+from tablero.fabrica import FabricaFiguras, top_k, trazas_dashboard
+from tablero.incremental import Agregados
+from tablero.version import RUTAS_DATOS, ruta_cache, version_datos
+
+PRINCIPAL = "nofetal"
+
+# Clave -> (nombre en el selector, archivo de registros)
+CONJUNTOS = {
+    PRINCIPAL: ("Defunciones no fetales", RUTAS_DATOS[0]),
+    "fetal": ("Defunciones fetales",
+              os.environ.get("MORTALIDAD_FETAL", "datos/Anexo3.Fetal2019_CE_15-03-23.xlsx")),
+}
+
+# Columna de la tabla de causas cuando sale del almacén
+COLUMNA_CAUSA = "Nombre capítulo"
+
+# Páginas con figuras que siguen al selector
+RUTAS = ("/exploracion", "/causas")
+
+_OCULTO = {"display": "none"}
+
+
+def version_conjunto(ruta):
+    """Versión de un archivo de registros con las mismas dimensiones compartidas."""
+    return version_datos((ruta,) + tuple(RUTAS_DATOS[1:]))
+
+
+class Conjunto:
+    """Hechos de un archivo de defunciones sobre las dimensiones compartidas."""
+
+    def __init__(self, clave, nombre, almacen, cubo, figuras, causas_columna, causas_registros):
+        self.clave = clave
+        self.nombre = nombre
+        self.almacen = almacen
+        self.cubo = cubo
+        self.figuras = figuras
+        self.causas_columna = causas_columna
+        self.causas_registros = causas_registros
+        self._cubos = lru_cache(maxsize=32)(self._cubo_causas)
+
+    @property
+    def version(self):
+        return self.almacen.version
+
+    @classmethod
+    def desde_almacen(cls, clave, nombre, almacen, dimensiones, fabricas, causas10=None):
+        """
+        Cubo, figuras y causas de ``almacen``. ``fabricas`` (``{sexos:
+        FabricaFiguras}``) se comparte entre conjuntos; ``causas10``
+        (``(columna, registros)``) reemplaza la tabla calculada del almacén.
+        """
+        dep_col = dimensiones["dep_col"]
+        ubicaciones = dep_col["DPTO_CCDGO"].tolist()
+        nombres_dpto = dict(zip(ubicaciones, dep_col["DPTO_CNMBR"]))
+        trazas = trazas_dashboard(almacen, ubicaciones, nombres_dpto)
+        sexos = tuple(t["name"] for t in trazas["stack_fig"])
+        if sexos not in fabricas:
+            fabricas[sexos] = FabricaFiguras.plantillas(dimensiones["geojson_dep"], list(sexos))
+        if causas10 is None:
+            conteo = almacen.contar(("capitulo",))[:-1]
+            top = top_k(conteo, 10)
+            causas10 = (COLUMNA_CAUSA, [{COLUMNA_CAUSA: c, "Total": int(t)} for c, t in
+                                        zip(almacen.etiquetas["capitulo"][top].tolist(),
+                                            conteo[top].tolist())])
+        return cls(clave, nombre, almacen, Agregados.obtener(almacen).cubo,
+                   fabricas[sexos].figuras(trazas), *causas10)
+
+    @classmethod
+    def obtener(cls, clave, dimensiones, fabricas):
+        """Conjunto ``clave`` de ``CONJUNTOS``; ``None`` si falta su archivo."""
+        from tablero import pipeline
+
+        nombre, ruta = CONJUNTOS[clave]
+        if not os.path.exists(ruta):
+            return None
+        version = version_conjunto(ruta)
+        cache = ruta_cache("almacen", version)
+        if os.path.exists(cache):
+            almacen = Almacen.cargar(cache)
+        else:
+            base = pipeline.cargar_datos(ruta, dimensiones=dimensiones)["base"]
+            almacen = Almacen.obtener(base, version, ordenes={"edad": pipeline.VALORES_EDAD})
+            del base
+        return cls.desde_almacen(clave, nombre, almacen, dimensiones, fabricas)
+
+    def _cubo_causas(self, codigos):
+        return Cubo.desde_almacen(self.almacen, self.almacen.mascara({"causa4": list(codigos)}))
+
+    def cubo_para(self, codigos):
+        """Cubo restringido a las causas ``codigos`` (memoizado)."""
+        return self._cubos(tuple(sorted(codigos)))
+
+
+def adicionales(dimensiones, fabricas, excluir=(PRINCIPAL,)):
+    """Los conjuntos de ``CONJUNTOS`` con archivo disponible, salvo ``excluir``."""
+    conjuntos = (Conjunto.obtener(c, dimensiones, fabricas) for c in CONJUNTOS if c not in excluir)
+    return {c.clave: c for c in conjuntos if c is not None}
+
+
+def selector(conjuntos, valor=PRINCIPAL):
+    """Oculto hasta que ``registrar`` lo muestra en una de ``RUTAS``."""
+    principal = conjuntos[PRINCIPAL].nombre.lower()
+    return dbc.Container([
+        dcc.RadioItems(
+            id="conjunto",
+            options=[{"label": c.nombre, "value": c.clave} for c in conjuntos.values()],
+            value=valor, inline=True, inputStyle={"marginRight": "0.3em", "marginLeft": "1em"}),
+        html.Small("Cambia los mapas, las figuras de la página, la tabla de causas y la "
+                   "descarga de registros; las series, el explorador de causas y el panel "
+                   f"espacial usan siempre las {principal}.", className="text-muted ms-3"),
+    ], id="selector-conjunto", fluid=True, className="mt-2", style=_OCULTO)
+
+
+def registrar(app, conjuntos):
+    """
+    Figuras y tabla que dependen sólo del conjunto elegido, y el selector
+    visible sólo en ``RUTAS``. El mapa, la línea, las barras apiladas y el
+    histograma los actualiza ``tablero.filtros`` con el cubo del conjunto.
+    """
+    @app.callback(Output("selector-conjunto", "style"), Input("url", "pathname"))
+    def mostrar_selector(pathname):
+        return None if pathname in RUTAS else _OCULTO
+
+    @app.callback(Output("barras-top5", "figure"), Output("pie-top10", "figure"),
+                  Input("conjunto", "value"))
+    def figuras_exploracion(clave):
+        figuras = conjuntos[clave].figuras
+        return figuras["barras_top5"], figuras["pie_top10"]
+
+    @app.callback(Output("tabla-causas", "data"), Output("tabla-causas", "columns"),
+                  Input("conjunto", "value"))
+    def tabla_causas(clave):
+        conjunto = conjuntos[clave]
+        return conjunto.causas_registros, [{"name": conjunto.causas_columna,
+                                            "id": conjunto.causas_columna},
+                                           {"name": "Total", "id": "Total"}]
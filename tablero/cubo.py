@@ -0,0 +1,104 @@
+"""
+Cubo de conteos preagregados para los filtros comunes.
+
+Dimensiones: departamento × sexo × grupo etario × mes, cada una con su
+casilla de nulos al final. Con ~13 mil celdas el cubo cabe en unas decenas
+de KB, así que se envía completo al navegador (``carga``) y los callbacks
+``clientside`` de ``assets/filtros.js`` reagregan ahí sin tocar el servidor.
+``Cubo.marginal`` implementa la misma semántica en Python para el modo
+servidor.
+
+Estado de filtros (igual en Python y JavaScript)::
+
+    {"departamento": [códigos], "sexo": [etiquetas],
+     "edad": [i0, i1], "mes": [m0, m1]}
+
+Listas vacías y rangos completos no filtran (incluyen los nulos).
+"""
+
+import base64
+
+import numpy as np
+
+DIMENSIONES = ("departamento", "sexo", "edad", "mes")
+
+
+class Cubo:
+    def __init__(self, conteos, etiquetas, version=None):
+        self.conteos = conteos
+        self.etiquetas = etiquetas
+        self.version = version
+
+    @classmethod
+    def desde_almacen(cls, almacen, mascara=None):
+        """``mascara`` restringe las filas (p. ej. a un conjunto de causas)."""
+        return cls(almacen.contar(DIMENSIONES, mascara),
+                   {d: almacen.etiquetas[d] for d in DIMENSIONES},
+                   almacen.version)
+
+    def guardar(self, ruta):
+        np.savez(ruta, conteos=self.conteos, version=str(self.version),
+                 **{f"etq_{d}": e for d, e in self.etiquetas.items()})
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            return cls(z["conteos"], {d: z[f"etq_{d}"] for d in DIMENSIONES},
+                       version=str(z["version"]))
+
+    def permitidas(self, dim, filtro):
+        etiquetas = self.etiquetas[dim]
+        todas = np.ones(len(etiquetas) + 1, dtype=bool)
+        if not filtro:
+            return todas
+        if dim == "edad":
+            i0, i1 = filtro
+            if i0 <= 0 and i1 >= len(etiquetas) - 1:
+                return todas
+            todas[:] = False
+            todas[int(i0):int(i1) + 1] = True
+            return todas
+        if dim == "mes":
+            m0, m1 = filtro
+            valores = etiquetas.astype(float)
+            if len(valores) == 0 or (m0 <= valores.min() and m1 >= valores.max()):
+                return todas
+            todas[:-1] = (valores >= m0) & (valores <= m1)
+            todas[-1] = False
+            return todas
+        todas[:] = False
+        posicion = {e: i for i, e in enumerate(etiquetas.tolist())}
+        todas[[posicion[v] for v in filtro if v in posicion]] = True
+        return todas
+
+    def marginal(self, dims, filtros):
+        """
+        Conteos filtrados sumados sobre las demás dimensiones, con forma
+        ``len(etiquetas)`` por cada dimensión de ``dims`` (sin nulos).
+        """
+        sub = self.conteos
+        for eje, dim in enumerate(DIMENSIONES):
+            permitidas = self.permitidas(dim, filtros.get(dim))
+            if dim in dims:
+                forma = [1] * sub.ndim
+                forma[eje] = -1
+                sub = sub * permitidas.reshape(forma)
+            else:
+                sub = np.compress(permitidas, sub, axis=eje)
+        sub = sub.sum(axis=tuple(e for e, d in enumerate(DIMENSIONES) if d not in dims))
+        orden = [d for d in DIMENSIONES if d in dims]
+        sub = np.transpose(sub, [orden.index(d) for d in dims])
+        return sub[tuple(slice(0, -1) for _ in dims)]
+
+    def carga(self, extra=None):
+        """Carga compacta para el navegador: conteos ``uint32`` en base64."""
+        datos = {
+            "version": self.version,
+            "dims": list(DIMENSIONES),
+            "forma": list(self.conteos.shape),
+            "etiquetas": {d: e.tolist() for d, e in self.etiquetas.items()},
+            "conteos": base64.b64encode(
+                self.conteos.astype("<u4").tobytes()).decode("ascii"),
+        }
+        datos.update(extra or {})
+        return datos
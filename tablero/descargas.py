@@ -0,0 +1,180 @@
+"""
+Descarga de los registros que hay detrás de las figuras.
+
+``GET /descargas/registros.csv`` recibe el estado de los filtros en la query
+string (los mismos que el panel: ``departamento``, ``sexo``, ``edad`` como
+rango de índices, ``mes`` como rango y ``causa`` con códigos de cuatro
+caracteres, listas separadas por comas) y devuelve las filas del almacén
+columnar que cumplen los filtros. Con varios conjuntos de datos
+(``tablero.conjuntos``) ``conjunto`` elige el almacén; sin él, el principal.
+
+La respuesta es un generador: los registros se decodifican y escriben en
+bloques de ``BLOQUE`` filas, así la memoria del worker no crece con el
+tamaño de la descarga y, con los workers ``gthread`` de ``gunicorn.conf.py``,
+la descarga ocupa un hilo y no el worker: los demás hilos siguen atendiendo
+otras peticiones. ``MORTALIDAD_DESCARGA_MAX`` limita las filas
+(100 000 por defecto); las cabeceras ``X-Filas-Total`` y ``X-Filas-Enviadas``
+dicen si se recortó. Con ``pyarrow`` instalado, ``registros.parquet`` envía
+el mismo contenido con un row group por bloque.
+"""
+
+import csv
+import io
+import math
+import os
+
+import numpy as np
+from flask import Response, jsonify, request
+
+from tablero.almacen import COLUMNAS
+
+RUTA = "/descargas/registros"
+BLOQUE = 20000
+MAX_FILAS = int(os.environ.get("MORTALIDAD_DESCARGA_MAX", 100000))
+
+# Dimensiones del almacén que se descargan, en orden de columnas
+DESCARGA = ("departamento", "cod_municipio", "municipio", "sexo", "edad", "mes",
+            "capitulo", "causa3", "causa4")
+
+
+def estado_desde_args(args, n_edades=None):
+    """
+    Estado de filtros (ver ``tablero.cubo``) y causas desde la query string.
+    ``ValueError`` si un rango no es numérico y finito o si ``edad`` no es un
+    par de índices ``0 <= inicio <= fin < n_edades``.
+    """
+    def lista(nombre):
+        return [v for v in args.get(nombre, "").split(",") if v]
+
+    def rango(nombre):
+        valores = lista(nombre)
+        if len(valores) != 2:
+            return None
+        valores = [float(v) for v in valores]
+        if not all(math.isfinite(v) for v in valores):
+            raise ValueError(f"{nombre}: rango no finito")
+        return valores
+
+    edad = rango("edad")
+    if edad is not None:
+        i0, i1 = edad
+        fuera = n_edades is not None and i1 > n_edades - 1
+        if i0 != int(i0) or i1 != int(i1) or i0 < 0 or i0 > i1 or fuera:
+            raise ValueError("edad: índices fuera de rango")
+    estado = {"departamento": lista("departamento"), "sexo": lista("sexo"),
+              "edad": edad, "mes": rango("mes")}
+    return estado, lista("causa")
+
+
+def mascara(almacen, estado, causas=None):
+    """Filas del almacén que cumplen el estado de filtros (misma semántica que el cubo)."""
+    seleccion = {"departamento": estado.get("departamento"), "sexo": estado.get("sexo"),
+                 "causa4": causas}
+    edades = almacen.etiquetas["edad"].tolist()
+    if estado.get("edad"):
+        i0, i1 = (int(v) for v in estado["edad"])
+        if i0 > 0 or i1 < len(edades) - 1:
+            seleccion["edad"] = edades[max(i0, 0):i1 + 1]
+            if not seleccion["edad"]:
+                return np.zeros(almacen.n, dtype=bool)
+    meses = almacen.etiquetas["mes"]
+    if estado.get("mes") and len(meses):
+        m0, m1 = estado["mes"]
+        valores = meses.astype(float)
+        if m0 > valores.min() or m1 < valores.max():
+            seleccion["mes"] = meses[(valores >= m0) & (valores <= m1)].tolist()
+            if not seleccion["mes"]:
+                return np.zeros(almacen.n, dtype=bool)
+    filas = almacen.mascara(seleccion)
+    return np.ones(almacen.n, dtype=bool) if filas is None else filas
+
+
+def _bloques(almacen, filas):
+    """Columnas decodificadas de ``filas`` en bloques de ``BLOQUE``."""
+    tablas = {d: np.append(almacen.etiquetas[d].astype(object), None) for d in DESCARGA}
+    for inicio in range(0, len(filas), BLOQUE):
+        bloque = filas[inicio:inicio + BLOQUE]
+        yield [tablas[d][almacen.columnas[d][bloque]] for d in DESCARGA]
+
+
+def csv_en_bloques(almacen, filas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow([COLUMNAS[d] for d in DESCARGA])
+    for columnas in _bloques(almacen, filas):
+        escritor.writerows(zip(*columnas))
+        yield salida.getvalue().encode("utf-8")
+        salida.seek(0)
+        salida.truncate()
+    if salida.tell():
+        yield salida.getvalue().encode("utf-8")
+
+
+class _Tubo(io.RawIOBase):
+    """Archivo de sólo escritura que acumula bytes hasta que se vacía."""
+
+    def __init__(self):
+        super().__init__()
+        self.partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b"".join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def parquet_en_bloques(almacen, filas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    nombres = [COLUMNAS[d] for d in DESCARGA]
+    esquema = pa.schema([(n, pa.string()) for n in nombres])
+    tubo = _Tubo()
+    with pq.ParquetWriter(tubo, esquema) as escritor:
+        for columnas in _bloques(almacen, filas):
+            texto = [[None if v is None else str(v) for v in c] for c in columnas]
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(c, pa.string()) for c in texto], schema=esquema))
+            yield tubo.vaciar()
+    yield tubo.vaciar()
+
+
+def montar(server, almacen, max_filas=MAX_FILAS, conjuntos=None):
+    """``conjuntos`` (``{clave: Almacen}``) habilita ``?conjunto=clave``."""
+    conjuntos = conjuntos or {}
+
+    @server.route(RUTA + ".<formato>")
+    def descargar_registros(formato):
+        if formato not in ("csv", "parquet"):
+            return jsonify(error="formato debe ser csv o parquet"), 400
+        clave = request.args.get("conjunto")
+        if clave is not None and clave not in conjuntos:
+            return jsonify(error=f"conjunto desconocido: {clave}"), 400
+        fuente = almacen if clave is None else conjuntos[clave]
+        if formato == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                return jsonify(error="parquet requiere pyarrow"), 400
+        try:
+            estado, causas = estado_desde_args(request.args, len(fuente.etiquetas["edad"]))
+        except ValueError:
+            return jsonify(error="edad y mes son rangos numéricos: inicio,fin "
+                                 "(edad, índices del panel)"), 400
+        filas = np.flatnonzero(mascara(fuente, estado, causas))
+        total = len(filas)
+        filas = filas[:max_filas]
+        generador = (csv_en_bloques if formato == "csv" else parquet_en_bloques)(fuente, filas)
+        respuesta = Response(generador, mimetype="text/csv" if formato == "csv"
+                             else "application/vnd.apache.parquet")
+        respuesta.headers["Content-Disposition"] = f"attachment; filename=registros.{formato}"
+        respuesta.headers["X-Filas-Total"] = str(total)
+        respuesta.headers["X-Filas-Enviadas"] = str(len(filas))
+        return respuesta
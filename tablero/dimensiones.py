@@ -0,0 +1,35 @@
+"""
+Codificación de columnas categóricas en enteros densos.
+
+Convención usada por todos los arreglos precalculados: las etiquetas son los
+valores no nulos ordenados y los registros nulos van a una casilla extra al
+final (índice ``len(etiquetas)``). Así los totales nacionales incluyen todos
+los registros y los agrupamientos por etiqueta coinciden con ``groupby``,
+que descarta los nulos de la llave.
+"""
+
+import numpy as np
+
+
+def codificar(valores, orden=None):
+    """
+    Devuelve ``(codigos, etiquetas)`` con los nulos en la última casilla.
+    Con ``orden`` las etiquetas siguen esa lista y los valores que no estén
+    en ella cuentan como nulos.
+    """
+    import pandas as pd
+
+    if orden is not None:
+        categorias = pd.Categorical(valores, categories=list(orden))
+        codigos, etiquetas = categorias.codes, pd.Index(categorias.categories)
+    else:
+        codigos, etiquetas = pd.factorize(pd.Series(valores), sort=True)
+    codigos = codigos.astype(np.int32)
+    codigos[codigos < 0] = len(etiquetas)
+    return codigos, np.array(etiquetas.tolist())
+
+
+def indices(etiquetas, seleccion):
+    """Índices de ``seleccion`` dentro de ``etiquetas`` (ignora los ausentes)."""
+    posicion = {e: i for i, e in enumerate(etiquetas.tolist())}
+    return np.array([posicion[s] for s in seleccion if s in posicion], dtype=np.intp)
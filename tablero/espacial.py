@@ -0,0 +1,266 @@
+"""
+Vecindad espacial, tasas suavizadas por Bayes empírico y puntos calientes.
+
+Dos escalas:
+
+- ``departamento``: vecinos = polígonos del shapefile MGN que se tocan
+  (``STRtree`` con predicado ``intersects``).
+- ``municipio``: el checkout no trae el shapefile municipal, así que los
+  vecinos son los municipios a menos de ``MORTALIDAD_RADIO_KM`` (40 km por
+  defecto) según las coordenadas de la hoja ``Hoja3`` de Divipola
+  (``STRtree`` con ``dwithin`` sobre una proyección equirectangular en km).
+
+La vecindad se guarda como matriz dispersa binaria en formato COO (``filas``,
+``columnas``) y todo lo demás son productos matriz-vector sobre ella:
+
+- ``bayes_empirico``: estimador de Marshall con prior local (la unidad y
+  sus vecinos), para todos los capítulos CIE-10 a la vez.
+- ``getis_ord``: estadístico Gi* (puntaje z) sobre la tasa suavizada.
+
+Sin población (``MORTALIDAD_POBLACION``, CSV con columnas ``codigo`` y
+``poblacion`` por código DANE) la "tasa" es la mortalidad proporcional: las
+defunciones del capítulo sobre el total de defunciones de la unidad.
+
+Las capas se calculan una vez por versión de los datos.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+from tablero.version import ruta_cache
+
+RADIO_KM = float(os.environ.get("MORTALIDAD_RADIO_KM", 40))
+RUTA_POBLACION = os.environ.get("MORTALIDAD_POBLACION")
+
+NIVELES = {"departamento": "departamento", "municipio": "cod_municipio"}
+MEDIDAS = ("cruda", "suavizada", "gi")
+
+_KM_GRADO_LAT = 110.574
+_KM_GRADO_LON = 111.320
+
+
+class Vecindad:
+    """Matriz de vecindad binaria ``n × n`` (COO, sin la diagonal)."""
+
+    def __init__(self, n, filas, columnas):
+        self.n = n
+        self.filas = np.asarray(filas, dtype=np.int32)
+        self.columnas = np.asarray(columnas, dtype=np.int32)
+
+    @classmethod
+    def desde_geometrias(cls, geometrias, predicado="intersects", distancia=None):
+        """``geometrias`` (shapely, ``None`` si falta) alineadas con las unidades."""
+        from shapely import STRtree
+
+        validas = np.array([i for i, g in enumerate(geometrias)
+                            if g is not None and not g.is_empty], dtype=np.intp)
+        presentes = [geometrias[i] for i in validas]
+        if not presentes:
+            return cls(len(geometrias), [], [])
+        i, j = STRtree(presentes).query(presentes, predicate=predicado, distance=distancia)
+        i, j = validas[i], validas[j]
+        distintas = i != j
+        return cls(len(geometrias), i[distintas], j[distintas])
+
+    @classmethod
+    def desde_puntos(cls, lon, lat, radio_km=RADIO_KM):
+        import shapely
+
+        lat0 = np.radians(np.nanmean(lat)) if np.isfinite(lat).any() else 0.0
+        x = np.asarray(lon, dtype=float) * _KM_GRADO_LON * np.cos(lat0)
+        y = np.asarray(lat, dtype=float) * _KM_GRADO_LAT
+        puntos = [shapely.Point(a, b) if np.isfinite(a) and np.isfinite(b) else None
+                  for a, b in zip(x.tolist(), y.tolist())]
+        return cls.desde_geometrias(puntos, "dwithin", radio_km)
+
+    def grado(self):
+        return np.bincount(self.filas, minlength=self.n)
+
+    def retraso(self, x, diagonal=True):
+        """``W @ x`` (más ``x`` con ``diagonal``) para ``x`` de forma ``(n,)`` o ``(n, k)``."""
+        x = np.asarray(x, dtype=float)
+        salida = x.copy() if diagonal else np.zeros_like(x)
+        np.add.at(salida, self.filas, x[self.columnas])
+        return salida
+
+
+def bayes_empirico(casos, expuestos, vecindad=None):
+    """
+    Tasas suavizadas (Marshall). ``casos`` es ``(n, k)``, ``expuestos``
+    ``(n,)``. Con ``vecindad`` el prior de cada unidad sale de ella y sus
+    vecinos; sin ella, de todas las unidades.
+    """
+    y = np.asarray(casos, dtype=float)
+    e = np.broadcast_to(np.asarray(expuestos, dtype=float).reshape(len(y), -1), y.shape)
+    con_datos = (e > 0).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(e > 0, y / e, 0.0)
+        if vecindad is None:
+            sy, se, ser2, m = (v.sum(axis=0) for v in (y, e, e * r * r, con_datos))
+        else:
+            sy, se, ser2, m = (vecindad.retraso(v) for v in (y, e, e * r * r, con_datos))
+        b = sy / se
+        # sum e (r - b)^2 / sum e  ==  sum e r^2 / sum e - b^2
+        a = np.maximum(ser2 / se - b * b - b / (se / m), 0.0)
+        w = np.where(e > 0, a / (a + b / e), 0.0)
+        suavizada = w * r + (1 - w) * b
+    return np.nan_to_num(suavizada)
+
+
+def getis_ord(x, vecindad):
+    """Gi* (puntaje z) por columna de ``x`` con pesos binarios que incluyen la unidad."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    pesos = (vecindad.grado() + 1).astype(float)
+    if x.ndim == 2:
+        pesos = pesos[:, None]
+    media = x.mean(axis=0)
+    desviacion = np.sqrt(np.maximum((x * x).mean(axis=0) - media * media, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = ((vecindad.retraso(x) - media * pesos)
+             / (desviacion * np.sqrt((n * pesos - pesos * pesos) / (n - 1))))
+    return np.nan_to_num(z, posinf=0.0, neginf=0.0)
+
+
+def leer_poblacion(ruta=RUTA_POBLACION):
+    """``{codigo DANE: poblacion}`` desde un CSV ``codigo,poblacion`` (o ``None``)."""
+    if not ruta:
+        return None
+    with open(ruta, encoding="utf-8") as f:
+        return {fila["codigo"].strip(): float(fila["poblacion"]) for fila in csv.DictReader(f)}
+
+
+def coordenadas_municipios(ruta):
+    """Código DANE, nombre, longitud y latitud por municipio (Divipola, ``Hoja3``)."""
+    import pandas as pd
+
+    tabla = pd.read_excel(ruta, sheet_name="Hoja3", header=None, skiprows=2,
+                          usecols="C,D,F,G", dtype=str,
+                          names=["codigo", "nombre", "lon", "lat"]).dropna(subset=["codigo"])
+    numero = {c: pd.to_numeric(tabla[c].str.replace(",", ".", regex=False), errors="coerce")
+              for c in ("lon", "lat")}
+    return {c: (lon, lat, n) for c, n, lon, lat in
+            zip(tabla["codigo"].str.strip().str.zfill(5), tabla["nombre"],
+                numero["lon"], numero["lat"])}
+
+
+class Capa:
+    """Una escala: unidades, vecindad y matrices unidad × capítulo."""
+
+    CAMPOS = ("codigos", "nombres", "lon", "lat", "casos", "expuestos",
+              "cruda", "suavizada", "gi")
+
+    def __init__(self, codigos, nombres, lon, lat, vecindad, casos, expuestos,
+                 cruda=None, suavizada=None, gi=None):
+        self.codigos, self.nombres, self.lon, self.lat = codigos, nombres, lon, lat
+        self.vecindad = vecindad
+        self.casos, self.expuestos = casos, expuestos
+        if cruda is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cruda = np.nan_to_num(casos / expuestos.reshape(-1, 1).astype(float))
+            suavizada = bayes_empirico(casos, expuestos, vecindad)
+            gi = getis_ord(suavizada, vecindad)
+        self.cruda, self.suavizada, self.gi = cruda, suavizada, gi
+
+    def arreglos(self, prefijo):
+        datos = {f"{prefijo}{c}": getattr(self, c) for c in self.CAMPOS}
+        datos[f"{prefijo}filas"] = self.vecindad.filas
+        datos[f"{prefijo}columnas"] = self.vecindad.columnas
+        return datos
+
+    @classmethod
+    def desde_arreglos(cls, z, prefijo):
+        campos = {c: z[f"{prefijo}{c}"] for c in cls.CAMPOS}
+        vecindad = Vecindad(len(campos["codigos"]), z[f"{prefijo}filas"],
+                            z[f"{prefijo}columnas"])
+        return cls(vecindad=vecindad, **campos)
+
+
+class CapasEspaciales:
+    def __init__(self, grupos, capas, por_poblacion=False):
+        self.grupos = grupos
+        self.capas = capas
+        self.por_poblacion = por_poblacion
+
+    @classmethod
+    def desde_almacen(cls, almacen, departamentos, municipios, poblacion=None,
+                      radio_km=RADIO_KM):
+        """
+        ``departamentos``: GeoDataFrame del shapefile (``DPTO_CCDGO``,
+        ``DPTO_CNMBR``); ``municipios``: salida de ``coordenadas_municipios``.
+        """
+        grupos = almacen.etiquetas["capitulo"]
+        if poblacion is not None:
+            grupos = np.concatenate([["Todas las causas"], grupos])
+
+        dep = departamentos.to_crs(epsg=4326)
+        poligonos = dict(zip(dep["DPTO_CCDGO"].astype(str).str.zfill(2), dep.geometry))
+        nombres_dep = dict(zip(dep["DPTO_CCDGO"].astype(str).str.zfill(2), dep["DPTO_CNMBR"]))
+
+        capas = {}
+        for nivel, dim in NIVELES.items():
+            codigos = almacen.etiquetas[dim]
+            tabla = almacen.contar((dim, "capitulo"))[:-1]
+            casos = tabla[:, :-1]
+            if poblacion is None:
+                expuestos = tabla.sum(axis=1)
+            else:
+                expuestos = np.array([_poblacion(poblacion, c) for c in codigos.tolist()])
+                casos = np.column_stack([tabla.sum(axis=1), casos])
+            if nivel == "departamento":
+                geometrias = [poligonos.get(c) for c in codigos.tolist()]
+                vecindad = Vecindad.desde_geometrias(geometrias)
+                centros = [g.representative_point() if g is not None else None
+                           for g in geometrias]
+                lon = np.array([p.x if p is not None else np.nan for p in centros])
+                lat = np.array([p.y if p is not None else np.nan for p in centros])
+                nombres = [nombres_dep.get(c, c) for c in codigos.tolist()]
+            else:
+                faltan = (np.nan, np.nan, "")
+                filas = [municipios.get(c, faltan) for c in codigos.tolist()]
+                lon = np.array([f[0] for f in filas], dtype=float)
+                lat = np.array([f[1] for f in filas], dtype=float)
+                nombres = [f[2] or c for f, c in zip(filas, codigos.tolist())]
+                vecindad = Vecindad.desde_puntos(lon, lat, radio_km)
+            capas[nivel] = Capa(codigos, np.array(nombres), lon, lat, vecindad,
+                                casos, np.asarray(expuestos))
+        return cls(grupos, capas, poblacion is not None)
+
+    @classmethod
+    def obtener(cls, almacen, departamentos, ruta_municipios, version):
+        poblacion = leer_poblacion()
+        nombre = f"espacial-{RADIO_KM:g}km" + ("-poblacion" if poblacion else "")
+        ruta = ruta_cache(nombre, version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        capas = cls.desde_almacen(almacen, departamentos,
+                                  coordenadas_municipios(ruta_municipios), poblacion)
+        capas.guardar(ruta)
+        return capas
+
+    def guardar(self, ruta):
+        arreglos = {}
+        for nivel, capa in self.capas.items():
+            arreglos.update(capa.arreglos(f"{nivel}_"))
+        np.savez(ruta, grupos=self.grupos, por_poblacion=self.por_poblacion, **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            return cls(z["grupos"], {n: Capa.desde_arreglos(z, f"{n}_") for n in NIVELES},
+                       bool(z["por_poblacion"]))
+
+    def valores(self, nivel, grupo, medida):
+        """``(capa, valores)`` de una medida para un capítulo."""
+        capa = self.capas[nivel]
+        j = self.grupos.tolist().index(grupo)
+        return capa, getattr(capa, medida)[:, j]
+
+
+def _poblacion(poblacion, codigo):
+    if codigo in poblacion:
+        return poblacion[codigo]
+    # Departamento sin fila propia: suma de sus municipios
+    return sum(v for c, v in poblacion.items() if len(c) == 5 and c.startswith(codigo))
@@ -0,0 +1,250 @@
+"""
+Exportación del dashboard a un sitio estático.
+
+Recorre los layouts ``page_1``, ``page_2`` y ``page_3`` de ``app.py`` y los
+escribe como HTML plano con las figuras pre-renderizadas. Cada figura se
+guarda una sola vez por contenido (el mapa de ``/exploracion`` y ``/causas``
+es el mismo archivo) y la GeoJSON de departamentos sale del registro de
+``tablero.geometria`` a un archivo compartido que plotly.js descarga por
+URL. Los JSON se
+escriben también comprimidos (``.json.gz``) para servidores con
+``gzip_static`` o un CDN.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m tablero.exportar --salida sitio [--inline] [--sin-gzip]
+
+Los componentes interactivos (filtros, selectores) no se exportan: el sitio
+es la foto fija de 2019 y la app en vivo sigue sirviendo la exploración.
+Las tablas paginadas en el servidor (el explorador de causas) se exportan
+con su primera página.
+"""
+
+import argparse
+import gzip
+import hashlib
+import html as html_std
+import json
+import os
+import shutil
+import time
+
+from tablero.geometria import serializar
+
+PAGINAS = {"/": "index.html", "/exploracion": "exploracion.html", "/causas": "causas.html"}
+
+BOOTSTRAP_CSS = "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css"
+
+PLANTILLA = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Mortalidad Colombia 2019</title>
+<link rel="stylesheet" href="{css}">
+<script src="plotly.min.js"></script>
+</head>
+<body>
+{cuerpo}
+<script>
+document.querySelectorAll("[data-figura]").forEach(function (div) {{
+    var pintar = function (fig) {{
+        Plotly.newPlot(div, fig.data, fig.layout, {{responsive: true}});
+    }};
+    var embebida = document.getElementById(div.dataset.figura);
+    if (embebida) {{
+        pintar(JSON.parse(embebida.textContent));
+    }} else {{
+        fetch(div.dataset.figura).then(function (r) {{ return r.json(); }}).then(pintar);
+    }}
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def _hash(texto):
+    return hashlib.sha1(texto.encode()).hexdigest()[:12]
+
+
+class Sitio:
+    """Acumula archivos del sitio y deduplica figuras y geometrías por contenido."""
+
+    def __init__(self, salida, inline=False, comprimir=True, geometrias=None, tablas=None):
+        """
+        ``tablas``: ``{id: funcion(tamano) -> filas}`` para las ``DataTable``
+        sin ``data`` (paginadas en el servidor).
+        """
+        self.salida = salida
+        self.geometrias = geometrias
+        self.tablas = tablas or {}
+        self.inline = inline
+        self.comprimir = comprimir
+        self.escritos = {}
+
+    def escribir(self, relativa, texto):
+        if relativa in self.escritos:
+            return relativa
+        ruta = os.path.join(self.salida, relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        datos = texto.encode("utf-8")
+        with open(ruta, "wb") as f:
+            f.write(datos)
+        tamanos = [len(datos)]
+        if self.comprimir and relativa.endswith(".json"):
+            with open(ruta + ".gz", "wb") as f:
+                with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                    gz.write(datos)
+            tamanos.append(os.path.getsize(ruta + ".gz"))
+        self.escritos[relativa] = tamanos
+        return relativa
+
+    def geometria(self, geojson):
+        """Ruta relativa de la geometría (embebida o URL del registro compartido)."""
+        if isinstance(geojson, dict):
+            nombre, texto = serializar(geojson)
+        elif self.geometrias is not None and self.geometrias.nombre(geojson):
+            nombre = self.geometrias.nombre(geojson)
+            texto = self.geometrias.archivos[nombre][0].decode("utf-8")
+        else:
+            return geojson
+        return self.escribir(f"geo/{nombre}", texto)
+
+    def figura(self, fig):
+        import plotly.io as pio
+
+        datos = json.loads(pio.to_json(fig, validate=False))
+        for traza in datos.get("data", []):
+            if traza.get("geojson") is not None:
+                traza["geojson"] = self.geometria(traza["geojson"])
+        texto = json.dumps(datos, separators=(",", ":"))
+        return texto, self.escribir(f"figuras/{_hash(texto)}.json", texto)
+
+
+def _atributos(comp, clases=None):
+    attrs = []
+    if getattr(comp, "id", None):
+        attrs.append(f'id="{html_std.escape(str(comp.id))}"')
+    clase = " ".join(c for c in (clases, getattr(comp, "className", None)) if c)
+    if clase:
+        attrs.append(f'class="{html_std.escape(clase)}"')
+    estilo = getattr(comp, "style", None)
+    if estilo:
+        css = ";".join(f"{k}:{v}" for k, v in estilo.items())
+        attrs.append(f'style="{html_std.escape(css)}"')
+    return (" " + " ".join(attrs)) if attrs else ""
+
+
+def _enlace(href):
+    return PAGINAS.get(href, href)
+
+
+def renderizar(comp, sitio):
+    """HTML estático de un árbol de componentes Dash."""
+    if comp is None:
+        return ""
+    if isinstance(comp, (list, tuple)):
+        return "".join(renderizar(c, sitio) for c in comp)
+    if isinstance(comp, (str, int, float)):
+        return html_std.escape(str(comp))
+
+    tipo, espacio = comp._type, comp._namespace
+    hijos = renderizar(getattr(comp, "children", None), sitio)
+
+    if espacio == "dash_html_components":
+        etiqueta = tipo.lower()
+        if etiqueta in ("br", "hr", "img"):
+            return f"<{etiqueta}{_atributos(comp)}>"
+        href = getattr(comp, "href", None)
+        extra = f' href="{_enlace(href)}"' if href else ""
+        return f"<{etiqueta}{_atributos(comp)}{extra}>{hijos}</{etiqueta}>"
+
+    if espacio == "dash_bootstrap_components":
+        if tipo == "Container":
+            clase = "container-fluid" if getattr(comp, "fluid", False) else "container"
+            return f"<div{_atributos(comp, clase)}>{hijos}</div>"
+        if tipo == "Row":
+            return f"<div{_atributos(comp, 'row')}>{hijos}</div>"
+        if tipo == "Col":
+            ancho = getattr(comp, "width", None)
+            return f"<div{_atributos(comp, f'col-{ancho}' if ancho else 'col')}>{hijos}</div>"
+        if tipo == "NavbarSimple":
+            return ('<nav class="navbar navbar-expand navbar-dark bg-dark"><div class="container-fluid">'
+                    f'<a class="navbar-brand" href="index.html">{html_std.escape(comp.brand)}</a>'
+                    f'<ul class="navbar-nav">{hijos}</ul></div></nav>')
+        if tipo == "NavItem":
+            return f'<li class="nav-item">{hijos}</li>'
+        if tipo == "NavLink":
+            return f'<a class="nav-link" href="{_enlace(comp.href)}">{hijos}</a>'
+        return f"<div{_atributos(comp)}>{hijos}</div>"
+
+    if espacio == "dash_core_components":
+        if tipo == "Link":
+            return f'<a href="{_enlace(comp.href)}">{hijos}</a>'
+        if tipo == "Graph" and getattr(comp, "figure", None) is not None:
+            texto, ruta = sitio.figura(comp.figure)
+            if sitio.inline:
+                ident = f"fig-{_hash(texto)}"
+                seguro = texto.replace("</", "<\\/")
+                return (f'<div data-figura="{ident}" style="height:450px"></div>'
+                        f'<script type="application/json" id="{ident}">{seguro}</script>')
+            return f'<div data-figura="{ruta}" style="height:450px"></div>'
+        # Controles interactivos: sólo existen en la app en vivo
+        return ""
+
+    if tipo == "DataTable":
+        columnas = comp.columns or []
+        datos = getattr(comp, "data", None)
+        if datos is None and getattr(comp, "id", None) in sitio.tablas:
+            datos = sitio.tablas[comp.id](getattr(comp, "page_size", None) or 250)
+        cabecera = "".join(f"<th>{html_std.escape(str(c['name']))}</th>" for c in columnas)
+        filas = "".join(
+            "<tr>" + "".join(f"<td>{html_std.escape(str(fila.get(c['id'], '')))}</td>"
+                             for c in columnas) + "</tr>"
+            for fila in (datos or []))
+        return (f'<table class="table table-sm"><thead><tr>{cabecera}</tr></thead>'
+                f"<tbody>{filas}</tbody></table>")
+
+    return hijos
+
+
+def exportar(salida, inline=False, comprimir=True):
+    import plotly
+
+    os.environ.setdefault("MORTALIDAD_CALENTAR", "0")
+    import app
+
+    inicio = time.perf_counter()
+    tablas = {"causas-explorador": lambda tamano: app.indice_causas.pagina(0, tamano)[0]}
+    sitio = Sitio(salida, inline=inline, comprimir=comprimir, geometrias=app.geometrias,
+                  tablas=tablas)
+    paginas = {"/": app.page_1, "/exploracion": app.page_2, "/causas": app.page_3}
+    for ruta, layout in paginas.items():
+        cuerpo = renderizar([app.nav, layout], sitio)
+        sitio.escribir(PAGINAS[ruta], PLANTILLA.format(css=BOOTSTRAP_CSS, cuerpo=cuerpo))
+
+    plotly_js = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+    shutil.copyfile(plotly_js, os.path.join(salida, "plotly.min.js"))
+
+    total = sum(t[0] for t in sitio.escritos.values())
+    total_gz = sum(t[-1] for t in sitio.escritos.values())
+    for relativa, tamanos in sorted(sitio.escritos.items()):
+        print(f"{relativa:45s} {tamanos[0] / 1024:10.1f} KB"
+              + (f" {tamanos[1] / 1024:10.1f} KB gz" if len(tamanos) > 1 else ""))
+    print(f"{len(sitio.escritos)} archivos, {total / 1024:.1f} KB "
+          f"({total_gz / 1024:.1f} KB comprimido) en {time.perf_counter() - inicio:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el dashboard como sitio estático.")
+    parser.add_argument("--salida", default="sitio", help="Carpeta de destino (sitio)")
+    parser.add_argument("--inline", action="store_true",
+                        help="Embebe el JSON de las figuras en el HTML")
+    parser.add_argument("--sin-gzip", action="store_true", help="No escribe los .json.gz")
+    args = parser.parse_args()
+    exportar(args.salida, inline=args.inline, comprimir=not args.sin_gzip)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Fábrica de las figuras fijas del dashboard.
+
+``plotly.express`` inspecciona el DataFrame, valida cada propiedad y mezcla
+la plantilla en cada llamada; con el histograma de edad además manda un
+valor por registro al navegador. Aquí el esqueleto de cada figura (layout,
+plantilla y propiedades de las trazas) se arma una sola vez y cada figura
+nueva es una copia superficial del esqueleto con los datos del almacén
+columnar. Los arreglos numéricos van como *typed arrays* de Plotly
+(``{"dtype": "i4", "bdata": <base64>}``) y no como listas de números; las
+etiquetas (municipios, departamentos, grupos etarios) siguen como listas.
+
+Los esqueletos salen de ``plotly.express`` sobre marcos de una fila con los
+mismos argumentos que ``tablero.pipeline.construir_figuras``, así que las
+figuras se ven igual que las originales. El histograma de edad usa
+``histfunc="sum"`` sobre los conteos por grupo: mismas barras, mismo orden
+de categorías y mismo ``hovertemplate``.
+
+Las figuras son dicts JSON listos para ``dcc.Graph``; comparten la plantilla
+con el esqueleto, así que no deben modificarse por dentro.
+"""
+
+import base64
+import copy
+import json
+
+import numpy as np
+
+NOMBRES = ("mapa_fig", "linea_fig", "barras_top5", "pie_top10", "stack_fig", "hist_fig")
+
+# Propiedades de traza que llevan datos y se quitan del esqueleto
+ARREGLOS = ("x", "y", "z", "values", "labels", "locations", "hovertext", "text", "customdata")
+
+# dtype de NumPy -> dtype de los typed arrays de Plotly
+_TIPOS = {"int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+          "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8"}
+
+
+def binario(valores):
+    """Arreglo numérico como typed array de Plotly; el resto, como lista."""
+    arreglo = np.asarray(valores)
+    if arreglo.dtype.kind == "b":
+        arreglo = arreglo.astype(np.uint8)
+    elif arreglo.dtype.kind in "iu" and arreglo.dtype.name not in _TIPOS:
+        cabe = not len(arreglo) or (arreglo.min() >= -2 ** 31 and arreglo.max() < 2 ** 31)
+        arreglo = arreglo.astype(np.int32 if cabe else np.float64)
+    if arreglo.dtype.name not in _TIPOS or not len(arreglo):
+        return arreglo.tolist()
+    datos = arreglo.astype(arreglo.dtype.newbyteorder("<"), copy=False).tobytes()
+    return {"dtype": _TIPOS[arreglo.dtype.name], "bdata": base64.b64encode(datos).decode("ascii")}
+
+
+def desde_binario(valor):
+    """Inversa de ``binario``: typed array de Plotly o lista -> ``np.ndarray``."""
+    if isinstance(valor, dict) and "bdata" in valor:
+        tipo = np.dtype({v: k for k, v in _TIPOS.items()}[valor["dtype"]])
+        return np.frombuffer(base64.b64decode(valor["bdata"]), dtype=tipo.newbyteorder("<"))
+    return np.asarray(valor)
+
+
+def _es_arreglo(valor):
+    return isinstance(valor, (list, tuple)) or (isinstance(valor, dict) and "bdata" in valor)
+
+
+def esqueleto(figura):
+    """Copia de ``figura`` (``go.Figure`` o dict) sin los arreglos de datos."""
+    if hasattr(figura, "to_plotly_json"):
+        import plotly.io as pio
+
+        spec = json.loads(pio.to_json(figura, validate=False))
+    else:
+        spec = copy.deepcopy(figura)
+    for traza in spec.get("data", []):
+        for prop in ARREGLOS:
+            if _es_arreglo(traza.get(prop)):
+                del traza[prop]
+        if _es_arreglo(traza.get("marker", {}).get("color")):
+            del traza["marker"]["color"]
+    return spec
+
+
+class FabricaFiguras:
+    def __init__(self, esqueletos):
+        self.esqueletos = esqueletos
+
+    @classmethod
+    def desde_figuras(cls, figuras):
+        return cls({n: esqueleto(f) for n, f in figuras.items()})
+
+    @classmethod
+    def plantillas(cls, geojson, sexos):
+        """
+        Esqueletos de ``plotly.express`` con los argumentos del pipeline.
+        ``sexos`` fija las trazas de ``stack_fig`` (una por sexo, en orden
+        de aparición, como las colorea ``px``).
+        """
+        import pandas as pd
+        import plotly.express as px
+
+        mapa = px.choropleth(
+            pd.DataFrame({"DPTO_CCDGO": [""], "Total_muer_dep": [0.0], "DPTO_CNMBR": [""]}),
+            geojson=geojson,
+            locations="DPTO_CCDGO",
+            color="Total_muer_dep",
+            featureidkey="properties.DPTO_CCDGO",
+            projection="mercator",
+            hover_name="DPTO_CNMBR",
+            color_continuous_scale="Reds",
+            title="Mapa de Mortalidad por Departamento – 2019"
+        )
+        mapa.update_geos(fitbounds="locations", visible=False)
+        mapa.update_layout(margin=dict(l=0, r=0, t=30, b=0))
+        municipios = pd.DataFrame({"MUNICIPIO": [""], "Total": [0]})
+        figuras = {
+            "mapa_fig": mapa,
+            "linea_fig": px.line(pd.DataFrame({"MES": [0], "Total": [0]}), x="MES", y="Total",
+                                 markers=True, title="Muertes por mes"),
+            "barras_top5": px.bar(municipios, x="MUNICIPIO", y="Total", color="Total",
+                                  title="Top 5 Municipios con Mayor Mortalidad"),
+            "pie_top10": px.pie(municipios, values="Total", names="MUNICIPIO",
+                                title="Top 10 Municipios (participación)"),
+            "stack_fig": px.bar(pd.DataFrame({"DPTO_CNMBR": [""] * len(sexos), "SEXO": sexos,
+                                              "Total": [0] * len(sexos)}),
+                                x="DPTO_CNMBR", y="Total", color="SEXO",
+                                title="Muertes por Sexo y Departamento", barmode="stack"),
+            "hist_fig": px.histogram(pd.DataFrame({"RANGO_EDAD": [""]}), x="RANGO_EDAD",
+                                     title="Distribución de Muertes por Grupo Etario"),
+        }
+        return cls.desde_figuras(figuras)
+
+    def construir(self, nombre, trazas, **layout):
+        """
+        Figura ``nombre`` con ``trazas[i]`` (``{propiedad: valores}``) sobre la
+        traza ``i`` del esqueleto; ``marker_color`` va a ``marker.color``.
+        ``layout`` reemplaza claves de primer nivel (p. ej. ``title``).
+        """
+        base = self.esqueletos[nombre]
+        data = []
+        for plantilla, datos in zip(base["data"], trazas):
+            traza = dict(plantilla)
+            for prop, valores in datos.items():
+                if prop == "marker_color":
+                    traza["marker"] = dict(traza.get("marker", {}), color=binario(valores))
+                elif isinstance(valores, (list, tuple, np.ndarray)):
+                    traza[prop] = binario(valores)
+                else:
+                    traza[prop] = valores
+            data.append(traza)
+        return {"data": data, "layout": dict(base["layout"], **layout)}
+
+    def figuras(self, datos):
+        """Las figuras de ``datos`` (ver ``trazas_dashboard``)."""
+        return {n: self.construir(n, datos[n]) for n in NOMBRES}
+
+
+def top_k(conteo, k):
+    """
+    Índices de los ``k`` mayores conteos positivos en el orden de
+    ``sort_values("Total", ascending=False)`` de pandas, empates incluidos
+    (``nargsort``: invierte, ordena con quicksort y vuelve a invertir).
+    """
+    posiciones = np.arange(len(conteo))[::-1]
+    orden = posiciones[np.argsort(conteo[::-1], kind="quicksort")][::-1][:k]
+    return orden[conteo[orden] > 0]
+
+
+def trazas_dashboard(almacen, ubicaciones, nombres_dpto):
+    """
+    Datos de las figuras fijas desde el almacén, con la semántica de
+    ``pipeline.construir_figuras`` (los nulos de la llave no cuentan y sólo
+    aparecen los grupos con registros). ``ubicaciones`` son los códigos
+    ``DPTO_CCDGO`` de ``resultado_mapa`` en su orden.
+    """
+    etiquetas = almacen.etiquetas
+    datos = {}
+
+    por_dpto = almacen.contar(("departamento",))[:-1]
+    pos = {c: i for i, c in enumerate(etiquetas["departamento"].tolist())}
+    z = np.array([por_dpto[pos[c]] if c in pos and por_dpto[pos[c]] else np.nan
+                  for c in ubicaciones], dtype=float)
+    datos["mapa_fig"] = [{"locations": list(ubicaciones), "z": z,
+                          "hovertext": [nombres_dpto.get(c) for c in ubicaciones]}]
+
+    por_mes = almacen.contar(("mes",))[:-1]
+    con_datos = por_mes > 0
+    datos["linea_fig"] = [{"x": etiquetas["mes"][con_datos], "y": por_mes[con_datos]}]
+
+    por_municipio = almacen.contar(("municipio",))[:-1]
+    top5, top10 = top_k(por_municipio, 5), top_k(por_municipio, 10)
+    datos["barras_top5"] = [{"x": etiquetas["municipio"][top5].tolist(),
+                             "y": por_municipio[top5], "marker_color": por_municipio[top5]}]
+    datos["pie_top10"] = [{"labels": etiquetas["municipio"][top10].tolist(),
+                           "values": por_municipio[top10]}]
+
+    # groupby(["DPTO_CNMBR", "SEXO"]): departamentos por nombre, sin los que
+    # no están en el shapefile; una traza por sexo en orden de aparición
+    tabla = almacen.contar(("departamento", "sexo"))[:-1, :-1]
+    nombres = [nombres_dpto.get(c) for c in etiquetas["departamento"].tolist()]
+    orden = sorted({n for n in nombres if n is not None})
+    por_nombre = np.zeros((len(orden), tabla.shape[1]), dtype=np.int64)
+    fila = {n: i for i, n in enumerate(orden)}
+    for i, n in enumerate(nombres):
+        if n is not None:
+            por_nombre[fila[n]] += tabla[i]
+    sexos = [j for i in range(len(orden)) for j in np.flatnonzero(por_nombre[i])]
+    sexos = list(dict.fromkeys(sexos))
+    datos["stack_fig"] = [{"x": [orden[i] for i in np.flatnonzero(por_nombre[:, j])],
+                           "y": por_nombre[por_nombre[:, j] > 0, j],
+                           "name": etiquetas["sexo"][j].item()} for j in sexos]
+
+    # Categorías en el orden de aparición de los registros, como px.histogram
+    codigos = almacen.columnas["edad"]
+    presentes, primero = np.unique(codigos, return_index=True)
+    presentes = presentes[np.argsort(primero)]
+    presentes = presentes[presentes < len(etiquetas["edad"])]
+    por_edad = np.bincount(codigos, minlength=len(etiquetas["edad"]) + 1)
+    datos["hist_fig"] = [{"x": etiquetas["edad"][presentes].tolist(), "y": por_edad[presentes],
+                          "histfunc": "sum"}]
+    return datos
+
+
+def figuras_dashboard(almacen, ubicaciones, nombres_dpto, geojson, fabrica=None):
+    """Las seis figuras fijas; arma los esqueletos si no se pasa ``fabrica``."""
+    datos = trazas_dashboard(almacen, ubicaciones, nombres_dpto)
+    if fabrica is None:
+        fabrica = FabricaFiguras.plantillas(geojson, [t["name"] for t in datos["stack_fig"]])
+    return fabrica.figuras(datos)
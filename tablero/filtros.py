@@ -0,0 +1,275 @@
+"""
+Filtros comunes del dashboard (departamento, sexo, edad, mes y causa).
+
+Dos modos, elegidos con ``MORTALIDAD_FILTROS``:
+
+- ``cliente`` (por defecto): el cubo viaja una vez en un ``dcc.Store`` y las
+  funciones de ``assets/filtros.js`` reestilizan las figuras en el navegador.
+- ``servidor``: callbacks de Python sobre el mismo cubo, memoizados en la
+  caché compartida, que responden con ``Patch`` (sólo ``z``/``x``/``y``).
+
+El filtro de causa es un selector con búsqueda sobre ``tablero.busqueda``;
+al elegir códigos el servidor recalcula el cubo restringido a esas causas
+(``cubo_para``) y en modo cliente lo reenvía al ``dcc.Store``. Con varios
+conjuntos de datos (``tablero.conjuntos``) el selector ``conjunto`` cambia
+el cubo de la misma forma y, con él, las trazas de las barras apiladas y
+las categorías del histograma, que salen de los esqueletos del conjunto.
+"""
+
+import copy
+import os
+
+import dash_bootstrap_components as dbc
+from dash import ClientsideFunction, Input, Output, Patch, State, dcc, html
+from dash.exceptions import PreventUpdate
+
+from tablero.causas import normalizar
+from tablero.descargas import RUTA as RUTA_DESCARGA
+
+MODO = os.environ.get("MORTALIDAD_FILTROS", "cliente")
+
+ENTRADAS = ("filtro-dpto", "filtro-sexo", "filtro-edad", "filtro-mes")
+
+
+def estado_filtros(dptos, sexos, edades, meses):
+    return {"departamento": dptos or [], "sexo": sexos or [], "edad": edades, "mes": meses}
+
+
+def panel(cubo, nombres_dpto, buscador=True, descarga=True):
+    edades = cubo.etiquetas["edad"].tolist()
+    meses = [int(m) for m in cubo.etiquetas["mes"].tolist()]
+    filas = [dbc.Row([
+        dbc.Col(dcc.Dropdown(id="filtro-dpto",
+                             options=[{"label": nombres_dpto.get(c, c), "value": c}
+                                      for c in cubo.etiquetas["departamento"].tolist()],
+                             multi=True, placeholder="Departamento"), width=3),
+        dbc.Col(dcc.Dropdown(id="filtro-sexo",
+                             options=[{"label": s, "value": s}
+                                      for s in cubo.etiquetas["sexo"].tolist()],
+                             multi=True, placeholder="Sexo"), width=2),
+        dbc.Col(dcc.RangeSlider(id="filtro-edad", min=0, max=len(edades) - 1, step=1,
+                                value=[0, len(edades) - 1],
+                                marks={i: {"label": e, "style": {"fontSize": "0.7em"}}
+                                       for i, e in enumerate(edades)}), width=4),
+        dbc.Col(dcc.RangeSlider(id="filtro-mes", min=min(meses), max=max(meses), step=1,
+                                value=[min(meses), max(meses)],
+                                marks={m: str(m) for m in meses}), width=3)
+    ], className="my-2")]
+    extras = []
+    if buscador:
+        extras.append(dbc.Col(dcc.Dropdown(
+            id="filtro-causa", options=[], multi=True,
+            placeholder="Causa CIE-10: escriba código o descripción"),
+            width=10 if descarga else 12))
+    if descarga:
+        extras.append(dbc.Col(html.A("Descargar registros (CSV)", id="descarga-registros",
+                                     href=RUTA_DESCARGA + ".csv"),
+                              width=2, className="align-self-center"))
+    if extras:
+        filas.append(dbc.Row(extras, className="mb-2"))
+    return dbc.Container(filas, fluid=True)
+
+
+def carga(cubo, nombres_dpto, figuras=None):
+    """``figuras`` (``{"stack": ..., "hist": ...}``) reemplaza las del navegador."""
+    extra = {"nombres_departamento": [nombres_dpto.get(c, c) for c in
+                                      cubo.etiquetas["departamento"].tolist()]}
+    if figuras:
+        extra["figuras"] = figuras
+    return cubo.carga(extra)
+
+
+# --- Versiones en Python de las funciones de assets/filtros.js ---
+# Devuelven sólo los cambios ``[(ruta, valor)]``; ``parche`` los convierte en
+# un ``Patch`` de Dash, así la respuesta lleva los arreglos nuevos y no la
+# figura completa (la GeoJSON y el layout se quedan en el navegador). Los
+# cambios son datos planos, por eso se memoizan ellos y no el ``Patch``.
+# Las figuras pueden ser ``go.Figure`` o dicts JSON (``tablero.fabrica``): sólo
+# se leen con subíndices.
+
+def parche(*cambios):
+    """``Patch`` con las asignaciones de una o varias listas ``[(ruta, valor)]``."""
+    resultado = Patch()
+    for ruta, valor in (c for lista in cambios for c in lista):
+        destino = resultado
+        for llave in ruta[:-1]:
+            destino = destino[llave]
+        destino[ruta[-1]] = valor
+    return resultado
+
+
+def figura_completa(fig, *cambios):
+    """Como ``parche``, sobre una copia de ``fig`` (dict JSON): la figura entera."""
+    nueva = copy.deepcopy(fig)
+    for ruta, valor in (c for lista in cambios for c in lista):
+        destino = nueva
+        for llave in ruta[:-1]:
+            destino = destino[llave]
+        destino[ruta[-1]] = valor
+    return nueva
+
+
+def cambios_mapa(fig, cubo, filtros):
+    z = cubo.marginal(("departamento",), filtros)
+    pos = {c: i for i, c in enumerate(cubo.etiquetas["departamento"].tolist())}
+    return [(("data", 0, "z"),
+             [int(z[pos[c]]) if c in pos else None for c in fig["data"][0]["locations"]])]
+
+
+def cambios_linea(fig, cubo, filtros):
+    if not fig["data"]:
+        return []
+    y = cubo.marginal(("mes",), filtros)
+    m = cubo.permitidas("mes", filtros.get("mes"))
+    meses = cubo.etiquetas["mes"].tolist()
+    return [(("data", 0, "x"), [mes for i, mes in enumerate(meses) if m[i]]),
+            (("data", 0, "y"), [int(v) for i, v in enumerate(y) if m[i]])]
+
+
+def cambios_apiladas(fig, cubo, filtros, nombres_dpto):
+    tabla = cubo.marginal(("departamento", "sexo"), filtros)
+    pos_dpto = {nombres_dpto.get(c, c): i
+                for i, c in enumerate(cubo.etiquetas["departamento"].tolist())}
+    pos_sexo = {s: j for j, s in enumerate(cubo.etiquetas["sexo"].tolist())}
+    cambios = []
+    for k, traza in enumerate(fig["data"]):
+        j = pos_sexo.get(traza["name"])
+        cambios.append((("data", k, "y"),
+                        [int(tabla[pos_dpto[n], j]) if n in pos_dpto and j is not None else 0
+                         for n in traza["x"]]))
+    return cambios
+
+
+def cambios_histograma(fig, cubo, filtros):
+    # Histograma con histfunc="sum" sobre un conteo por grupo (tablero.fabrica):
+    # basta con cambiar y, en el orden de categorías de la figura
+    conteo = cubo.marginal(("edad",), filtros)
+    pos = {e: i for i, e in enumerate(cubo.etiquetas["edad"].tolist())}
+    return [(("data", 0, "y"),
+             [int(conteo[pos[e]]) if e in pos else 0 for e in fig["data"][0]["x"]])]
+
+
+def opciones_causa(busqueda, texto, seleccion):
+    """
+    Opciones del selector de causa: las ya elegidas más las coincidencias de
+    ``texto``. ``search`` lleva la etiqueta sin tildes para que el filtro
+    propio del ``Dropdown`` no descarte lo que el índice encontró.
+    """
+    seleccion = seleccion or []
+    pares = [(c, busqueda.etiqueta(c)) for c in seleccion]
+    pares += [(c, e) for c, e in busqueda.buscar(texto) if c not in seleccion]
+    return [{"label": e, "value": c, "search": f"{e} {normalizar(e)}"} for c, e in pares]
+
+
+def registrar(app, cubo, nombres_dpto, figuras, cache, modo=MODO,
+              busqueda=None, cubo_para=None, descarga=False, conjuntos=None):
+    """
+    Conecta los filtros con las figuras de ``/exploracion`` y ``/causas``.
+    ``busqueda`` (``IndiceBusqueda``) y ``cubo_para`` (códigos -> ``Cubo``)
+    activan el filtro de causa; sin ellos ``panel`` va con ``buscador=False``.
+    ``descarga`` mantiene el enlace de ``tablero.descargas`` al día, con el
+    conjunto elegido (siempre en el navegador, no depende del modo). ``conjuntos`` (``{clave:
+    Conjunto}``) agrega el selector ``conjunto``: los filtros usan el cubo
+    (y ``cubo_para``) del conjunto elegido. El mapa y la línea conservan las
+    figuras del principal (mismas ubicaciones y meses); las barras apiladas
+    y el histograma se arman con los esqueletos del conjunto, porque sus
+    sexos y grupos de edad pueden ser otros (p. ej. sólo fetales).
+    """
+    entradas = [Input(i, "value") for i in ENTRADAS]
+
+    if descarga:
+        app.clientside_callback(
+            ClientsideFunction(namespace="mortalidad", function_name="enlace_descarga"),
+            Output("descarga-registros", "href"), *entradas,
+            *([Input("filtro-causa", "value")] if busqueda is not None else []),
+            *([Input("conjunto", "value")] if conjuntos else []))
+
+    if busqueda is not None:
+        @app.callback(Output("filtro-causa", "options"),
+                      Input("filtro-causa", "search_value"),
+                      State("filtro-causa", "value"))
+        def sugerir_causas(texto, seleccion):
+            if not texto:
+                raise PreventUpdate
+            return opciones_causa(busqueda, texto, seleccion)
+
+    def cubo_filtrado(causas, conjunto=None):
+        if conjuntos and conjunto in conjuntos:
+            origen = conjuntos[conjunto]
+            return origen.cubo_para(causas) if causas and cubo_para is not None else origen.cubo
+        return cubo_para(causas) if causas and cubo_para is not None else cubo
+
+    def figuras_de(conjunto):
+        if conjuntos and conjunto in conjuntos:
+            propias = conjuntos[conjunto].figuras
+            return dict(figuras, stack=propias["stack_fig"], hist=propias["hist_fig"])
+        return figuras
+
+    # Entradas extra de los callbacks: causa y conjunto, en ese orden
+    extras = [Input("filtro-causa", "value")] if cubo_para is not None else []
+    extras += [Input("conjunto", "value")] if conjuntos else []
+
+    def separar(extra):
+        extra = list(extra)
+        conjunto = extra.pop() if conjuntos else None
+        causas = extra.pop() if cubo_para is not None else None
+        return causas, conjunto
+
+    if modo == "cliente":
+        if extras:
+            @app.callback(Output("cubo-carga", "data"), *extras, prevent_initial_call=True)
+            @cache.memoizar("/filtros#causa")
+            def cargar_cubo(*extra):
+                causas, conjunto = separar(extra)
+                propias = figuras_de(conjunto)
+                return carga(cubo_filtrado(causas, conjunto), nombres_dpto,
+                             {"stack": propias["stack"], "hist": propias["hist"]}
+                             if conjuntos else None)
+
+        app.clientside_callback(
+            ClientsideFunction(namespace="mortalidad", function_name="filtrar_exploracion"),
+            Output("mapa-exploracion", "figure"), Output("linea-fig", "figure"),
+            *entradas, Input("cubo-carga", "data"),
+            State("mapa-exploracion", "figure"), State("linea-fig", "figure"))
+        app.clientside_callback(
+            ClientsideFunction(namespace="mortalidad", function_name="filtrar_causas"),
+            Output("mapa-causas", "figure"), Output("stack-fig", "figure"),
+            Output("hist-fig", "figure"),
+            *entradas, Input("cubo-carga", "data"),
+            State("mapa-causas", "figure"), State("stack-fig", "figure"),
+            State("hist-fig", "figure"))
+        return
+
+    entradas += extras
+
+    @cache.memoizar("/exploracion#filtros")
+    def cambios_exploracion(dptos, sexos, edades, meses, *extra):
+        filtros = estado_filtros(dptos, sexos, edades, meses)
+        actual = cubo_filtrado(*separar(extra))
+        return (cambios_mapa(figuras["mapa"], actual, filtros),
+                cambios_linea(figuras["linea"], actual, filtros))
+
+    @cache.memoizar("/causas#filtros")
+    def cambios_causas(dptos, sexos, edades, meses, *extra):
+        filtros = estado_filtros(dptos, sexos, edades, meses)
+        causas, conjunto = separar(extra)
+        actual, propias = cubo_filtrado(causas, conjunto), figuras_de(conjunto)
+        return (cambios_mapa(propias["mapa"], actual, filtros),
+                cambios_apiladas(propias["stack"], actual, filtros, nombres_dpto),
+                cambios_histograma(propias["hist"], actual, filtros))
+
+    @app.callback(Output("mapa-exploracion", "figure"), Output("linea-fig", "figure"),
+                  *entradas)
+    def filtrar_exploracion(*valores):
+        return tuple(parche(c) for c in cambios_exploracion(*valores))
+
+    @app.callback(Output("mapa-causas", "figure"), Output("stack-fig", "figure"),
+                  Output("hist-fig", "figure"), *entradas)
+    def filtrar_causas(*valores):
+        mapa, apiladas, histograma = cambios_causas(*valores)
+        if not conjuntos:
+            return parche(mapa), parche(apiladas), parche(histograma)
+        # Las trazas dependen del conjunto: barras e histograma van completos
+        propias = figuras_de(separar(valores[len(ENTRADAS):])[1])
+        return (parche(mapa), figura_completa(propias["stack"], apiladas),
+                figura_completa(propias["hist"], histograma))
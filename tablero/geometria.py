@@ -0,0 +1,82 @@
+"""
+Geometrías compartidas entre mapas.
+
+Cada GeoJSON se registra una vez, se sirve como recurso estático en
+``/geo/<hash>.json`` (caché inmutable del navegador, gzip precalculado) y
+las figuras choropleth la referencian por URL en lugar de llevarla dentro.
+Así el navegador descarga los polígonos una sola vez por sesión, sin
+importar cuántos mapas o páginas se vean. ``tablero.exportar`` usa el mismo
+registro para el sitio estático.
+"""
+
+import gzip
+import hashlib
+import json
+
+from flask import Response, abort, request
+
+PREFIJO = "/geo/"
+
+
+def serializar(geojson):
+    """``(nombre, texto)`` con el nombre derivado del contenido."""
+    texto = json.dumps(geojson, separators=(",", ":"))
+    return f"{hashlib.sha1(texto.encode()).hexdigest()[:12]}.json", texto
+
+
+class Geometrias:
+    def __init__(self, prefijo=PREFIJO):
+        self.prefijo = prefijo
+        self.archivos = {}
+
+    def registrar(self, geojson):
+        """
+        Registra la GeoJSON y devuelve su URL. Serializa y calcula el hash de
+        toda la geometría: se llama una vez al arrancar y se reutiliza la URL.
+        """
+        nombre, texto = serializar(geojson)
+        if nombre not in self.archivos:
+            datos = texto.encode("utf-8")
+            self.archivos[nombre] = (datos, gzip.compress(datos, mtime=0))
+        return self.prefijo + nombre
+
+    def nombre(self, url):
+        """Nombre del archivo si ``url`` es una geometría registrada."""
+        if isinstance(url, str) and url.startswith(self.prefijo):
+            nombre = url[len(self.prefijo):]
+            if nombre in self.archivos:
+                return nombre
+        return None
+
+    def referenciar(self, fig, geojson):
+        """
+        Sustituye la GeoJSON embebida de las trazas choropleth por su URL
+        (``go.Figure`` o dict JSON, como los de ``tablero.fabrica``).
+        ``geojson`` también puede ser la URL que devolvió ``registrar``.
+        """
+        url = geojson if self.nombre(geojson) else self.registrar(geojson)
+        if isinstance(fig, dict):
+            for traza in fig.get("data", []):
+                if traza.get("type") == "choropleth":
+                    traza["geojson"] = url
+            return fig
+        fig.update_traces(geojson=url, selector=dict(type="choropleth"))
+        return fig
+
+    def montar(self, server):
+        @server.route(self.prefijo + "<nombre>")
+        def servir_geometria(nombre):
+            if nombre not in self.archivos:
+                abort(404)
+            etag = nombre.split(".")[0]
+            if request.if_none_match.contains(etag):
+                return Response(status=304)
+            plano, comprimido = self.archivos[nombre]
+            gz = "gzip" in request.headers.get("Accept-Encoding", "")
+            respuesta = Response(comprimido if gz else plano, mimetype="application/json")
+            if gz:
+                respuesta.headers["Content-Encoding"] = "gzip"
+            respuesta.headers["Vary"] = "Accept-Encoding"
+            respuesta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            respuesta.set_etag(etag)
+            return respuesta
@@ -0,0 +1,441 @@
+"""
+Actualización incremental cuando DANE publica una corrección de Anexo1.
+
+Para cada versión se guarda en la caché una ``Instantanea``: un hash
+``uint64`` por fila de Anexo1, en el mismo orden que las filas del almacén
+columnar, y opcionalmente el hash de las columnas llave del registro. Ante
+una publicación nueva:
+
+1. Se emparejan las filas por su hash (multiconjunto: las repetidas se
+   emparejan por orden de aparición). Las filas nuevas sin pareja son
+   insertadas, las anteriores sin pareja son eliminadas. Con llave, una
+   eliminada y una insertada con la misma llave son un registro cambiado;
+   sin llave, una corrección cuenta como una eliminación más una inserción.
+2. Sólo las filas sin pareja pasan por ``pipeline.preparar_registros``;
+   las demás conservan sus códigos del almacén anterior. Las etiquetas
+   nuevas (p. ej. un municipio que no aparecía) amplían las dimensiones; las
+   que se quedan sin registros se conservan con conteo cero.
+3. El cubo y los conteos de ``RANKINGS`` (``Agregados``) reciben los
+   deltas con signo: menos las filas que salen, más las que entran. Los
+   rankings (top de municipios y causas) se recalculan sobre esos conteos.
+4. Se escribe un reporte legible con los departamentos, capítulos, causas y
+   municipios que cambiaron y los campos corregidos.
+
+El almacén, la instantánea y los agregados de la versión nueva quedan en la
+caché con la versión que tendrán los datos cuando el archivo nuevo se copie
+en ``datos/`` (``version_datos(reemplazos=...)``), así que ``app.py`` los
+encuentra al arrancar.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m tablero.incremental datos/Anexo1.NoFetal2019_CE_<fecha>.xlsx
+                                  [--llave COL1,COL2] [--verificar]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from tablero.almacen import Almacen
+from tablero.cubo import DIMENSIONES, Cubo
+from tablero.fabrica import top_k
+from tablero.version import DIR_CACHE, ruta_cache, version_datos
+
+# Columnas llave por defecto (separadas por comas); vacío = sólo hash de fila
+LLAVE = [c for c in os.environ.get("MORTALIDAD_LLAVE", "").split(",") if c]
+
+# Conteos por dimensión que respaldan los rankings del tablero
+RANKINGS = ("municipio", "capitulo", "causa4")
+
+TOP_MUNICIPIOS = 10
+MAX_CAUSAS = 20
+
+
+def huellas(mortalidad, columnas=None):
+    """Hash ``uint64`` de cada fila sobre ``columnas`` (por defecto, todas)."""
+    import pandas as pd
+
+    columnas = list(mortalidad.columns) if columnas is None else list(columnas)
+    return pd.util.hash_pandas_object(mortalidad[columnas], index=False).to_numpy()
+
+
+def emparejar(anterior, nueva):
+    """
+    Para cada fila de ``nueva``, la fila de ``anterior`` con el mismo hash
+    (``-1`` si no queda ninguna). Cada fila anterior se usa una sola vez.
+    """
+    orden_a = np.argsort(anterior, kind="stable")
+    orden_n = np.argsort(nueva, kind="stable")
+    ordenadas_a, ordenadas_n = anterior[orden_a], nueva[orden_n]
+    # Ocurrencia k de cada hash en ``nueva`` -> ocurrencia k en ``anterior``
+    rango = np.arange(len(nueva)) - np.searchsorted(ordenadas_n, ordenadas_n, side="left")
+    inicio = np.searchsorted(ordenadas_a, ordenadas_n, side="left")
+    disponibles = np.searchsorted(ordenadas_a, ordenadas_n, side="right") - inicio
+    hay = rango < disponibles
+    pareja = np.full(len(nueva), -1, dtype=np.int64)
+    pareja[orden_n[hay]] = orden_a[inicio[hay] + rango[hay]]
+    return pareja
+
+
+def _unir_etiquetas(anterior, nueva, orden=None):
+    """Etiquetas de la unión y el mapa de códigos de cada lado (casilla de nulos al final)."""
+    if orden is not None:
+        todas = np.array(list(orden))
+    else:
+        todas = np.array(sorted(set(anterior.tolist()) | set(nueva.tolist())))
+    posicion = {e: i for i, e in enumerate(todas.tolist())}
+
+    def mapa(etiquetas):
+        return np.array([posicion[e] for e in etiquetas.tolist()] + [len(todas)], dtype=np.int32)
+
+    return todas, mapa(anterior), mapa(nueva)
+
+
+class Instantanea:
+    """Hash de cada fila de una publicación de Anexo1, alineado con su almacén."""
+
+    def __init__(self, filas, columnas, llaves=None, columnas_llave=(), version=None):
+        self.filas = filas
+        self.columnas = list(columnas)
+        self.llaves = llaves
+        self.columnas_llave = list(columnas_llave)
+        self.version = version
+
+    @classmethod
+    def desde_mortalidad(cls, mortalidad, columnas_llave=(), version=None):
+        llaves = huellas(mortalidad, columnas_llave) if columnas_llave else None
+        return cls(huellas(mortalidad), mortalidad.columns, llaves, columnas_llave, version)
+
+    @classmethod
+    def obtener(cls, ruta_mortalidad, version, columnas_llave=()):
+        """Instantánea de la caché de ``version`` o leída de ``ruta_mortalidad``."""
+        ruta = ruta_cache("instantanea", version)
+        if os.path.exists(ruta):
+            instantanea = cls.cargar(ruta)
+            if instantanea.columnas_llave == list(columnas_llave):
+                return instantanea
+        import pandas as pd
+
+        instantanea = cls.desde_mortalidad(pd.read_excel(ruta_mortalidad), columnas_llave, version)
+        instantanea.guardar(ruta)
+        return instantanea
+
+    def guardar(self, ruta):
+        np.savez(ruta, filas=self.filas, columnas=np.array(self.columnas, dtype=str),
+                 llaves=self.llaves if self.llaves is not None else np.zeros(0, np.uint64),
+                 columnas_llave=np.array(self.columnas_llave, dtype=str),
+                 version=str(self.version))
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            columnas_llave = z["columnas_llave"].tolist()
+            return cls(z["filas"], z["columnas"].tolist(),
+                       z["llaves"] if columnas_llave else None, columnas_llave,
+                       version=str(z["version"]))
+
+
+class Agregados:
+    """Cubo del tablero y conteos por dimensión de ``RANKINGS`` (con casilla de nulos)."""
+
+    def __init__(self, cubo, conteos, etiquetas):
+        self.cubo = cubo
+        self.conteos = conteos
+        self.etiquetas = etiquetas
+
+    @classmethod
+    def desde_almacen(cls, almacen):
+        return cls(Cubo.desde_almacen(almacen), {d: almacen.contar((d,)) for d in RANKINGS},
+                   {d: almacen.etiquetas[d] for d in RANKINGS})
+
+    @classmethod
+    def obtener(cls, almacen):
+        ruta = ruta_cache("agregados", almacen.version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        agregados = cls.desde_almacen(almacen)
+        agregados.guardar(ruta)
+        return agregados
+
+    def guardar(self, ruta):
+        arreglos = {f"cubo_etq_{d}": e for d, e in self.cubo.etiquetas.items()}
+        arreglos.update({f"cnt_{d}": c for d, c in self.conteos.items()})
+        arreglos.update({f"etq_{d}": e for d, e in self.etiquetas.items()})
+        np.savez(ruta, cubo=self.cubo.conteos, version=str(self.cubo.version), **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            cubo = Cubo(z["cubo"], {d: z[f"cubo_etq_{d}"] for d in DIMENSIONES},
+                        version=str(z["version"]))
+            return cls(cubo, {d: z[f"cnt_{d}"] for d in RANKINGS},
+                       {d: z[f"etq_{d}"] for d in RANKINGS})
+
+    def reubicar(self, etiquetas, mapas, version=None):
+        """Copia ampliada a ``etiquetas`` (``mapas``: código anterior -> código nuevo)."""
+        forma = tuple(len(etiquetas[d]) + 1 for d in DIMENSIONES)
+        conteos = np.zeros(forma, dtype=np.int64)
+        conteos[np.ix_(*(mapas[d] for d in DIMENSIONES))] = self.cubo.conteos
+        cubo = Cubo(conteos, {d: etiquetas[d] for d in DIMENSIONES}, version)
+        vectores = {}
+        for d in RANKINGS:
+            vectores[d] = np.zeros(len(etiquetas[d]) + 1, dtype=np.int64)
+            vectores[d][mapas[d]] = self.conteos[d]
+        return Agregados(cubo, vectores, {d: etiquetas[d] for d in RANKINGS})
+
+    def aplicar(self, filas, signo):
+        """Suma ``signo`` × los conteos de ``filas`` (``Almacen`` con las mismas etiquetas)."""
+        self.cubo.conteos += signo * filas.contar(DIMENSIONES)
+        for d in RANKINGS:
+            self.conteos[d] += signo * filas.contar((d,))
+
+    def top(self, dim, k):
+        conteo = self.conteos[dim][:-1]
+        indices = top_k(conteo, k)
+        return list(zip(self.etiquetas[dim][indices].tolist(), conteo[indices].tolist()))
+
+    def igual(self, otro):
+        return (np.array_equal(self.cubo.conteos, otro.cubo.conteos)
+                and all(np.array_equal(self.conteos[d], otro.conteos[d]) for d in RANKINGS))
+
+    def equivalente(self, otro):
+        """
+        ``igual`` por etiquetas y no por códigos: ambos se reubican sobre la
+        unión de sus etiquetas. Un almacén reconstruido ordena las etiquetas
+        y uno incremental agrega las nuevas al final.
+        """
+        def etiquetas(agregados, d):
+            return agregados.cubo.etiquetas[d] if d in DIMENSIONES else agregados.etiquetas[d]
+
+        dims = list(dict.fromkeys(DIMENSIONES + RANKINGS))
+        union = {d: np.union1d(etiquetas(self, d), etiquetas(otro, d)) for d in dims}
+
+        def reubicado(agregados):
+            mapas = {d: np.append(np.searchsorted(union[d], etiquetas(agregados, d)),
+                                  len(union[d])) for d in dims}
+            return agregados.reubicar(union, mapas)
+
+        return reubicado(self).igual(reubicado(otro))
+
+
+class Cambios:
+    """Resultado de ``actualizar``: filas afectadas y estado antes y después."""
+
+    def __init__(self, insertadas, eliminadas, cambiadas, almacen_anterior, almacen,
+                 instantanea, antes, despues, segundos):
+        self.insertadas = insertadas
+        self.eliminadas = eliminadas
+        self.cambiadas = cambiadas
+        self.almacen_anterior = almacen_anterior
+        self.almacen = almacen
+        self.instantanea = instantanea
+        self.antes = antes
+        self.despues = despues
+        self.segundos = segundos
+
+
+def actualizar(almacen, instantanea, agregados, mortalidad, dimensiones, ordenes=None,
+               version=None):
+    """
+    Aplica la publicación ``mortalidad`` sobre el estado de ``almacen`` (con
+    su ``instantanea`` y sus ``agregados``) sin reconstruirlo.
+    """
+    from tablero import pipeline
+
+    inicio = time.perf_counter()
+    ordenes = ordenes or {}
+    nueva = Instantanea.desde_mortalidad(mortalidad, instantanea.columnas_llave, version)
+    if nueva.columnas != instantanea.columnas:
+        raise ValueError("las columnas de Anexo1 cambiaron: reconstruya con la publicación nueva")
+    if len(instantanea.filas) != almacen.n:
+        raise ValueError("la instantánea no corresponde al almacén de la versión anterior")
+
+    pareja = emparejar(instantanea.filas, nueva.filas)
+    entran = np.flatnonzero(pareja < 0)
+    usadas = np.zeros(almacen.n, dtype=bool)
+    usadas[pareja[pareja >= 0]] = True
+    salen = np.flatnonzero(~usadas)
+    if nueva.llaves is not None:
+        _, i_sale, i_entra = np.intersect1d(instantanea.llaves[salen], nueva.llaves[entran],
+                                            assume_unique=False, return_indices=True)
+        cambiadas = (salen[i_sale], entran[i_entra])
+        eliminadas, insertadas = np.delete(salen, i_sale), np.delete(entran, i_entra)
+    else:
+        cambiadas = (np.zeros(0, np.int64), np.zeros(0, np.int64))
+        eliminadas, insertadas = salen, entran
+    diferencia = time.perf_counter() - inicio
+
+    # Sólo las filas que entran pasan por el pipeline
+    base = pipeline.preparar_registros(mortalidad.iloc[entran], dimensiones)
+    if len(base) != len(entran):
+        raise ValueError("Divipola o Anexo2 tienen llaves repetidas: reconstruya el almacén")
+    parcial = Almacen.desde_base(base, ordenes=ordenes)
+
+    etiquetas, mapa_anterior, mapa_parcial = {}, {}, {}
+    for d in almacen.etiquetas:
+        etiquetas[d], mapa_anterior[d], mapa_parcial[d] = _unir_etiquetas(
+            almacen.etiquetas[d], parcial.etiquetas[d], ordenes.get(d))
+    quedan = np.flatnonzero(pareja >= 0)
+    columnas = {}
+    for d in etiquetas:
+        columna = np.empty(len(pareja), dtype=np.int32)
+        columna[quedan] = mapa_anterior[d][almacen.columnas[d][pareja[quedan]]]
+        columna[entran] = mapa_parcial[d][parcial.columnas[d]]
+        columnas[d] = columna
+    nuevo = Almacen(columnas, etiquetas, version)
+    anterior = Almacen({d: mapa_anterior[d][c] for d, c in almacen.columnas.items()}, etiquetas,
+                       almacen.version)
+
+    antes = agregados.reubicar(etiquetas, mapa_anterior, agregados.cubo.version)
+    despues = agregados.reubicar(etiquetas, mapa_anterior, version)
+    despues.aplicar(Almacen({d: c[salen] for d, c in anterior.columnas.items()}, etiquetas), -1)
+    despues.aplicar(Almacen({d: c[entran] for d, c in nuevo.columnas.items()}, etiquetas), 1)
+    segundos = {"diferencia_s": round(diferencia, 3),
+                "total_s": round(time.perf_counter() - inicio, 3)}
+    return Cambios(insertadas, eliminadas, cambiadas, anterior, nuevo, nueva, antes, despues,
+                   segundos)
+
+
+def _numero(n):
+    return f"{n:,}".replace(",", ".")
+
+
+def _delta(n):
+    return f"+{_numero(n)}" if n > 0 else _numero(n)
+
+
+def _tabla(titulo, encabezado, etiquetas, antes, despues, limite=None):
+    delta = despues - antes
+    filas = np.flatnonzero(delta)
+    filas = filas[np.argsort(-np.abs(delta[filas]), kind="stable")][:limite]
+    lineas = [f"## {titulo}", ""]
+    if not len(filas):
+        return lineas + ["Sin cambios.", ""]
+    lineas += [f"| {encabezado} | Antes | Después | Cambio |", "|---|---:|---:|---:|"]
+    lineas += [f"| {etiquetas[i]} | {_numero(int(antes[i]))} | {_numero(int(despues[i]))} | "
+               f"{_delta(int(delta[i]))} |" for i in filas]
+    return lineas + [""]
+
+
+def reporte(cambios, nombres_dpto=None, descripciones=None):
+    """Reporte en Markdown de los cambios entre las dos publicaciones."""
+    nombres_dpto, descripciones = nombres_dpto or {}, descripciones or {}
+    antes, despues = cambios.antes, cambios.despues
+    n_antes, n_despues = cambios.almacen_anterior.n, cambios.almacen.n
+    llave = ", ".join(cambios.instantanea.columnas_llave)
+    lineas = [
+        f"# Cambios en Anexo1: {antes.cubo.version} -> {despues.cubo.version}", "",
+        f"Registros: {_numero(n_antes)} -> {_numero(n_despues)} ({_delta(n_despues - n_antes)})",
+        "",
+        f"- Insertados: {_numero(len(cambios.insertadas))}",
+        f"- Eliminados: {_numero(len(cambios.eliminadas))}",
+        f"- Cambiados: {_numero(len(cambios.cambiadas[0]))}"
+        + (f" (llave: {llave})" if llave else
+           " (sin llave: cada corrección cuenta como un eliminado y un insertado)"),
+        f"- Tiempo: {cambios.segundos['total_s']} s "
+        f"(emparejamiento {cambios.segundos['diferencia_s']} s)", "",
+    ]
+
+    dptos = antes.cubo.etiquetas["departamento"].tolist()
+    etiquetas = [f"{nombres_dpto.get(c, c)} ({c})" for c in dptos] + ["(sin departamento)"]
+    eje = tuple(range(1, antes.cubo.conteos.ndim))
+    lineas += _tabla("Departamentos", "Departamento", etiquetas,
+                     antes.cubo.conteos.sum(axis=eje), despues.cubo.conteos.sum(axis=eje))
+    lineas += _tabla("Capítulos CIE-10", "Capítulo",
+                     antes.etiquetas["capitulo"].tolist() + ["(sin capítulo)"],
+                     antes.conteos["capitulo"], despues.conteos["capitulo"])
+    causas = [f"{c} {descripciones.get(c, '')}".strip()
+              for c in antes.etiquetas["causa4"].tolist()] + ["(sin causa)"]
+    lineas += _tabla(f"Causas CIE-10 con mayor cambio (hasta {MAX_CAUSAS})", "Causa", causas,
+                     antes.conteos["causa4"], despues.conteos["causa4"], MAX_CAUSAS)
+
+    top_antes = antes.top("municipio", TOP_MUNICIPIOS)
+    top_despues = despues.top("municipio", TOP_MUNICIPIOS)
+    lineas += [f"## Top {TOP_MUNICIPIOS} municipios", ""]
+    if top_antes == top_despues:
+        lineas += ["Sin cambios.", ""]
+    else:
+        lineas += ["| # | Antes | Después |", "|---:|---|---|"]
+        for i in range(max(len(top_antes), len(top_despues))):
+            celdas = [f"{m} ({_numero(t)})" if m is not None else "-" for m, t in
+                      (top[i] if i < len(top) else (None, 0) for top in (top_antes, top_despues))]
+            lineas.append(f"| {i + 1} | {celdas[0]} | {celdas[1]} |")
+        lineas.append("")
+
+    if len(cambios.cambiadas[0]):
+        viejas, nuevas = cambios.cambiadas
+        lineas += ["## Campos corregidos en los registros cambiados", "",
+                   "| Campo | Registros |", "|---|---:|"]
+        for d in cambios.almacen.etiquetas:
+            n = int(np.sum(cambios.almacen_anterior.columnas[d][viejas]
+                           != cambios.almacen.columnas[d][nuevas]))
+            if n:
+                lineas.append(f"| {d} | {_numero(n)} |")
+        lineas.append("")
+    return "\n".join(lineas)
+
+
+def main():
+    import pandas as pd
+
+    from tablero import pipeline
+    from tablero.causas import COLUMNAS_ANEXO2
+
+    parser = argparse.ArgumentParser(description="Aplica una publicación nueva de Anexo1.")
+    parser.add_argument("ruta", help="Excel de la publicación nueva de Anexo1")
+    parser.add_argument("--llave", default=",".join(LLAVE),
+                        help="columnas que identifican un registro, separadas por comas")
+    parser.add_argument("--salida", default=DIR_CACHE, help="carpeta del reporte")
+    parser.add_argument("--verificar", action="store_true",
+                        help="relee la publicación, reconstruye el almacén desde cero y "
+                             "compara sus agregados con los incrementales")
+    args = parser.parse_args()
+    llave = [c.strip() for c in args.llave.split(",") if c.strip()]
+    ordenes = {"edad": pipeline.VALORES_EDAD}
+
+    inicio = time.perf_counter()
+    version_anterior = version_datos()
+    ruta_almacen = ruta_cache("almacen", version_anterior)
+    if os.path.exists(ruta_almacen):
+        almacen = Almacen.cargar(ruta_almacen)
+    else:
+        almacen = Almacen.obtener(pipeline.cargar_datos()["base"], version_anterior, ordenes)
+    instantanea = Instantanea.obtener(pipeline.RUTA_MORTALIDAD, version_anterior, llave)
+    agregados = Agregados.obtener(almacen)
+    dimensiones = pipeline.cargar_dimensiones()
+    mortalidad = pd.read_excel(args.ruta)
+    lectura = time.perf_counter() - inicio
+
+    version = version_datos(reemplazos={pipeline.RUTA_MORTALIDAD: args.ruta})
+    cambios = actualizar(almacen, instantanea, agregados, mortalidad, dimensiones, ordenes,
+                         version)
+    cambios.almacen.guardar(ruta_cache("almacen", version))
+    cambios.instantanea.guardar(ruta_cache("instantanea", version))
+    cambios.despues.guardar(ruta_cache("agregados", version))
+
+    dep_col = dimensiones["dep_col"]
+    catalogo = dimensiones["codigos"]
+    texto = reporte(cambios, dict(zip(dep_col["DPTO_CCDGO"], dep_col["DPTO_CNMBR"])),
+                    dict(zip(catalogo[COLUMNAS_ANEXO2["codigo4"]],
+                             catalogo[COLUMNAS_ANEXO2["descripcion4"]])))
+    os.makedirs(args.salida, exist_ok=True)
+    ruta_reporte = os.path.join(args.salida, f"cambios-{version_anterior}-{version}.md")
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        f.write(texto)
+    print(texto)
+    print(f"Lectura {lectura:.1f} s, actualización {cambios.segundos['total_s']:.2f} s; "
+          f"reporte en {ruta_reporte}")
+
+    if args.verificar:
+        base = pipeline.cargar_datos(args.ruta, dimensiones=dimensiones)["base"]
+        completo = Agregados.desde_almacen(Almacen.desde_base(base, ordenes=ordenes))
+        if not completo.equivalente(cambios.despues):
+            raise SystemExit("Los agregados incrementales difieren de la reconstrucción")
+        print("Verificado: los agregados coinciden con la reconstrucción completa")
+    print(f"Copie {args.ruta} en {pipeline.RUTA_MORTALIDAD} para servir la versión {version}")
+
+
+if __name__ == "__main__":
+    main()
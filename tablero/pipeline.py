@@ -0,0 +1,202 @@
+"""
+Pipeline completo con pandas/geopandas/plotly.express.
+
+Es el código original de las secciones 1️⃣ y 2️⃣ de ``app.py``: lee los
+Excel y el shapefile, arma ``base`` y construye las figuras. ``app.py`` y
+``tablero.artefactos`` usan ``cargar_datos`` y ``causas_principales``; las
+figuras las arma ``tablero.fabrica`` desde el almacén columnar y
+``construir_figuras`` queda como implementación de referencia.
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+RUTA_MORTALIDAD = "datos/Anexo1.NoFetal2019_CE_15-03-23.xlsx"
+RUTA_CODIGOS = "datos/Anexo2.CodigosDeMuerte_CE_15-03-23.xlsx"
+RUTA_MUNICIPIOS = "datos/Divipola_CE_.xlsx"
+RUTA_DEPARTAMENTOS = "datos/shapes/departamento/MGN_DPTO_POLITICO.shp"
+
+# Grupos etarios (según DANE), en el orden en que se muestran
+VALORES_EDAD = [
+    "Menor de 1 mes", "1 a 11 meses", "1 a 4 años", "5 a 14 años", "15 a 19 años",
+    "20 a 29 años", "30 a 44 años", "45 a 59 años", "60 a 84 años", "85 a 100+ años",
+    "Sin información"
+]
+
+
+def cargar_dimensiones():
+    """
+    Tablas compartidas por cualquier archivo de defunciones: catálogo de
+    Anexo2 (``codigos``), Divipola (``municipios``, códigos ya ajustados),
+    shapefile de departamentos (``dep_col``) y su GeoJSON (``geojson_dep``).
+    """
+    codigos = pd.read_excel(RUTA_CODIGOS)
+    municipios = pd.read_excel(RUTA_MUNICIPIOS)
+    municipios["COD_DEPARTAMENTO"] = municipios["COD_DEPARTAMENTO"].astype(str).str.zfill(2)
+    municipios["COD_MUNICIPIO"] = municipios["COD_MUNICIPIO"].astype(str).str.zfill(3)
+
+    # Lectura del shapefile de departamentos
+    dep_col = gpd.read_file(RUTA_DEPARTAMENTOS)
+    dep_col["DPTO_CCDGO"] = dep_col["DPTO_CCDGO"].astype(str).str.zfill(2)
+
+    # Conversión a geojson
+    dep_col_4326 = dep_col.to_crs(epsg=4326)
+    geojson_dep = dep_col_4326.__geo_interface__
+
+    return {"codigos": codigos, "municipios": municipios, "dep_col": dep_col,
+            "geojson_dep": geojson_dep}
+
+
+def preparar_registros(mortalidad, dimensiones):
+    """
+    Registros de Anexo1 (o de otro archivo de defunciones con las mismas
+    columnas) unidos con Divipola y Anexo2, con sexo y grupo etario
+    (``base`` antes de agregar el nombre del departamento).
+    """
+    mortalidad = mortalidad.copy()
+    codigos, municipios = dimensiones["codigos"], dimensiones["municipios"]
+
+    # Ajuste de códigos
+    mortalidad["COD_DEPARTAMENTO"] = mortalidad["COD_DEPARTAMENTO"].astype(str).str.zfill(2)
+    mortalidad["COD_MUNICIPIO"] = mortalidad["COD_MUNICIPIO"].astype(str).str.zfill(3)
+
+    # Unión de bases
+    base = mortalidad.merge(municipios, on=["COD_DEPARTAMENTO", "COD_MUNICIPIO"], how="left")
+    base = pd.merge(base, codigos,
+                    left_on="COD_MUERTE",
+                    right_on="Código de la CIE-10 cuatro caracteres",
+                    how="left")
+
+    # Asignación de sexo
+    base["SEXO"] = base["SEXO"].map({
+        1: "Masculino",
+        2: "Femenino",
+        3: "Indeterminado"
+    })
+
+    # Clasificación por grupo etario (según DANE); los archivos sin edad del
+    # fallecido (defunciones fetales) quedan en "Sin información"
+    if "GRUPO_EDAD1" not in base.columns:
+        base["RANGO_EDAD"] = "Sin información"
+        return base
+    condiciones = [
+        base["GRUPO_EDAD1"].between(0, 4),
+        base["GRUPO_EDAD1"].between(5, 6),
+        base["GRUPO_EDAD1"].between(7, 8),
+        base["GRUPO_EDAD1"].between(9, 10),
+        base["GRUPO_EDAD1"] == 11,
+        base["GRUPO_EDAD1"].between(12, 13),
+        base["GRUPO_EDAD1"].between(14, 16),
+        base["GRUPO_EDAD1"].between(17, 19),
+        base["GRUPO_EDAD1"].between(20, 24),
+        base["GRUPO_EDAD1"].between(25, 28),
+        base["GRUPO_EDAD1"] == 29
+    ]
+    base["RANGO_EDAD"] = np.select(condiciones, VALORES_EDAD, default="Sin información")
+    return base
+
+
+def cargar_datos(ruta_mortalidad=RUTA_MORTALIDAD, mortalidad=None, dimensiones=None):
+    """
+    Lectura y preparación de datos. Devuelve un diccionario con ``base``,
+    ``dep_muertes``, ``resultado_mapa``, ``geojson_dep`` y ``codigos``
+    (catálogo de Anexo2). ``mortalidad`` (DataFrame con las columnas de
+    Anexo1) reemplaza la lectura de ``ruta_mortalidad``; ``dimensiones``
+    (``cargar_dimensiones``) evita volver a leer las tablas compartidas.
+    """
+    if mortalidad is None:
+        mortalidad = pd.read_excel(ruta_mortalidad)
+    dimensiones = dimensiones or cargar_dimensiones()
+    base = preparar_registros(mortalidad, dimensiones)
+
+    # Totales por departamento
+    dep_totales = base.groupby("COD_DEPARTAMENTO").size().reset_index(name="Total_muer_dep")
+    total_muertes = len(base)
+    dep_muertes = dep_totales.assign(
+        Total_muertes=total_muertes,
+        Proporcion_muertes=lambda x: np.round(x["Total_muer_dep"] / x["Total_muertes"], 3) * 100
+    )
+
+    # Unión de información geográfica
+    resultado_mapa = pd.merge(dimensiones["dep_col"], dep_muertes,
+                              left_on="DPTO_CCDGO",
+                              right_on="COD_DEPARTAMENTO",
+                              how="left")
+
+    base = pd.merge(base,
+                    resultado_mapa[["DPTO_CCDGO", "DPTO_CNMBR"]],
+                    left_on="COD_DEPARTAMENTO",
+                    right_on="DPTO_CCDGO",
+                    how="left")
+
+    return {"base": base, "dep_muertes": dep_muertes,
+            "resultado_mapa": resultado_mapa, "geojson_dep": dimensiones["geojson_dep"],
+            "codigos": dimensiones["codigos"]}
+
+
+def causas_principales(base):
+    """Tabla ``causas10``: las diez causas (primera columna de nombre/descripción) más frecuentes."""
+    causa_col = [c for c in base.columns if "nombre" in c.lower() or "descr" in c.lower()]
+    if causa_col:
+        return base.groupby(causa_col[0]).size().reset_index(name="Total").sort_values("Total", ascending=False).head(10)
+    return pd.DataFrame({"Causa": [], "Total": []})
+
+
+def construir_figuras(base, resultado_mapa, geojson_dep):
+    """
+    Visualizaciones. Devuelve las figuras y las tablas intermedias
+    (``muertes_mes``, ``top5``, ``top10``, ``causas10``, ``stack_df``).
+    """
+    # --- Mapa coroplético ---
+    mapa_fig = px.choropleth(
+        resultado_mapa,
+        geojson=geojson_dep,
+        locations="DPTO_CCDGO",
+        color="Total_muer_dep",
+        featureidkey="properties.DPTO_CCDGO",
+        projection="mercator",
+        hover_name="DPTO_CNMBR",
+        color_continuous_scale="Reds",
+        title="Mapa de Mortalidad por Departamento – 2019"
+    )
+    mapa_fig.update_geos(fitbounds="locations", visible=False)
+    mapa_fig.update_layout(margin=dict(l=0, r=0, t=30, b=0))
+
+    # --- Línea mensual ---
+    muertes_mes = None
+    if "MES" in base.columns:
+        muertes_mes = base.groupby("MES").size().reset_index(name="Total")
+        linea_fig = px.line(muertes_mes, x="MES", y="Total", markers=True, title="Muertes por mes")
+    else:
+        linea_fig = go.Figure()
+        linea_fig.add_annotation(text="Columna MES no encontrada", showarrow=False)
+
+    # --- Top 5 municipios ---
+    top5 = base.groupby("MUNICIPIO").size().reset_index(name="Total").sort_values("Total", ascending=False).head(5)
+    barras_top5 = px.bar(top5, x="MUNICIPIO", y="Total", color="Total",
+                         title="Top 5 Municipios con Mayor Mortalidad")
+
+    # --- Top 10 municipios (pie) ---
+    top10 = base.groupby("MUNICIPIO").size().reset_index(name="Total").sort_values("Total", ascending=False).head(10)
+    pie_top10 = px.pie(top10, values="Total", names="MUNICIPIO", title="Top 10 Municipios (participación)")
+
+    # --- Principales causas ---
+    causas10 = causas_principales(base)
+
+    # --- Barras apiladas por sexo ---
+    stack_df = base.groupby(["DPTO_CNMBR", "SEXO"]).size().reset_index(name="Total")
+    stack_fig = px.bar(stack_df, x="DPTO_CNMBR", y="Total", color="SEXO",
+                       title="Muertes por Sexo y Departamento", barmode="stack")
+
+    # --- Histograma de edad ---
+    hist_fig = px.histogram(base, x="RANGO_EDAD", title="Distribución de Muertes por Grupo Etario")
+
+    return {
+        "mapa_fig": mapa_fig, "linea_fig": linea_fig, "barras_top5": barras_top5,
+        "pie_top10": pie_top10, "stack_fig": stack_fig, "hist_fig": hist_fig,
+        "muertes_mes": muertes_mes, "top5": top5, "top10": top10,
+        "causas10": causas10, "stack_df": stack_df,
+    }
@@ -0,0 +1,249 @@
+"""
+Reportes por departamento en lote.
+
+Para cada departamento de ``MGN_DPTO_POLITICO`` genera un HTML con las
+figuras del dashboard filtradas a ese departamento: muertes por mes, top de
+municipios, principales causas (capítulos CIE-10), barras por sexo y
+municipio y distribución por grupo etario. Con ``--png`` (requiere
+``kaleido``) guarda además cada figura como imagen.
+
+Las figuras salen de los esqueletos de ``tablero.fabrica`` (los mismos del
+dashboard, con los sexos en el orden y los colores de ``stack_fig``) y los
+tops usan ``top_k``, así que los empates se ordenan como en el tablero.
+
+Las tareas corren en un ``ProcessPoolExecutor``. El almacén columnar se
+carga una sola vez en el proceso principal desde la caché de la versión
+actual (``.cache/almacen-<version>.npz``); los workers lo heredan al hacer
+``fork`` y sólo lo leen del ``.npz`` si el sistema arranca procesos nuevos.
+Ningún worker vuelve a leer los Excel.
+
+Uso (desde la raíz del repositorio)::
+
+    python -m tablero.reportes [--salida reportes] [--workers 4] [--png]
+                               [--departamentos 05,11]
+"""
+
+import argparse
+import html as html_std
+import json
+import os
+import shutil
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tablero.almacen import Almacen
+from tablero.fabrica import FabricaFiguras, top_k, trazas_dashboard
+from tablero.version import ruta_cache, version_datos
+
+TOP_MUNICIPIOS = 10
+TOP_CAUSAS = 10
+
+PLANTILLA = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{titulo}</title>
+<script src="plotly.min.js"></script>
+</head>
+<body>
+<h1>{titulo}</h1>
+<p>Mortalidad no fetal 2019 – {total} defunciones.</p>
+{figuras}
+</body>
+</html>
+"""
+
+_ALMACEN = None
+_FABRICA = None
+
+
+def _fabrica(almacen, departamentos):
+    """Esqueletos del dashboard, con los sexos de ``stack_fig`` en su orden."""
+    trazas = trazas_dashboard(almacen, list(departamentos), departamentos)
+    return FabricaFiguras.plantillas(None, [t["name"] for t in trazas["stack_fig"]])
+
+
+def _iniciar(ruta, departamentos):
+    global _ALMACEN, _FABRICA
+    if _ALMACEN is None:
+        _ALMACEN = Almacen.cargar(ruta)
+    if _FABRICA is None:
+        _FABRICA = _fabrica(_ALMACEN, departamentos)
+
+
+def figuras_departamento(almacen, fabrica, codigo, nombre):
+    """Figuras del reporte de un departamento (dicts de Plotly)."""
+    mascara = almacen.mascara({"departamento": [codigo]})
+    etiquetas = almacen.etiquetas
+    figuras = {}
+
+    mes = almacen.contar(("mes",), mascara)[:-1]
+    con_datos = mes > 0
+    figuras["linea"] = fabrica.construir(
+        "linea_fig", [{"x": etiquetas["mes"][con_datos], "y": mes[con_datos]}],
+        title=f"Muertes por mes – {nombre}")
+
+    municipios = almacen.contar(("municipio",), mascara)[:-1]
+    top = top_k(municipios, TOP_MUNICIPIOS)
+    figuras["municipios"] = fabrica.construir(
+        "barras_top5", [{"x": etiquetas["municipio"][top].tolist(), "y": municipios[top],
+                         "marker_color": municipios[top]}],
+        title=f"Top {TOP_MUNICIPIOS} municipios con mayor mortalidad – {nombre}")
+
+    # Barras horizontales sobre el esqueleto de barras_top5 (misma escala de color)
+    capitulos = almacen.contar(("capitulo",), mascara)[:-1]
+    top_causas = top_k(capitulos, TOP_CAUSAS)[::-1]
+    figuras["causas"] = fabrica.construir(
+        "barras_top5", [{"x": capitulos[top_causas], "y": etiquetas["capitulo"][top_causas].tolist(),
+                         "marker_color": capitulos[top_causas], "orientation": "h",
+                         "hovertemplate": "Capítulo=%{y}<br>Total=%{x}<extra></extra>"}],
+        title=f"Principales causas (capítulo CIE-10) – {nombre}",
+        xaxis={"title": {"text": "Total"}}, yaxis={"title": {"text": ""}},
+        margin={"l": 320})
+
+    # Una traza por traza del esqueleto, aunque el sexo no tenga registros aquí
+    por_sexo = almacen.contar(("municipio", "sexo"), mascara)[top]
+    columna = {s: j for j, s in enumerate(etiquetas["sexo"].tolist())}
+    figuras["sexo"] = fabrica.construir(
+        "stack_fig", [{"x": etiquetas["municipio"][top].tolist(), "y": por_sexo[:, columna[t["name"]]],
+                       "hovertemplate": f"SEXO={t['name']}<br>MUNICIPIO=%{{x}}<br>"
+                                        "Total=%{y}<extra></extra>"}
+                      for t in fabrica.esqueletos["stack_fig"]["data"]],
+        title=f"Muertes por sexo y municipio – {nombre}",
+        xaxis=dict(fabrica.esqueletos["stack_fig"]["layout"]["xaxis"],
+                   title={"text": "MUNICIPIO"}))
+
+    edad = almacen.contar(("edad",), mascara)[:-1]
+    con_datos = edad > 0
+    figuras["edad"] = fabrica.construir(
+        "hist_fig", [{"x": etiquetas["edad"][con_datos].tolist(), "y": edad[con_datos],
+                      "histfunc": "sum"}],
+        title=f"Distribución de muertes por grupo etario – {nombre}")
+    return figuras, int(mascara.sum())
+
+
+def reporte(codigo, nombre, salida, png=False):
+    """Escribe el reporte de un departamento; devuelve ``(codigo, segundos, archivo)``."""
+    import plotly.io as pio
+
+    inicio = time.perf_counter()
+    figuras, total = figuras_departamento(_ALMACEN, _FABRICA, codigo, nombre)
+    bloques = [pio.to_html(fig, full_html=False, include_plotlyjs=False) for fig in figuras.values()]
+    archivo = f"{codigo}.html"
+    with open(os.path.join(salida, archivo), "w", encoding="utf-8") as f:
+        f.write(PLANTILLA.format(titulo=html_std.escape(f"{nombre} ({codigo})"),
+                                 total=f"{total:,}".replace(",", "."),
+                                 figuras="\n".join(bloques)))
+    if png:
+        carpeta = os.path.join(salida, "png", codigo)
+        os.makedirs(carpeta, exist_ok=True)
+        for clave, fig in figuras.items():
+            pio.write_image(fig, os.path.join(carpeta, f"{clave}.png"), width=1000, height=600)
+    return codigo, time.perf_counter() - inicio, archivo
+
+
+def _departamentos():
+    """``{codigo: nombre}`` de los atributos del shapefile MGN (sin geometría)."""
+    import geopandas as gpd
+
+    from tablero.pipeline import RUTA_DEPARTAMENTOS
+
+    tabla = gpd.read_file(RUTA_DEPARTAMENTOS, ignore_geometry=True)
+    return dict(sorted(zip(tabla["DPTO_CCDGO"].astype(str).str.zfill(2), tabla["DPTO_CNMBR"])))
+
+
+def _almacen():
+    """Ruta del almacén de la versión actual; lo construye si no está en caché."""
+    version = version_datos()
+    ruta = ruta_cache("almacen", version)
+    if not os.path.exists(ruta):
+        from tablero import pipeline
+
+        base = pipeline.cargar_datos()["base"]
+        Almacen.obtener(base, version, ordenes={"edad": pipeline.VALORES_EDAD})
+    return ruta
+
+
+def generar(salida="reportes", workers=None, png=False, codigos=None):
+    global _ALMACEN, _FABRICA
+    import plotly
+
+    if png:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            print("kaleido no está instalado: se generan sólo los HTML")
+            png = False
+
+    inicio = time.perf_counter()
+    todos = _departamentos()
+    departamentos = {c: n for c, n in todos.items() if not codigos or c in codigos}
+    ruta = _almacen()
+    _ALMACEN = Almacen.cargar(ruta)
+    _FABRICA = _fabrica(_ALMACEN, todos)
+    carga = time.perf_counter() - inicio
+
+    os.makedirs(salida, exist_ok=True)
+    plotly_js = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+    shutil.copyfile(plotly_js, os.path.join(salida, "plotly.min.js"))
+
+    workers = workers or os.cpu_count() or 1
+    tiempos, archivos = {}, {}
+    inicio_lote = time.perf_counter()
+    if workers == 1:
+        resultados = (reporte(c, n, salida, png) for c, n in departamentos.items())
+        for codigo, segundos, archivo in resultados:
+            tiempos[codigo], archivos[codigo] = segundos, archivo
+            print(f"{codigo} {departamentos[codigo]:45s} {segundos:6.2f} s")
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar,
+                                 initargs=(ruta, todos)) as pool:
+            futuros = [pool.submit(reporte, c, n, salida, png) for c, n in departamentos.items()]
+            for futuro in as_completed(futuros):
+                codigo, segundos, archivo = futuro.result()
+                tiempos[codigo], archivos[codigo] = segundos, archivo
+                print(f"{codigo} {departamentos[codigo]:45s} {segundos:6.2f} s")
+    lote = time.perf_counter() - inicio_lote
+
+    enlaces = "\n".join(f'<li><a href="{archivos[c]}">{html_std.escape(n)}</a></li>'
+                        for c, n in departamentos.items() if c in archivos)
+    with open(os.path.join(salida, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html>\n<html lang="es">\n<head><meta charset="utf-8">'
+                f"<title>Reportes por departamento</title></head>\n"
+                f"<body>\n<h1>Reportes por departamento</h1>\n<ul>\n{enlaces}\n</ul>\n"
+                f"</body>\n</html>\n")
+
+    resumen = {
+        "workers": workers,
+        "departamentos": len(tiempos),
+        "carga_s": round(carga, 3),
+        "lote_s": round(lote, 3),
+        "por_departamento_s": {c: round(t, 3) for c, t in sorted(tiempos.items())},
+    }
+    if tiempos:
+        valores = list(tiempos.values())
+        resumen.update(mediana_s=round(statistics.median(valores), 3),
+                       maximo_s=round(max(valores), 3), suma_s=round(sum(valores), 3))
+    with open(os.path.join(salida, "tiempos.json"), "w", encoding="utf-8") as f:
+        json.dump(resumen, f, indent=2)
+    print(f"{len(tiempos)} reportes en {lote:.1f} s con {workers} workers "
+          f"(carga del almacén {carga:.1f} s, suma por reporte {sum(tiempos.values()):.1f} s)")
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reportes por departamento en lote.")
+    parser.add_argument("--salida", default="reportes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--png", action="store_true", help="exportar también PNG (kaleido)")
+    parser.add_argument("--departamentos", default="",
+                        help="códigos separados por comas (por defecto, todos)")
+    args = parser.parse_args()
+    codigos = [c.strip().zfill(2) for c in args.departamentos.split(",") if c.strip()]
+    generar(args.salida, args.workers, args.png, codigos)
+
+
+if __name__ == "__main__":
+    main()
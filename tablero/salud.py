@@ -0,0 +1,175 @@
+"""
+Calentamiento al arrancar y sondas de salud.
+
+- ``/healthz``: el proceso responde (liveness); siempre 200.
+- ``/readyz``: 503 hasta que los datos están cargados y el calentamiento
+  terminó sin errores; 200 después. Si el calentamiento falla sigue en 503
+  y ``errores`` dice por qué. El cuerpo trae la duración de la carga de
+  datos, del calentamiento y de cada ruta, para que el orquestador decida
+  cuándo mandar tráfico.
+
+Al arrancar:
+
+1. ``iniciar`` pasa las figuras de las páginas a diccionarios JSON planos
+   (``preserializar``) antes de que el worker atienda peticiones, así cada
+   respuesta de ``display_page`` ya no valida ni convierte objetos
+   ``go.Figure`` y ningún hilo modifica un layout mientras se sirve.
+2. En un hilo, mientras el worker ya escucha, el cliente de pruebas de
+   Flask hace las mismas peticiones que el navegador: ``/``,
+   ``/_dash-layout``, ``/_dash-dependencies``, el ``display_page`` de cada
+   ruta y los callbacks iniciales de esa página con los valores por defecto
+   del layout. Eso inicializa Dash y llena las cachés memoizadas del worker.
+
+Con ``MORTALIDAD_CALENTAR=0`` no se inicia (herramientas que sólo importan
+``app``, como ``tablero.exportar``). Con ``gunicorn --preload`` el hilo corre
+en el proceso maestro y los workers heredan el resultado al hacer ``fork``.
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import jsonify
+
+ACTIVO = os.environ.get("MORTALIDAD_CALENTAR", "1") != "0"
+
+_ACTUALIZAR = "/_dash-update-component"
+
+
+def preserializar(componente):
+    """Reemplaza in situ las ``go.Figure`` de los ``dcc.Graph`` por dicts JSON."""
+    import plotly.io as pio
+
+    figura = getattr(componente, "figure", None)
+    if figura is not None and hasattr(figura, "to_plotly_json"):
+        componente.figure = json.loads(pio.to_json(figura, validate=False))
+    hijos = getattr(componente, "children", None)
+    for hijo in hijos if isinstance(hijos, (list, tuple)) else [hijos]:
+        if hasattr(hijo, "to_plotly_json"):
+            preserializar(hijo)
+    return componente
+
+
+def props_por_id(nodo, destino=None):
+    """``{id: props}`` de todos los componentes con id de un árbol JSON de Dash."""
+    destino = {} if destino is None else destino
+    if isinstance(nodo, list):
+        for hijo in nodo:
+            props_por_id(hijo, destino)
+    elif isinstance(nodo, dict):
+        props = nodo.get("props", {})
+        if isinstance(props.get("id"), str):
+            destino[props["id"]] = props
+        props_por_id(props.get("children"), destino)
+    return destino
+
+
+def salidas_de(output):
+    """Salidas (``{id, property}`` o lista) del ``output`` de una dependencia de Dash."""
+    multiple = output.startswith("..")
+    partes = output[2:-2].split("...") if multiple else [output]
+    lista = [dict(zip(("id", "property"), p.rsplit(".", 1))) for p in partes]
+    return lista if multiple else lista[0]
+
+
+def _cuerpo(dep, valores, cambios=None):
+    def con_valor(p):
+        return dict(p, value=valores.get(p["id"], {}).get(p["property"]))
+
+    return {
+        "output": dep["output"],
+        "outputs": salidas_de(dep["output"]),
+        "inputs": [con_valor(p) for p in dep["inputs"]],
+        "state": [con_valor(p) for p in dep["state"]],
+        "changedPropIds": cambios or [f"{p['id']}.{p['property']}" for p in dep["inputs"]],
+    }
+
+
+class Calentamiento:
+    def __init__(self, app, rutas, paginas=(), inicio=None):
+        """
+        ``rutas``: pathnames de ``display_page``; ``paginas``: layouts cuyas
+        figuras se preserializan; ``inicio``: ``perf_counter`` del arranque.
+        """
+        self.app = app
+        self.rutas = list(rutas)
+        self.paginas = list(paginas)
+        self.inicio = time.perf_counter() if inicio is None else inicio
+        self.listo = threading.Event()
+        self.estado = {"datos_s": None, "calentamiento_s": None, "rutas": {}, "errores": []}
+
+    def montar(self, server):
+        @server.route("/healthz")
+        def healthz():
+            return jsonify(estado="vivo", pid=os.getpid())
+
+        @server.route("/readyz")
+        def readyz():
+            listo = self.listo.is_set()
+            return jsonify(dict(self.estado, listo=listo, pid=os.getpid())), 200 if listo else 503
+
+    def iniciar(self, calentar=ACTIVO):
+        """
+        Marca los datos como cargados, preserializa las páginas y lanza el
+        calentamiento en segundo plano; sin ``calentar`` el worker queda
+        listo de inmediato. Se llama antes de servir la primera petición.
+        """
+        self.estado["datos_s"] = round(time.perf_counter() - self.inicio, 3)
+        if not calentar:
+            self.listo.set()
+            return None
+        for pagina in self.paginas:
+            preserializar(pagina)
+        hilo = threading.Thread(target=self._calentar, name="calentamiento", daemon=True)
+        hilo.start()
+        return hilo
+
+    def _post(self, cliente, cuerpo):
+        respuesta = cliente.post(_ACTUALIZAR, json=cuerpo)
+        if respuesta.status_code == 204:
+            return {}
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"{cuerpo['output']}: HTTP {respuesta.status_code}")
+        return respuesta.get_json().get("response", {})
+
+    def _calentar(self):
+        inicio = time.perf_counter()
+        try:
+            cliente = self.app.server.test_client()
+            for url in ("/", "/_dash-layout", "/_dash-dependencies"):
+                if cliente.get(url).status_code != 200:
+                    raise RuntimeError(f"GET {url} falló")
+            globales = props_por_id(cliente.get("/_dash-layout").get_json())
+            dependencias = [d for d in cliente.get("/_dash-dependencies").get_json()
+                            if not d.get("clientside_function")]
+            pagina_dep = next(d for d in dependencias if "page-content.children" in d["output"])
+            for ruta in self.rutas:
+                self._calentar_ruta(cliente, ruta, globales, dependencias, pagina_dep)
+        except Exception as e:  # el calentamiento nunca debe tumbar el worker
+            self.estado["errores"].append(f"{type(e).__name__}: {e}")
+        self.estado["calentamiento_s"] = round(time.perf_counter() - inicio, 3)
+        if self.estado["errores"]:
+            self.app.server.logger.error("Calentamiento fallido, /readyz queda en 503: %s",
+                                         self.estado["errores"])
+            return
+        self.listo.set()
+        self.app.server.logger.info(
+            "Listo: datos %.2f s, calentamiento %.2f s %s", self.estado["datos_s"] or 0,
+            self.estado["calentamiento_s"], self.estado["rutas"])
+
+    def _calentar_ruta(self, cliente, ruta, globales, dependencias, pagina_dep):
+        inicio = time.perf_counter()
+        valores = dict(globales, url={"pathname": ruta})
+        respuesta = self._post(cliente, _cuerpo(pagina_dep, valores, ["url.pathname"]))
+        locales = props_por_id(respuesta.get("page-content", {}).get("children"))
+        valores.update(locales)
+        for dep in dependencias:
+            if dep is pagina_dep or dep.get("prevent_initial_call"):
+                continue
+            ids = {p["id"] for p in dep["inputs"] + dep["state"]}
+            salidas = salidas_de(dep["output"])
+            salidas = {s["id"] for s in (salidas if isinstance(salidas, list) else [salidas])}
+            if ids <= set(valores) and (ids | salidas) & set(locales):
+                self._post(cliente, _cuerpo(dep, valores))
+        self.estado["rutas"][ruta] = round(time.perf_counter() - inicio, 3)
@@ -0,0 +1,221 @@
+"""
+Series temporales de mortalidad precalculadas.
+
+Los conteos se guardan en un arreglo denso ``[fecha, departamento, grupo]``
+(grupo = capítulo CIE-10). Las medias móviles y la línea base del año
+anterior se calculan una sola vez, vectorizadas sobre todo el arreglo, y las
+gráficas interactivas sólo suman rebanadas en lugar de reagrupar ``base``.
+
+La resolución depende de los campos de fecha del registro: diaria cuando
+existe la columna ``DIA`` y mensual (``AÑO``/``MES``) en caso contrario.
+"""
+
+import os
+
+import numpy as np
+
+from tablero.dimensiones import codificar, indices
+from tablero.version import ruta_cache
+
+COLUMNA_DIA = "DIA"
+
+# Ventanas de media móvil por resolución (en periodos de esa resolución)
+VENTANAS = {"D": (7, 28), "M": (3,)}
+
+# Desfase del "mismo periodo del año anterior": 52 semanas conservan el día
+# de la semana en la serie diaria
+DESFASE_ANUAL = {"D": 364, "M": 12}
+
+MEDIDAS = ("conteo", "base", "exceso", "exceso_pct")
+
+
+def _media_movil(conteos, ventana):
+    salida = np.full(conteos.shape, np.nan, dtype=np.float32)
+    if len(conteos) < ventana:
+        return salida
+    acum = np.cumsum(conteos, axis=0, dtype=np.float64)
+    previo = np.concatenate([np.zeros_like(acum[:1]), acum[:-ventana]])
+    salida[ventana - 1:] = (acum[ventana - 1:] - previo) / ventana
+    return salida
+
+
+def _linea_base(conteos, desfase, anios=1):
+    acum = np.zeros(conteos.shape, dtype=np.float64)
+    n = np.zeros(len(conteos), dtype=np.int32)
+    for k in range(1, anios + 1):
+        s = k * desfase
+        if s >= len(conteos):
+            break
+        acum[s:] += conteos[:-s]
+        n[s:] += 1
+    n = n.reshape((-1,) + (1,) * (conteos.ndim - 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, acum / n, np.nan).astype(np.float32)
+
+
+def _semana(fechas):
+    # Semanas ISO (inician el lunes); 1970-01-01 fue jueves
+    dias = fechas.astype("datetime64[D]").astype(np.int64)
+    return ((dias + 3) // 7 * 7 - 3).astype("datetime64[D]")
+
+
+def _reagrupar(fechas, valores, frecuencia):
+    if not len(fechas):
+        return fechas.astype(f"datetime64[{'D' if frecuencia == 'W' else frecuencia}]"), valores
+    if frecuencia == "W":
+        llaves = _semana(fechas)
+    else:
+        llaves = fechas.astype(f"datetime64[{frecuencia}]")
+    inicio = np.flatnonzero(np.r_[True, llaves[1:] != llaves[:-1]])
+    return llaves[inicio], np.add.reduceat(valores, inicio, axis=0)
+
+
+class SeriesTemporales:
+    """Conteos ``[T, D+1, G+1]`` con medias móviles y línea base derivadas."""
+
+    def __init__(self, fechas, resolucion, departamentos, grupos, conteos,
+                 version=None, medias=None, linea_base=None, anios_base=1):
+        self.fechas = fechas
+        self.resolucion = resolucion
+        self.departamentos = departamentos
+        self.grupos = grupos
+        self.conteos = conteos
+        self.version = version
+        if medias is None:
+            medias = {v: _media_movil(conteos, v) for v in VENTANAS[resolucion]}
+        if linea_base is None:
+            linea_base = _linea_base(conteos, DESFASE_ANUAL[resolucion], anios_base)
+        self.medias = medias
+        self.linea_base = linea_base
+
+    @classmethod
+    def desde_base(cls, base, version=None, col_dpto="COD_DEPARTAMENTO",
+                   col_grupo="Nombre capítulo", anios_base=1):
+        import pandas as pd
+
+        anio = pd.to_numeric(base["AÑO"], errors="coerce")
+        mes = pd.to_numeric(base["MES"], errors="coerce")
+        if COLUMNA_DIA in base.columns:
+            resolucion = "D"
+            fecha = pd.to_datetime(
+                pd.DataFrame({"year": anio, "month": mes,
+                              "day": pd.to_numeric(base[COLUMNA_DIA], errors="coerce")}),
+                errors="coerce").to_numpy().astype("datetime64[D]")
+            valida = ~np.isnat(fecha)
+        else:
+            resolucion = "M"
+            valida = (anio.notna() & mes.between(1, 12)).to_numpy()
+            meses = (anio.to_numpy() - 1970) * 12 + mes.to_numpy() - 1
+            fecha = np.where(valida, meses, 0).astype(np.int64).astype("datetime64[M]")
+
+        dpto, departamentos = codificar(base[col_dpto])
+        grupo, grupos = codificar(base[col_grupo])
+        fecha, dpto, grupo = fecha[valida], dpto[valida], grupo[valida]
+        if not len(fecha):
+            # Sin fechas válidas: series vacías sobre las mismas dimensiones
+            conteos = np.zeros((0, len(departamentos) + 1, len(grupos) + 1), dtype=np.int32)
+            return cls(fecha, resolucion, departamentos, grupos, conteos,
+                       version=version, anios_base=anios_base)
+
+        inicio = fecha.min()
+        t = (fecha - inicio).astype(np.int64)
+        forma = (int(t.max()) + 1, len(departamentos) + 1, len(grupos) + 1)
+        plano = np.ravel_multi_index((t, dpto, grupo), forma)
+        conteos = np.bincount(plano, minlength=int(np.prod(forma)))
+        conteos = conteos.reshape(forma).astype(np.int32)
+        fechas = inicio + np.arange(forma[0])
+        return cls(fechas, resolucion, departamentos, grupos, conteos,
+                   version=version, anios_base=anios_base)
+
+    @classmethod
+    def obtener(cls, base, version):
+        """Carga las series de la caché de ``version`` o las construye y guarda."""
+        ruta = ruta_cache("series", version)
+        if os.path.exists(ruta):
+            return cls.cargar(ruta)
+        series = cls.desde_base(base, version)
+        series.guardar(ruta)
+        return series
+
+    def guardar(self, ruta):
+        np.savez_compressed(
+            ruta,
+            fechas=self.fechas.astype(np.int64),
+            resolucion=self.resolucion,
+            departamentos=self.departamentos,
+            grupos=self.grupos,
+            conteos=self.conteos,
+            linea_base=self.linea_base,
+            version=str(self.version),
+            **{f"media_{v}": m for v, m in self.medias.items()},
+        )
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as z:
+            resolucion = str(z["resolucion"])
+            return cls(
+                z["fechas"].astype(f"datetime64[{resolucion}]"),
+                resolucion,
+                z["departamentos"],
+                z["grupos"],
+                z["conteos"],
+                version=str(z["version"]),
+                medias={v: z[f"media_{v}"] for v in VENTANAS[resolucion]},
+                linea_base=z["linea_base"],
+            )
+
+    @property
+    def con_anio_anterior(self):
+        """
+        ``True`` si algún periodo tiene el mismo periodo del año anterior; si
+        no (p. ej. sólo 2019), ``base`` y los excesos son todos ``NaN``.
+        """
+        return len(self.fechas) > DESFASE_ANUAL[self.resolucion]
+
+    @property
+    def frecuencias(self):
+        return ("D", "W", "M") if self.resolucion == "D" else ("M",)
+
+    def _rebanada(self, arreglo, departamentos, grupos):
+        if departamentos:
+            arreglo = arreglo[:, indices(self.departamentos, departamentos)]
+        if grupos:
+            arreglo = arreglo[:, :, indices(self.grupos, grupos)]
+        return arreglo.sum(axis=(1, 2))
+
+    def serie(self, departamentos=None, grupos=None, medida="conteo",
+              frecuencia=None):
+        """
+        Serie ``(fechas, valores)`` para la selección de departamentos
+        (códigos) y grupos de causa. ``medida`` es ``conteo``, ``base``,
+        ``exceso``, ``exceso_pct`` o ``media-<ventana>``.
+        """
+        frecuencia = frecuencia or self.resolucion
+        if frecuencia not in self.frecuencias:
+            raise ValueError(f"Frecuencia no disponible: {frecuencia}")
+
+        if medida.startswith("media-"):
+            ventana = int(medida.split("-", 1)[1])
+            if ventana not in self.medias or frecuencia != self.resolucion:
+                raise ValueError(f"Media móvil no disponible: {medida}/{frecuencia}")
+            return self.fechas, self._rebanada(self.medias[ventana], departamentos, grupos)
+        if medida not in MEDIDAS:
+            raise ValueError(f"Medida desconocida: {medida}")
+
+        fechas = self.fechas
+        observado = self._rebanada(self.conteos, departamentos, grupos).astype(np.float64)
+        base = self._rebanada(self.linea_base, departamentos, grupos).astype(np.float64)
+        if frecuencia != self.resolucion:
+            _, observado = _reagrupar(self.fechas, observado, frecuencia)
+            fechas, base = _reagrupar(self.fechas, base, frecuencia)
+
+        if medida == "conteo":
+            return fechas, observado
+        if medida == "base":
+            return fechas, base
+        exceso = observado - base
+        if medida == "exceso":
+            return fechas, exceso
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return fechas, np.where(base > 0, 100 * exceso / base, np.nan)
@@ -0,0 +1,54 @@
+"""
+Versión de los datos y rutas de la caché en disco.
+
+La versión es un hash del contenido de los archivos de entrada: cualquier
+estructura precalculada (series, agregados, índices) se guarda con ese hash
+en el nombre y se reconstruye sólo cuando los datos cambian.
+"""
+
+import hashlib
+import os
+
+RUTAS_DATOS = (
+    "datos/Anexo1.NoFetal2019_CE_15-03-23.xlsx",
+    "datos/Anexo2.CodigosDeMuerte_CE_15-03-23.xlsx",
+    "datos/Divipola_CE_.xlsx",
+)
+
+DIR_CACHE = os.environ.get("MORTALIDAD_CACHE", ".cache")
+
+_memo = {}
+
+
+def _huella(ruta):
+    est = os.stat(ruta)
+    clave = (ruta, est.st_mtime_ns, est.st_size)
+    if clave not in _memo:
+        h = hashlib.sha1()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        _memo[clave] = h.hexdigest()
+    return _memo[clave]
+
+
+def version_datos(rutas=RUTAS_DATOS, reemplazos=None):
+    """
+    Hash corto (12 caracteres) del contenido de los archivos existentes.
+    ``reemplazos`` (``{ruta: otra}``) da la versión que tendrán los datos
+    cuando ``otra`` se copie en ``ruta`` (p. ej. una publicación nueva).
+    """
+    reemplazos = reemplazos or {}
+    h = hashlib.sha1()
+    for ruta in rutas:
+        real = reemplazos.get(ruta, ruta)
+        if os.path.exists(real):
+            h.update(os.path.basename(ruta).encode())
+            h.update(_huella(real).encode())
+    return h.hexdigest()[:12]
+
+
+def ruta_cache(nombre, version, extension="npz"):
+    """Ruta dentro de ``DIR_CACHE`` para el artefacto ``nombre`` de una versión."""
+    os.makedirs(DIR_CACHE, exist_ok=True)
+    return os.path.join(DIR_CACHE, f"{nombre}-{version}.{extension}")